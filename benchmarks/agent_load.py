@@ -0,0 +1,201 @@
+"""
+Teste de carga do agente SNMP (main.handler) sobre um banco sintetico.
+
+Gera um banco com N dispositivos e M observacoes (benchmarks.dataset), sobe o agente em uma porta UDP
+local e o exercita com um gerador de carga no mesmo processo: `concurrency` requisicoes em andamento,
+durante `duration` segundos por tipo de PDU. Mede requisicoes/s e latencia p50/p99 de GET, GETNEXT e
+GETBULK em celulas sorteadas das tabelas e o tempo de uma walk completa (GETBULK) de historyTable e
+deviceTable. Nao precisa de root nem de rede: tudo passa pela interface de loopback.
+
+    python -m benchmarks.agent_load [--devices 1000] [--history 20000] [--duration 5] [--concurrency 16]
+                                    [--bulk 25] [--db URL] [--no-cache] [--json resultado.json]
+
+Com --db o banco informado e usado como esta, sem gerar dados.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from typing import Callable, Dict, List, Optional
+
+from benchmarks import dataset
+from snmp_agent import snmp
+
+SUFFIX = "1.3.6.1.3.1."
+HISTORY_TABLE = SUFFIX + "2"
+DEVICE_TABLE = SUFFIX + "3"
+TIMEOUT = 2.0
+
+
+def encode_request(context: snmp.SnmpContext, request_id: int, oids: List[str], max_repetitions: int = 0) -> bytes:
+    # Mesmo formato de mensagem da resposta; no GetBulk error-status/error-index sao non-repeaters/max-repetitions
+    message = snmp.SNMPResponse(snmp.VERSION.V2C, "public", request_id,
+                                [snmp.VariableBinding(oid, snmp.Null()) for oid in oids],
+                                error_status=0, error_index=max_repetitions)
+    message.context = context
+    return snmp.encode_response(message)
+
+
+class LoadClient(asyncio.DatagramProtocol):
+    """Um socket para todas as requisicoes; as respostas sao casadas pelo request-id"""
+
+    def __init__(self):
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        response = snmp.decode_response(data)
+        if (future := self._pending.pop(response.request_id, None)) is not None and not future.done():
+            future.set_result(response)
+
+    async def call(self, context: snmp.SnmpContext, oids: List[str], max_repetitions: int = 0) -> snmp.SNMPRequest:
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        self.transport.sendto(encode_request(context, request_id, oids, max_repetitions))
+        try:
+            return await asyncio.wait_for(future, TIMEOUT)
+        finally:
+            self._pending.pop(request_id, None)
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+async def load(client: LoadClient, context: snmp.SnmpContext, pick: Callable[[], str], duration: float,
+               concurrency: int, max_repetitions: int = 0) -> dict:
+    latencies: List[float] = []
+    lost = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal lost
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                await client.call(context, [pick()], max_repetitions)
+            except asyncio.TimeoutError:
+                lost += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {"requests": len(latencies), "lost": lost, "rps": len(latencies) / elapsed,
+            "p50_us": percentile(latencies, 0.50) * 1e6, "p99_us": percentile(latencies, 0.99) * 1e6}
+
+
+async def full_walk(client: LoadClient, table: str, max_repetitions: int) -> dict:
+    """Percorre a tabela inteira com GetBulk, como um snmpbulkwalk"""
+    oid = table
+    requests = varbinds = 0
+    start = time.perf_counter()
+    while True:
+        response = await client.call(snmp.SnmpGetBulkContext(), [oid], max_repetitions)
+        requests += 1
+        inside = [vb for vb in response.variable_bindings
+                  if vb.oid.startswith(table + ".") and vb.value.tag is not snmp.ASN1.END_OF_MIB_VIEW]
+        varbinds += len(inside)
+        if len(inside) < len(response.variable_bindings) or not inside:
+            break
+        oid = inside[-1].oid
+    seconds = time.perf_counter() - start
+    return {"seconds": seconds, "requests": requests, "varbinds": varbinds,
+            "varbinds_per_s": varbinds / seconds if seconds else 0.0}
+
+
+async def run(args, agent) -> dict:
+    from snmp_agent.server import Server
+
+    server = Server(handler=agent.handler, host="127.0.0.1", port=0, max_in_flight=max(256, args.concurrency))
+    await server.start()
+    address = server.protocol.transport.get_extra_info("sockname")
+    loop = asyncio.get_running_loop()
+    transport, client = await loop.create_datagram_endpoint(LoadClient, remote_addr=address)
+
+    rng = random.Random(args.seed)
+    history_rows = len(agent.functions.history_rows)
+    device_rows = len(agent.functions.device_rows)
+
+    def cell() -> str:
+        # Celula sorteada de uma das duas tabelas, em proporcao ao numero de linhas
+        if rng.randrange(history_rows + device_rows) < history_rows:
+            return f"{HISTORY_TABLE}.{rng.randint(1, 4)}.{rng.randint(1, history_rows)}"
+        return f"{DEVICE_TABLE}.{rng.randint(1, 6)}.{rng.randint(1, device_rows)}"
+
+    results = {"dataset": {"history_rows": history_rows, "device_rows": device_rows,
+                           "cache": agent.response_cache is not None},
+               "pdus": {}, "walks": {}}
+    try:
+        await client.call(snmp.SnmpGetContext(), [cell()])  # carrega as imagens das tabelas
+        results["pdus"]["get"] = await load(client, snmp.SnmpGetContext(), cell, args.duration, args.concurrency)
+        results["pdus"]["getnext"] = await load(client, snmp.SnmpGetNextContext(), cell, args.duration,
+                                                args.concurrency)
+        results["pdus"]["getbulk"] = await load(client, snmp.SnmpGetBulkContext(), cell, args.duration,
+                                                args.concurrency, args.bulk)
+        results["walks"]["historyTable"] = await full_walk(client, HISTORY_TABLE, args.bulk)
+        results["walks"]["deviceTable"] = await full_walk(client, DEVICE_TABLE, args.bulk)
+        results["server"] = dict(server.protocol.counters)
+    finally:
+        transport.close()
+        await server.stop()
+    return results
+
+
+def report(results: dict, bulk: int):
+    data = results["dataset"]
+    print(f"history rows: {data['history_rows']}, device rows: {data['device_rows']}, "
+          f"response cache: {'on' if data['cache'] else 'off'}")
+    print(f"{'pdu':<10} {'requests':>9} {'lost':>5} {'req/s':>9} {'p50 us':>9} {'p99 us':>9}")
+    for pdu, row in results["pdus"].items():
+        name = f"{pdu}x{bulk}" if pdu == "getbulk" else pdu
+        print(f"{name:<10} {row['requests']:>9} {row['lost']:>5} {row['rps']:>9.0f} {row['p50_us']:>9.0f} "
+              f"{row['p99_us']:>9.0f}")
+    for table, row in results["walks"].items():
+        print(f"walk {table}: {row['seconds']:.3f}s, {row['requests']} requests, {row['varbinds']} varbinds "
+              f"({row['varbinds_per_s']:.0f} varbinds/s)")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--devices", type=int, default=1000)
+    parser.add_argument("--history", type=int, default=20000)
+    parser.add_argument("--duration", type=float, default=5.0, help="segundos de carga por tipo de PDU")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--bulk", type=int, default=25, help="max-repetitions do GetBulk")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--db", help="URL SQLAlchemy de um banco existente (nao gera dados)")
+    parser.add_argument("--no-cache", action="store_true", help="desliga o cache de respostas do agente")
+    parser.add_argument("--json", help="grava os resultados neste arquivo")
+    args = parser.parse_args(argv)
+
+    dataset.use_database(args.db)
+    if args.db is None:
+        start = time.perf_counter()
+        dataset.populate(args.devices, args.history, seed=args.seed)
+        print(f"dataset generated in {time.perf_counter() - start:.1f}s")
+
+    import main as agent  # depois de use_database: o orm cria a engine na importacao
+
+    if args.no_cache:
+        agent.response_cache = None
+    results = asyncio.run(run(args, agent))
+    report(results, args.bulk)
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""
+Microbenchmark do codec BER do agente (snmp_agent.ber).
+
+Mede ns por varbind para codificar respostas e decodificar requisicoes de tamanhos variados e, se a
+biblioteca asn1 estiver instalada, compara byte a byte com a implementacao anterior baseada nela.
+Tambem mede o custo por OID com o cache de prefixos (snmp_agent.ber.oid_cache) e sem ele (ber.encode_oid).
+
+    python -m benchmarks.ber_codec [--varbinds 1 10 50] [--repeat 2000]
+"""
+import argparse
+import time
+
+from snmp_agent import ber, snmp
+
+SUFFIX = "1.3.6.1.3.1."
+
+try:
+    import asn1
+except ImportError:
+    asn1 = None
+
+
+# ------ IMPLEMENTACAO ANTERIOR (asn1) --------------
+def legacy_encode_response(response: snmp.SNMPResponse) -> bytes:
+    encoder = asn1.Encoder()
+    encoder.start()
+
+    def write(value):
+        encoder._emit_tag(cls=value.get_class(), typ=value.get_pc(), nr=value.get_tag_number())
+        value_bytes = value.encode()
+        encoder._emit_length(len(value_bytes))
+        encoder._emit(value_bytes)
+
+    encoder.enter(cls=0, nr=asn1.Numbers.Sequence)
+    write(snmp.Integer(response.version.code))
+    write(snmp.OctetString(response.community))
+    encoder.enter(cls=response.context.get_class(), nr=response.context.get_tag_number())
+    write(snmp.Integer(response.request_id))
+    write(snmp.Integer(response.error_status))
+    write(snmp.Integer(response.error_index))
+    encoder.enter(cls=0, nr=asn1.Numbers.Sequence)
+    for variable_binding in response.variable_bindings:
+        encoder.enter(cls=0, nr=asn1.Numbers.Sequence)
+        write(snmp.ObjectIdentifier(variable_binding.oid))
+        write(variable_binding.value)
+        encoder.leave()
+    encoder.leave()
+    encoder.leave()
+    encoder.leave()
+    return encoder.output()
+
+
+def legacy_decode_request(data: bytes):
+    decoder = asn1.Decoder()
+    decoder.start(data)
+    decoder.enter()
+    version = decoder.read()[1]
+    community = decoder.read()[1].decode()
+    decoder.enter()
+    request_id = decoder.read()[1]
+    decoder.read()
+    decoder.read()
+    decoder.enter()
+    oids = []
+    while not decoder.eof():
+        decoder.enter()
+        oids.append(decoder.read()[1])
+        decoder.read()
+        decoder.leave()
+    return version, community, request_id, oids
+
+
+# ------ MENSAGENS --------------
+def make_response(n: int) -> snmp.SNMPResponse:
+    values = [
+        lambda i: snmp.OctetString(f"aa:bb:cc:dd:ee:{i % 256:02x}"),
+        lambda i: snmp.IPAddress(f"192.168.{i // 256 % 256}.{i % 256}"),
+        lambda i: snmp.Integer(i * 7919),
+        lambda i: snmp.Counter32(i * 104729),
+        lambda i: snmp.TimeTicks(i * 1000),
+    ]
+    variable_bindings = [snmp.VariableBinding(f"{SUFFIX}3.{i % 6 + 1}.{i + 1}", values[i % len(values)](i))
+                         for i in range(n)]
+    return snmp.SNMPResponse(snmp.VERSION.V2C, "public", 123456, variable_bindings)
+
+
+def make_request(n: int) -> bytes:
+    # Uma GetNext com n OIDs, gerada pelo proprio encoder trocando o tipo do PDU
+    response = snmp.SNMPResponse(snmp.VERSION.V2C, "public", 123456,
+                                 [snmp.VariableBinding(f"{SUFFIX}3.1.{i + 1}", snmp.Null()) for i in range(n)])
+    response.context = snmp.SnmpGetNextContext()
+    return snmp.encode_response(response)
+
+
+def bench(function, argument, repeat: int) -> float:
+    start = time.perf_counter_ns()
+    for _ in range(repeat):
+        function(argument)
+    return (time.perf_counter_ns() - start) / repeat
+
+
+def check_integers():
+    for value in list(range(-70000, 70000)) + [2 ** 31 - 1, -2 ** 31, 2 ** 32 - 1, 2 ** 64 - 1]:
+        if snmp.Integer(value).encode() != asn1.Encoder._encode_integer(value):
+            raise AssertionError(f"Integer encoding differs for {value}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--varbinds", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    if asn1 is not None:
+        check_integers()
+
+    header = f"{'varbinds':>8} {'encode ns/vb':>13} {'decode ns/vb':>13}"
+    if asn1 is not None:
+        header += f" {'asn1 enc ns/vb':>15} {'asn1 dec ns/vb':>15}"
+    print(header)
+    for n in args.varbinds:
+        response = make_response(n)
+        request = make_request(n)
+        row = f"{n:>8} {bench(snmp.encode_response, response, args.repeat) / n:>13.0f} " \
+              f"{bench(snmp.decode_request, request, args.repeat) / n:>13.0f}"
+        if asn1 is not None:
+            if legacy_encode_response(response) != snmp.encode_response(response):
+                raise AssertionError(f"Encoded response differs from asn1 for {n} varbinds")
+            decoded = snmp.decode_request(request)
+            if legacy_decode_request(request) != (decoded.version.code, decoded.community, decoded.request_id,
+                                                  [vb.oid for vb in decoded.variable_bindings]):
+                raise AssertionError(f"Decoded request differs from asn1 for {n} varbinds")
+            row += f" {bench(legacy_encode_response, response, args.repeat) / n:>15.0f}" \
+                   f" {bench(legacy_decode_request, request, args.repeat) / n:>15.0f}"
+        print(row)
+
+    # Cache de OIDs: mesma walk codificada com o cache ligado e desligado
+    response = make_response(max(args.varbinds))
+    for oid in ("1.3", "1.3.6", "2.999.1", "1.3.6.1.4.1.2021.10.1.3.1") + \
+            tuple(vb.oid for vb in response.variable_bindings):
+        if ber.oid_cache.encode(oid) != ber.encode_oid(oid):
+            raise AssertionError(f"Cached encoding differs for {oid}")
+    # Custo por OID: o cache contra a codificacao direta (ber.encode_oid), sem passar pelo cache
+    oids = [vb.oid for vb in response.variable_bindings]
+    ber.oid_cache.clear()
+    cached = bench(lambda values: [ber.oid_cache.encode(oid) for oid in values], oids, args.repeat) / len(oids)
+    hits, misses = ber.oid_cache.hits, ber.oid_cache.misses
+    direct = bench(lambda values: [ber.encode_oid(oid) for oid in values], oids, args.repeat) / len(oids)
+    print(f"oid encode: {cached:.0f} ns/oid cached, {direct:.0f} ns/oid direct (encode_oid), "
+          f"{hits} hits / {misses} misses")
+
+
+if __name__ == '__main__':
+    main()
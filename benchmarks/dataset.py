@@ -0,0 +1,81 @@
+"""
+Bancos sinteticos para os benchmarks: N dispositivos e M observacoes (device_networks).
+
+O banco e escolhido pela variavel NETSCAN_DB_URL, lida pelo orm na importacao; por isso `use_database`
+deve ser chamada antes de qualquer import de orm (direto ou via main/functions).
+
+Cada observacao e de um dispositivo sorteado (os N primeiros registros cobrem todos os dispositivos uma
+vez), com intervalo medio de `step` segundos entre observacoes. A rotatividade imita a rede real: uma
+parte das observacoes e timeout de ICMP (dispositivo saiu), e a cada observacao o dispositivo troca de
+IP com probabilidade `ip_churn` (renovacao de DHCP).
+"""
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+from typing import Optional
+
+CHUNK = 20000
+
+# Pesos dos metodos de descoberta nas observacoes geradas (nome de orm.EnumMethods)
+METHOD_WEIGHTS = {"ARP_2": 45, "ICMP_ECHO_RESPONSE": 40, "ICMP_ECHO_RESPONSE_TIMEOUT": 10, "NDP_ADVERTISEMENT": 5}
+
+
+def use_database(url: Optional[str] = None) -> str:
+    """Aponta o orm para `url` ou para um arquivo SQLite novo em um diretorio temporario"""
+    if url is None:
+        url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='netscan-bench-'), 'bench.db')}"
+    os.environ["NETSCAN_DB_URL"] = url
+    return url
+
+
+def mac_address(index: int) -> str:
+    return "02:" + ":".join(f"{index >> shift & 0xff:02x}" for shift in (32, 24, 16, 8, 0))
+
+
+def ip_address(index: int) -> str:
+    return f"10.{index >> 16 & 0xff}.{index >> 8 & 0xff}.{index & 0xff}"
+
+
+def populate(devices: int, history: int, seed: int = 1, step: float = 30.0, ip_churn: float = 0.01,
+             gateways: int = 1):
+    """Apaga dispositivos e historico do banco atual e grava o conjunto sintetico"""
+    from sqlalchemy import delete, insert
+    from sqlalchemy.orm import Session
+
+    import orm
+
+    rng = random.Random(seed)
+    methods = [orm.EnumMethods[name].value for name in METHOD_WEIGHTS]
+    weights = list(METHOD_WEIGHTS.values())
+    ips = list(range(devices))
+    start = datetime.now() - timedelta(seconds=history * step)
+
+    with orm.engine.connect() as connection:
+        with Session(bind=connection) as session:
+            session.execute(delete(orm.DeviceNetwork))
+            session.execute(delete(orm.Device))
+            for first in range(0, devices, CHUNK):
+                session.execute(insert(orm.Device), [
+                    {"id": i + 1, "mac_addr": mac_address(i), "gateway": i < gateways}
+                    for i in range(first, min(first + CHUNK, devices))])
+
+            at = start
+            for first in range(0, history, CHUNK):
+                rows = []
+                for i in range(first, min(first + CHUNK, history)):
+                    device = i if i < devices else rng.randrange(devices)
+                    if rng.random() < ip_churn:
+                        ips[device] = rng.randrange(1 << 24)
+                    at += timedelta(seconds=rng.expovariate(1 / step))
+                    # A primeira observacao de um dispositivo nunca e um timeout (o orm nao gravaria)
+                    method = methods[0] if i < devices else rng.choices(methods, weights)[0]
+                    ip = ip_address(ips[device])
+                    rows.append({"device_id": device + 1, "discovery_method_id": method, "ip": ip,
+                                 "ip_num": orm.ip_number(ip), "discovered_at": at})
+                session.execute(insert(orm.DeviceNetwork), rows)
+
+            # Grava direto em device_networks, sem passar por orm.save(): o resumo em devices e refeito no fim
+            orm.refresh_device_summaries(session.connection())
+            orm.bump_generation(session)
+            session.commit()
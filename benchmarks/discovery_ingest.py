@@ -0,0 +1,187 @@
+"""
+Vazao da ingestao das varreduras (icmp, arp2 e ndp) ate o banco, com um respondedor simulado.
+
+O fio e substituido por SimulatedWire (net_discover.install_wire): `responding` hosts respondem a ICMP,
+ARP e ICMPv6/NDP, e `silent` hosts nunca respondem. As respostas sao montadas antes da medicao e
+entregues na hora, sem esperar timeouts; o que se mede e o caminho do pacote recebido ate as linhas
+gravadas (callbacks, orm.save, estimativas de RTT, estado dos alvos). O tempo gasto dentro do fio simulado
+e descontado e mostrado a parte.
+
+Cada metodo roda `rounds` vezes sobre um banco SQLite temporario (ou --db). A partir da segunda rodada,
+uma fracao `departures` dos hosts deixa de responder, o que gera os registros de timeout do ICMP.
+
+    python -m benchmarks.discovery_ingest [--responding 500] [--silent 500] [--rounds 2] [--departures 0.1]
+                                          [--methods icmp arp2 ndp] [--db URL] [--json resultado.json]
+
+Nao precisa de root nem de rede.
+"""
+import argparse
+import json
+import random
+import time
+from typing import Callable, Dict, List, Optional
+
+from benchmarks import dataset
+
+LOCAL_MAC = "02:ff:ff:ff:ff:ff"
+
+
+def ipv6_address(index: int) -> str:
+    return f"fd00::{index >> 16 & 0xffff:x}:{index & 0xffff:x}"
+
+
+def build_wire(responding: int, silent: int):
+    # Importado aqui: net_discover importa o orm, que so pode ser importado depois de dataset.use_database
+    from scapy.layers.inet import ICMP, IP
+    from scapy.layers.inet6 import IPv6, ICMPv6EchoReply, ICMPv6ND_NA, ICMPv6NDOptDstLLAddr
+    from scapy.layers.l2 import ARP, Ether
+
+    import net_discover
+
+    class SimulatedWire(net_discover.Wire):
+        """Hosts 0..responding-1 respondem; os seguintes (ate responding + silent) ficam em silencio"""
+
+        def __init__(self):
+            self.seconds = 0.0  # tempo gasto no proprio fio, fora dos callbacks de quem varre
+            self.targets = [dataset.ip_address(i) for i in range(responding + silent)]
+            self.icmp_replies = {}
+            self.arp_replies = {}
+            self.ndp_replies = {}
+            for i in range(responding):
+                ip, mac, ip6 = dataset.ip_address(i), dataset.mac_address(i), ipv6_address(i)
+                reply = Ether(src=mac, dst=LOCAL_MAC) / IP(src=ip) / ICMP(type=0)
+                self.icmp_replies[ip] = reply
+                self.arp_replies[ip] = Ether(src=mac, dst=LOCAL_MAC) / ARP(op=2, psrc=ip, hwsrc=mac)
+                if i % 2:
+                    self.ndp_replies[ip] = Ether(src=mac, dst=LOCAL_MAC) / IPv6(src=ip6) / ICMPv6EchoReply()
+                else:
+                    self.ndp_replies[ip] = Ether(src=mac, dst=LOCAL_MAC) / IPv6(src=ip6) / \
+                        ICMPv6ND_NA(tgt=ip6) / ICMPv6NDOptDstLLAddr(lladdr=mac)
+            self._sniffer: Optional[Callable] = None
+
+        def depart(self, fraction: float, rng: random.Random):
+            """Uma fracao dos hosts que respondem deixa a rede"""
+            for ip in rng.sample(sorted(self.icmp_replies), int(len(self.icmp_replies) * fraction)):
+                for replies in (self.icmp_replies, self.arp_replies, self.ndp_replies):
+                    del replies[ip]
+
+        def srp(self, packets, timeout: float):
+            start = time.perf_counter()
+            ans, unans = [], []
+            now = time.time()
+            for sent in packets:
+                sent.sent_time = now
+                received = self.icmp_replies.get(sent[IP].dst)
+                if received is None:
+                    unans.append(sent)
+                else:
+                    received.time = now + 0.001
+                    ans.append((sent, received))
+            self.seconds += time.perf_counter() - start
+            return ans, unans
+
+        def sniff(self, prn: Callable, filter: str, timeout: float):
+            # Cada host se anuncia duas vezes, como acontece com ARP gratuito e retransmissoes
+            for _ in range(2):
+                for packet in self.arp_replies.values():
+                    prn(packet)
+
+        def sendp(self, packet, iface=None):
+            if self._sniffer is not None:
+                for reply in self.ndp_replies.values():
+                    self._sniffer(reply)
+
+        def async_sniffer(self, prn: Callable, filter: str, iface=None):
+            wire = self
+
+            class Sniffer(object):
+                def start(self):
+                    wire._sniffer = prn
+
+                def stop(self):
+                    wire._sniffer = None
+
+            return Sniffer()
+
+    wire = SimulatedWire()
+    net_discover.install_wire(wire)
+    return wire
+
+
+def count_rows() -> int:
+    from sqlalchemy import func, select
+
+    import orm
+
+    with orm.engine.connect() as connection:
+        return connection.execute(select(func.count(orm.DeviceNetwork.id))).scalar()
+
+
+def run_method(method: str, wire, rounds: int, departures: float, rng: random.Random) -> dict:
+    import net_discover
+    from scan_stats import get_stats
+
+    scans: Dict[str, Callable[[], None]] = {
+        "icmp": lambda: net_discover.icmp_probe(wire.targets, timeout=1, retries=2),
+        "arp2": lambda: net_discover.arp2_sniff(timeout=0),
+        "ndp": lambda: net_discover.ndp_scan(timeout=0),
+    }
+    stats = get_stats()
+    before = stats.snapshot(method)
+    rows_before = count_rows()
+    wire_before = wire.seconds
+    start = time.perf_counter()
+    for round_ in range(rounds):
+        if round_:
+            wire.depart(departures, rng)
+        scans[method]()
+    elapsed = time.perf_counter() - start
+    after = stats.snapshot(method)
+
+    wire_seconds = wire.seconds - wire_before
+    seconds = elapsed - wire_seconds
+    rows = count_rows() - rows_before
+    probes = after["probes_sent"] - before["probes_sent"]
+    replies = after["replies"] - before["replies"]
+    return {"seconds": seconds, "wire_seconds": wire_seconds, "probes": probes, "replies": replies,
+            "rows": rows, "rows_reported": after["rows_written"] - before["rows_written"],
+            "probes_per_s": probes / seconds, "replies_per_s": replies / seconds, "rows_per_s": rows / seconds}
+
+
+def report(results: Dict[str, dict]):
+    print(f"{'method':<6} {'seconds':>8} {'probes':>7} {'replies':>8} {'rows':>6} {'probes/s':>9} "
+          f"{'replies/s':>10} {'rows/s':>8}")
+    for method, row in results.items():
+        print(f"{method:<6} {row['seconds']:>8.2f} {row['probes']:>7.0f} {row['replies']:>8.0f} {row['rows']:>6} "
+              f"{row['probes_per_s']:>9.0f} {row['replies_per_s']:>10.0f} {row['rows_per_s']:>8.0f}")
+        if row["rows"] != row["rows_reported"]:
+            print(f"  warning: {row['rows_reported']:.0f} rows reported by scan_stats, {row['rows']} found")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--responding", type=int, default=500)
+    parser.add_argument("--silent", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--departures", type=float, default=0.1,
+                        help="fracao dos hosts que para de responder a cada rodada apos a primeira")
+    parser.add_argument("--methods", nargs="+", default=["icmp", "arp2", "ndp"], choices=["icmp", "arp2", "ndp"])
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--db", help="URL SQLAlchemy do banco (padrao: SQLite temporario vazio)")
+    parser.add_argument("--json", help="grava os resultados neste arquivo")
+    args = parser.parse_args(argv)
+
+    dataset.use_database(args.db)
+    results = {}
+    for method in args.methods:
+        # Cada metodo comeca com todos os hosts respondendo
+        wire = build_wire(args.responding, args.silent)
+        results[method] = run_method(method, wire, args.rounds, args.departures, random.Random(args.seed))
+    report(results)
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
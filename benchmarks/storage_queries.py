@@ -0,0 +1,188 @@
+"""
+Consultas do orm sobre historicos sinteticos grandes (10 mil a 5 milhoes de linhas em device_networks).
+
+Para cada tamanho, um processo novo gera o banco (benchmarks.dataset, com rotatividade de IPs e timeouts)
+e mede os caminhos de leitura usados pela CLI e pelo agente -- get_devices, history_device,
+count_device_line, count_history_line, get_line_history, get_line_device e as cargas das tabelas do
+agente, all_history_rows e all_device_rows -- e o caminho de escrita save.
+Cada operacao roda ate `repeat` vezes ou ate gastar `budget` segundos (pelo menos uma vez). Sao informados
+ms por chamada, linhas/s (linhas que a consulta precisa ler), o pico de memoria Python da chamada
+(tracemalloc, em uma execucao a parte) e o maximo de RSS do processo.
+
+    python -m benchmarks.storage_queries [--sizes 10000 100000] [--devices-ratio 20] [--repeat 5]
+                                         [--budget 30] [--json resultado.json] [--compare anterior.json]
+
+--compare mostra a razao de tempo contra um JSON gravado antes (ex.: por outra versao do codigo).
+"""
+import argparse
+import json
+import multiprocessing
+import random
+import resource
+import subprocess
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmarks import dataset
+
+SAVES = 200
+
+
+def measure(function: Callable[[], int], repeat: int, budget: float) -> dict:
+    """`function` executa uma chamada e retorna o numero de linhas que ela leu ou gravou"""
+    times = []
+    rows = 0
+    deadline = time.perf_counter() + budget
+    while len(times) < repeat and (not times or time.perf_counter() < deadline):
+        start = time.perf_counter()
+        rows += function()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    total = sum(times)
+    return {"calls": len(times), "ms_per_call": total / len(times) * 1000, "rows_per_s": rows / total,
+            "peak_bytes": peak}
+
+
+def run_size(rows: int, devices: int, repeat: int, budget: float, seed: int) -> dict:
+    """Executado em um processo proprio: o orm cria a engine na importacao e o RSS maximo e por processo"""
+    dataset.use_database()
+    start = time.perf_counter()
+    dataset.populate(devices, rows, seed=seed)
+    populate_seconds = time.perf_counter() - start
+
+    from sqlalchemy import func, select
+
+    import orm
+
+    rng = random.Random(seed)
+    with orm.engine.connect() as connection:
+        history_by_device: Dict[int, int] = dict(connection.execute(
+            select(orm.DeviceNetwork.device_id, func.count(orm.DeviceNetwork.id))
+            .group_by(orm.DeviceNetwork.device_id)).all())
+
+    def pick_device() -> Tuple[int, str]:
+        index = rng.randrange(devices)
+        return index + 1, dataset.mac_address(index)
+
+    def get_devices() -> int:
+        orm.get_devices()
+        return rows
+
+    def history_device() -> int:
+        id_, mac = pick_device()
+        orm.history_device(mac)
+        return history_by_device.get(id_, 0)
+
+    def count_device_line() -> int:
+        orm.count_device_line()
+        return rows
+
+    def count_history_line() -> int:
+        orm.count_history_line()
+        return rows
+
+    def get_line_history() -> int:
+        orm.get_line_history.cache_clear()
+        orm.get_line_history(rng.randrange(rows))
+        return rows
+
+    def get_line_device() -> int:
+        orm.get_line_device.cache_clear()
+        return orm.get_line_device(pick_device()[0])[5]
+
+    def all_history_rows() -> int:
+        orm.all_history_rows()
+        return rows
+
+    def all_device_rows() -> int:
+        orm.all_device_rows()
+        return rows
+
+    saved = 0
+
+    def save() -> int:
+        # Um lote de observacoes: a maioria de dispositivos conhecidos, algumas de dispositivos novos
+        nonlocal saved
+        for _ in range(SAVES):
+            saved += 1
+            index = rng.randrange(devices) if rng.random() < 0.9 else devices + saved
+            orm.save(ip=dataset.ip_address(index), mac=dataset.mac_address(index),
+                     method=orm.EnumMethods.ARP_2)
+        return SAVES
+
+    operations = {}
+    for name, function in (("get_devices", get_devices), ("history_device", history_device),
+                           ("count_device_line", count_device_line), ("count_history_line", count_history_line),
+                           ("get_line_history", get_line_history), ("get_line_device", get_line_device),
+                           ("all_history_rows", all_history_rows), ("all_device_rows", all_device_rows),
+                           ("save", save)):
+        operations[name] = measure(function, repeat, budget)
+
+    return {"rows": rows, "devices": devices, "populate_seconds": populate_seconds,
+            "max_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024, "operations": operations}
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def report(result: dict, previous: Optional[dict]):
+    print(f"rows: {result['rows']}, devices: {result['devices']}, generated in {result['populate_seconds']:.1f}s, "
+          f"max RSS {result['max_rss_bytes'] / 2 ** 20:.0f} MiB")
+    header = f"{'operation':<19} {'calls':>5} {'ms/call':>10} {'rows/s':>12} {'peak MiB':>9}"
+    if previous is not None:
+        header += f" {'vs previous':>12}"
+    print(header)
+    for name, row in result["operations"].items():
+        line = f"{name:<19} {row['calls']:>5} {row['ms_per_call']:>10.2f} {row['rows_per_s']:>12.0f} " \
+               f"{row['peak_bytes'] / 2 ** 20:>9.1f}"
+        if previous is not None and name in previous["operations"]:
+            line += f" {previous['operations'][name]['ms_per_call'] / row['ms_per_call']:>11.2f}x"
+        print(line)
+    print()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000],
+                        help="linhas de historico de cada banco gerado")
+    parser.add_argument("--devices-ratio", type=int, default=20, help="observacoes por dispositivo, em media")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=30.0, help="segundos por operacao, no maximo")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="grava os resultados neste arquivo")
+    parser.add_argument("--compare", help="JSON de uma execucao anterior")
+    args = parser.parse_args(argv)
+
+    previous: Dict[int, dict] = {}
+    if args.compare:
+        with open(args.compare) as source:
+            previous = {result["rows"]: result for result in json.load(source)["results"]}
+
+    results = []
+    # Um processo por tamanho (spawn, como o resto do projeto): engine nova e RSS maximo sem heranca
+    context = multiprocessing.get_context("spawn")
+    for rows in args.sizes:
+        with context.Pool(1) as pool:
+            result = pool.apply(run_size, (rows, max(rows // args.devices_ratio, 1), args.repeat, args.budget,
+                                           args.seed))
+        report(result, previous.get(rows))
+        results.append(result)
+
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump({"revision": git_revision(), "created_at": time.time(), "results": results}, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
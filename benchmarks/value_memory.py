@@ -0,0 +1,56 @@
+"""
+Memoria e tempo para montar e codificar uma resposta GetBulk grande (objetos de valor e varbinds).
+
+    python -m benchmarks.value_memory [--varbinds 2000] [--repeat 20]
+"""
+import argparse
+import time
+import tracemalloc
+
+from snmp_agent import snmp
+
+SUFFIX = "1.3.6.1.3.1."
+
+
+def build(n: int) -> snmp.SNMPResponse:
+    # Mesma forma de uma fatia da deviceTable: MAC, IP, status, gateway, data, contagem + fim da MIB
+    columns = [
+        lambda i: snmp.OctetString(f"0200000{i:05x}"),
+        lambda i: snmp.IPAddress(f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}"),
+        lambda i: snmp.OctetString("ONLINE"),
+        lambda i: snmp.Integer(i % 2),
+        lambda i: snmp.OctetString("2024-10-17 10:00:00"),
+        lambda i: snmp.Counter32(i % 50),
+        lambda i: snmp.EndOfMibView(),
+    ]
+    return snmp.SNMPResponse(snmp.VERSION.V2C, "public", 1, [
+        snmp.VariableBinding(f"{SUFFIX}3.{i % 6 + 1}.{i + 1}", columns[i % len(columns)](i)) for i in range(n)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--varbinds", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    response = build(args.varbinds)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    snmp.encode_response(response)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        snmp.encode_response(build(args.varbinds))
+    elapsed = (time.perf_counter() - start) / args.repeat
+
+    print(f"varbinds: {args.varbinds}")
+    print(f"retained by the response: {retained / args.varbinds:.0f} bytes/varbind")
+    print(f"peak while encoding: {peak / args.varbinds:.0f} bytes/varbind")
+    print(f"build + encode: {elapsed / args.varbinds * 1e9:.0f} ns/varbind")
+
+
+if __name__ == '__main__':
+    main()
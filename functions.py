@@ -4,24 +4,22 @@ a função deve ser do tipo:
     func(s: VariableBinding)-> Union[int, SNMPLeafValue]:
     O valor inteiro indica o erro
 
-funcoes para get_next_request são parecidas:
-    func(s: VariableBinding)-> Union[int, SNMPLeafValue, oid]:
+As tabelas sao declaradas com snmp_agent.mib.Table (um provedor por coluna e uma fonte de linhas);
+o GetNext e calculado pelo motor generico em snmp_agent.mib, sem funcoes de sucessor aqui.
 """
 from math import log2
-from multiprocessing import Process
-
-from scapy.sendrecv import sniff
 
 import orm
+import profiler
+import scan_stats
+import scheduler
 import settings
-from net_discover import arp2_monitor_callback, icmp_scan
-from snmp_agent.snmp import VariableBinding, IPAddress, Integer, OctetString, NoSuchInstance, EndOfMibView, \
-    NoSuchObject, Counter32
-
+from snmp_agent.metrics import agent_rows
+from snmp_agent.mib import Table, SequenceRowSource, SnapshotRowSource
+from snmp_agent.snmp import VariableBinding, IPAddress, Integer, OctetString, NoSuchObject, Counter32, Gauge32, \
+    TimeTicks, ObjectIdentifier
 
-def get_next_root(s: VariableBinding):
-    s.oid = "1.3.6.1.3.1.1.1.1"
-    return *get_ip_address_scan(s), s.oid
+SUFFIX = "1.3.6.1.3.1."
 
 
 def get_ip_address_scan(s: VariableBinding):
@@ -29,11 +27,6 @@ def get_ip_address_scan(s: VariableBinding):
     return 0, IPAddress(ip_addr)
 
 
-def get_next_ip_adrress_scan(s: VariableBinding):
-    s.oid = "1.3.6.1.3.1.1.1.2"
-    return *get_ip_mask_scan(s), s.oid
-
-
 def set_ip_address_scan(s: VariableBinding):
     ip_addr = '.'.join(f'{c}' for c in s.value.value)
     settings.set_setting("ip_address", ip_addr)
@@ -47,11 +40,6 @@ def get_ip_mask_scan(s: VariableBinding):
     return 0, IPAddress(mask_str)
 
 
-def get_next_ip_mask_scan(s: VariableBinding):
-    s.oid = "1.3.6.1.3.1.1.1.3"
-    return *get_icmp_run(s), s.oid
-
-
 def set_ip_mask_scan(s: VariableBinding):
     ip_mask = sum([log2(x + 1) for x in s.value.value])
     settings.set_setting("ip_mask", int(ip_mask))
@@ -63,51 +51,25 @@ def get_arp2_timeout(s: VariableBinding):
     return 0, Integer(timeout)
 
 
-def get_next_arp2_timeout(s: VariableBinding):
-    s.oid = "1.3.6.1.3.1.1.2.2"
-    return *get_arp2_run(s), s.oid
-
-
 def set_arp2_timeout(s: VariableBinding):
     settings.set_setting("timeout", s.value.value)
     return 0, Integer(s.value.value)
 
 
-def another_proc_arp2_run(timeout):
-    settings.set_setting("arp2_run", True)
-    sniff(prn=arp2_monitor_callback, filter="arp", store=0, timeout=timeout)
-    settings.set_setting("arp2_run", False)
-
-
-def another_proc_icmp_run(ip):
-    settings.set_setting("icmp_run", True)
-    icmp_scan(ip_dst=ip, timeout=3)
-    settings.set_setting("icmp_run", False)
-
-
 def set_arp2_run(s: VariableBinding):
-    current = settings.get_setting("arp2_run")
-    if current:
-        return 5, Integer(current)  # Genéric Error
-    timeout: int = settings.get_setting("timeout")
-    # FIXME
-    """ Here u r executing a sudo command with parameter injection 
-    readed by a file that can be editted by network or local users"""
-    p = Process(target=another_proc_arp2_run, args=(timeout,))
-    p.start()
+    try:
+        scheduler.get_scheduler().submit(scheduler.arp2_job())
+    except RuntimeError:
+        return 5, Integer(s.value.value)  # Genéric Error
     return 0, Integer(s.value.value)
 
 
 def set_icmp_run(s: VariableBinding):
-    current = settings.get_setting("arp2_run")
-    if current:
+    try:
+        # Um pedido sobre uma faixa ja em varredura e aglutinado pelo agendador
+        scheduler.get_scheduler().submit(scheduler.icmp_job())
+    except RuntimeError:
         return 5, NoSuchObject()
-    ip: str = settings.get_setting("ip_address")
-    mask: str = settings.get_setting("ip_mask")
-    # FIXME
-    """It's executing as sudo"""
-    p = Process(target=another_proc_icmp_run, args=(ip + '/' + mask,))
-    p.start()
     return 0, Integer(s.value.value)
 
 
@@ -116,158 +78,102 @@ def get_arp2_run(s: VariableBinding):
     return 0, Integer(v)
 
 
-def get_next_arp2_run(s: VariableBinding):
-    print("GET NEXT ARP2 RUN")
-    if orm.count_history_line() > 0:
-        s.oid = "1.3.6.1.3.1.2.1.1"
-        return *get_table_history(s), s.oid
-    elif orm.count_device_line() > 0:
-        s.oid = "1.3.6.1.3.1.3.1.1"
-        return *get_table_device(s), s.oid
-    else:
-        return 2, NoSuchInstance(), s.oid
-
-
-def get_next_history(s: VariableBinding):
-    s.oid = "1.3.6.1.3.1.2.1.1"
-    return get_next_arp2_run(s)
-
-
 def get_icmp_run(s: VariableBinding):
     v: bool = settings.get_setting("icmp_run")
     return 0, Integer(v)
 
 
-def get_next_icmp_run(s: VariableBinding):
-    s.oid = "1.3.6.1.3.1.1.2.1"
-    return *get_arp2_timeout(s), s.oid
-
-
-def get_next_arp2(s: VariableBinding):
-    return get_next_icmp_run(s)
-
-
 def delete(s: VariableBinding):
     orm.drop_devices()
     return 0, Integer(True)
 
 
-def get_table_history(s: VariableBinding):
-    oid = s.oid.split(".")
-    if len(oid) != 9:
-        return 2, NoSuchInstance()
-    column, line = [int(i) for i in oid[-2:]]
-    value = get_history(line, column)
-    if value is None:
-        return 2, NoSuchInstance()
-    if column == 1:  # MAC
-        return 0, OctetString(value.replace(":", ""))
-    elif column == 2:  # IP
-        return 0, IPAddress(value)
-    elif column == 3:  # Discovered Method
-        return 0, OctetString(value)
-    elif column == 4:  # Discovery At
-        return 0, OctetString(str(value))
-    return 2, NoSuchInstance()
-
-
-def get_next_table_history(s: VariableBinding):
-
-    oid = s.oid.split(".")
-
-
-    if len(oid) != 9:
-        return 2, NoSuchInstance()
-    column, line = [int(i) for i in oid[-2:]]
-    print(column, line)
-    if line >= orm.count_history_line():
-        if column == 4:
-            s.oid = "1.3.6.1.3.1.3.1.1"
-            return *get_table_device(s), s.oid
-        elif 4 >= column > 0:
-            oid = oid[:-2] + [str(column+1), "1"]
-            s.oid = ".".join(oid)
-            print(f"INCREMENT LINE {s.oid}")
-            return *get_table_history(s), s.oid
-
-    else:
-        s_old = s.oid
-        oid = oid[:-2] + [str(column), str(line+1)]
-        print(oid)
-        s.oid = ".".join(oid)
-        print(f"INCREMENT Line {s_old} >> {s.oid} [{orm.count_history_line()}]")
-
-        return *get_table_history(s), s.oid
+def get_profiler_control(s: VariableBinding):
+    return 0, Integer(int(profiler.get_control().remaining))
 
-    return 2, NoSuchInstance(), s.oid
 
-
-def get_next_device(s: VariableBinding):
-    s.oid = "1.3.6.1.3.1.3.1.1"
-    return get_next_table_device(s)
-
-
-def get_next_table_device(s: VariableBinding):
-    oid = s.oid.split(".")
-    if len(oid) != 9:
-        return 2, NoSuchInstance()
-    column, line = [int(i) for i in oid[-2:]]
-
-    if line >= orm.count_device_line():
-        if column == 6:
-            return 0, EndOfMibView(), s.oid
-        elif 6 > column > 0:
-            oid = oid[:-2] + [str(column+1), "1"]
-            s.oid = ".".join(oid)
-            print(f"INCREMENT COLUMN {s.oid}")
-            return *get_table_device(s), s.oid
+def set_profiler_control(s: VariableBinding):
+    # N > 0 liga o profiler por N segundos, 0 interrompe a janela em andamento (em todos os workers)
+    if s.value.value > 0:
+        if not profiler.get_control().start(s.value.value):
+            return 5, Integer(s.value.value)  # Já existe uma janela em andamento
     else:
-        oid = oid[:-2] + [str(column), str(line+1)]
-        s.oid = ".".join(oid)
-        print(f"INCREMENT LINE {s.oid}")
-
-        return *get_table_device(s), s.oid
-
-    return 2, NoSuchInstance(), s.oid
+        profiler.get_control().stop()
+    return 0, Integer(s.value.value)
 
 
-def get_table_device(s: VariableBinding):
-    oid = s.oid.split(".")
-    if len(oid) != 9:
-        return 2, NoSuchInstance()
-    column, line = [int(i) for i in oid[-2:]]
-    try:
-        value = get_device(line, column)
-    except IndexError:
-        return 2, NoSuchInstance()
-    if value is None:
-        return 2, NoSuchInstance()
-    if column == 3:  # STATUS
-        return 0, OctetString(value)
-    elif column == 1:  # MAC
-        return 0, OctetString(value.replace(":", ""))
-    elif column == 2:  # IP
-        return 0, IPAddress(value)
-    elif column == 4:  # GATEWAY
-        return 0, Integer(value)
-    elif column == 5:  # FIRST CONN AT
-        return 0, OctetString(value)
-    elif column == 6:
-        return 0, Counter32(value)
-
-    return 2, NoSuchInstance()
-
-
-# GET_NEXT_REQUEST
-
-
-# ------ DATABASE ACCESS --------------
-def get_history(id_: int, column: int):
-    if line := orm.get_line_history(id_ - 1):
-        return line[column - 1] if len(line) > column else None
-
-
-def get_device(id_: int, column: int):
-    if line := orm.get_line_device(id_):  # FIXME Nomeia direito estas  funcoes
-        return line[column - 1] if len(line) >= column else None
-    return None
+def get_profiler_output(s: VariableBinding):
+    return 0, OctetString(profiler.get_control().last_output or "")
+
+
+def ip_value(value: str):
+    # IpAddress do SMI so comporta IPv4, enderecos IPv6 (descoberta NDP) sao enviados como texto
+    if ":" in value:
+        return OctetString(value)
+    return IPAddress(value)
+
+
+# ------ TABELAS --------------
+# Historico e dispositivos sao servidos de uma imagem em memoria, recarregada quando a geracao do banco muda;
+# o historico so recebe insercoes, entao a recarga busca apenas os registros novos
+history_rows = SnapshotRowSource(orm.all_history_rows, generation=orm.get_generation,
+                                 load_from=lambda index: orm.history_rows_after(index - 1, None))
+device_rows = SnapshotRowSource(orm.all_device_rows, generation=orm.get_generation)
+
+# scannerMIB 2: indice = id do registro no historico (1 = mais antigo; estavel enquanto novos registros chegam)
+history_table = Table(SUFFIX + "2", columns={
+    1: lambda row: OctetString(row[0].replace(":", "")),  # MAC
+    2: lambda row: ip_value(row[1]),  # IP
+    3: lambda row: OctetString(row[2]),  # Discovered Method
+    4: lambda row: OctetString(str(row[3])),  # Discovery At
+}, rows=history_rows)
+
+# scannerMIB 3: indice = id do dispositivo
+device_table = Table(SUFFIX + "3", columns={
+    1: lambda row: OctetString(row[0].replace(":", "")),  # MAC
+    2: lambda row: ip_value(row[1]),  # IP
+    3: lambda row: OctetString(row[2]),  # STATUS
+    4: lambda row: Integer(row[3]),  # GATEWAY
+    5: lambda row: OctetString(row[4]),  # FIRST CONN AT
+    6: lambda row: Counter32(row[5]),  # COUNT
+}, rows=device_rows)
+
+
+def _stats_rows():
+    # linha 1 = icmp, linha 2 = arp2, linha 3 = ndp
+    stats = scan_stats.get_stats()
+    return [(kind, stats.snapshot(kind)) for kind in scan_stats.SCAN_TYPES]
+
+
+def _counter(value: float) -> Counter32:
+    return Counter32(int(value) & 0xFFFFFFFF)
+
+
+# scannerMIB 5: scanStatsTable, entrada scanStatsEntry (5.1)
+stats_table = Table(SUFFIX + "5.1", columns={
+    2: lambda row: OctetString(row[0]),  # TYPE
+    3: lambda row: Gauge32(int(row[1]["targets"])),
+    4: lambda row: _counter(row[1]["probes_sent"]),
+    5: lambda row: _counter(row[1]["replies"]),
+    6: lambda row: _counter(row[1]["timeouts"]),
+    7: lambda row: _counter(row[1]["rows_written"]),
+    8: lambda row: Integer(row[1]["running"]),
+    9: lambda row: TimeTicks(int(row[1]["elapsed"] * 100)),
+    10: lambda row: TimeTicks(int(row[1]["last_duration"] * 100)),
+    11: lambda row: Gauge32(int(row[1]["packets_per_second"])),
+    12: lambda row: _counter(row[1]["runs"]),
+}, rows=SequenceRowSource(_stats_rows))
+
+
+# scannerMIB 6: agentLatencyTable, entrada agentLatencyEntry (6.1); linhas = (etapa, pdu, subarvore), histograma
+# No modo multiprocesso as linhas somam todos os workers, qualquer que seja o que atende a requisicao
+latency_table = Table(SUFFIX + "6.1", columns={
+    2: lambda row: OctetString(row[0][0]),  # STAGE
+    3: lambda row: OctetString(row[0][1]),  # PDU
+    4: lambda row: ObjectIdentifier(row[0][2] if "." in row[0][2] else "0.0"),  # SUBTREE
+    5: lambda row: _counter(row[1].count),
+    6: lambda row: _counter(row[1].total_ns // 1000),
+    7: lambda row: Gauge32(min(row[1].max_ns // 1000, 0xFFFFFFFF)),
+    8: lambda row: Gauge32(row[1].percentile(0.5)),
+    9: lambda row: Gauge32(row[1].percentile(0.99)),
+}, rows=SequenceRowSource(agent_rows))
@@ -1,62 +1,136 @@
 import asyncio
+from typing import Optional
 
-from snmp_agent import utils
+from snmp_agent import metrics, utils
+from snmp_agent.cache import ResponseCache
+from snmp_agent.metrics import request_metrics
+from snmp_agent.ratelimit import KeyedTokenBuckets
+from snmp_agent.registry import OidRegistry
 from snmp_agent.server import Server
 from snmp_agent.snmp import SNMPResponse, SNMPRequest, VariableBind
 
 import functions
+import notifier
+import orm
+import profiler
+import scan_stats
+import scheduler
+import settings
+from scheduler import ScanScheduler
+from supervisor import Supervisor
 
 SUFFIX = "1.3.6.1.3.1."
 
 
+# Montado uma unica vez; cada requisicao so consulta o registro
+registry = OidRegistry([
+    # ICMP SCAN
+    VariableBind(SUFFIX + "1.1.1", write=functions.set_ip_address_scan, read=functions.get_ip_address_scan),
+    VariableBind(SUFFIX + "1.1.2", write=functions.set_ip_mask_scan, read=functions.get_ip_mask_scan),
+    VariableBind(SUFFIX + "1.1.3", write=functions.set_icmp_run, read=functions.get_icmp_run),
+
+    # ARP_2 SCAN
+    VariableBind(SUFFIX + "1.2.1", write=functions.set_arp2_timeout, read=functions.get_arp2_timeout),
+    VariableBind(SUFFIX + "1.2.2", write=functions.set_arp2_run, read=functions.get_arp2_run),
+
+    # TABLE HISTORY
+    functions.history_table,
+
+    # TABLE DEVICE
+    functions.device_table,
+
+    # DELETE
+    VariableBind(SUFFIX + "4", write=functions.delete),
+
+    # TABLE SCAN STATS
+    functions.stats_table,
+
+    # TABLE AGENT LATENCY
+    functions.latency_table,
+
+    # PROFILER
+    VariableBind(SUFFIX + "7.1", write=functions.set_profiler_control, read=functions.get_profiler_control),
+    VariableBind(SUFFIX + "7.2", read=functions.get_profiler_output),
+])
+
+
+def _cache_generation():
+    # Muda com escritas no banco e no conf.json (flags de execucao, SETs) feitas por qualquer processo:
+    # no modo multiprocesso o fim de uma varredura, no processo pai, tambem invalida o cache dos workers
+    return orm.get_generation(), settings.modified()
+
+
+# Opcional e desligado por padrao: {"<subarvore>": ttl em segundos} em "response_cache_ttl" no conf.json
+_ttls = settings.get_setting("response_cache_ttl", {})
+response_cache = ResponseCache(_ttls, generation=_cache_generation) if _ttls else None
+
+
+# Teto de max-repetitions e tamanho maximo (octetos) das respostas de GetBulk
+_max_repetitions = settings.get_setting("bulk_max_repetitions", utils.MAX_REPETITIONS)
+_max_message_size = settings.get_setting("max_message_size", utils.MAX_MESSAGE_SIZE)
+
+
 async def handler(req: SNMPRequest) -> SNMPResponse:
-    v_list = {
-        # INTERMEDIATE NOTES (SNMPWALK)
-        SUFFIX[:-1]: VariableBind(SUFFIX[:-1], get_next=functions.get_next_root),
-        SUFFIX+"1": VariableBind(SUFFIX+"1", get_next=functions.get_next_root),
-        SUFFIX+"1.1": VariableBind(SUFFIX+"1.1", get_next=functions.get_next_root),
-        SUFFIX+"1.2": VariableBind(SUFFIX+"1.2", get_next=functions.get_next_arp2),
-        SUFFIX+"2": VariableBind(SUFFIX+"2", get_next=functions.get_next_history),
-        SUFFIX+"3": VariableBind(SUFFIX+"3", get_next=functions.get_next_device),
-
-        # ICMP SCAN
-        SUFFIX + "1.1.1": VariableBind(SUFFIX + "1.1.1", write=functions.set_ip_address_scan,
-                                       read=functions.get_ip_address_scan, get_next=functions.get_next_ip_adrress_scan),
-        SUFFIX + "1.1.2": VariableBind(SUFFIX + "1.1.2", write=functions.set_ip_mask_scan,
-                                       read=functions.get_ip_mask_scan, get_next=functions.get_next_ip_mask_scan),
-        SUFFIX + "1.1.3": VariableBind(SUFFIX + "1.1.3", write=functions.set_icmp_run,
-                                       read=functions.get_icmp_run, get_next=functions.get_next_icmp_run),
-
-        # ARP_2 SCAN
-        SUFFIX + "1.2.1": VariableBind(SUFFIX + "1.2.1", write=functions.set_arp2_timeout,
-                                       read=functions.get_arp2_timeout, get_next=functions.get_next_arp2_timeout),
-        SUFFIX + "1.2.2": VariableBind(SUFFIX + "1.2.2", write=functions.set_arp2_run,
-                                       read=functions.get_arp2_run, get_next=functions.get_next_arp2_run),
-
-        # TABLE HISTORY
-        SUFFIX + "2.": VariableBind(SUFFIX + "2", read=functions.get_table_history, use_start_with=True,
-                                   get_next=functions.get_next_table_history),
-
-        # TABLE DEVICE
-        SUFFIX + "3.": VariableBind(SUFFIX + "3", read=functions.get_table_device, use_start_with=True,
-                                   get_next=functions.get_next_table_device),
-
-        # DELETE
-        SUFFIX + "4": VariableBind(SUFFIX + "4", write=functions.delete),
-    }
-    res_vbs, error_status, error_index = utils.handle_request(req=req, vbs=v_list)
+    profiler.poll()
+    res_vbs, error_status, error_index = utils.handle_request(req=req, vbs=registry, cache=response_cache,
+                                                              max_repetitions=_max_repetitions,
+                                                              max_size=_max_message_size)
 
     res = req.create_response(res_vbs, error_status, error_index)
 
     return res
 
 
-async def main():
-    sv = Server(handler=handler, host='0.0.0.0', port=161)
+async def serve(reuse_port: bool = False, metrics_file: Optional[str] = None):
+    # Limites opcionais (desligados por padrao) por origem e por community: {"rate": fichas/s, "burst": fichas}
+    rate_limit = settings.get_setting("rate_limit", {})
+    source_limit = KeyedTokenBuckets(**rate_limit["per_source"]) if rate_limit.get("per_source") else None
+    community_limit = KeyedTokenBuckets(**rate_limit["per_community"]) if rate_limit.get("per_community") else None
+    sv = Server(handler=handler, host='0.0.0.0', port=161,
+                max_in_flight=settings.get_setting("max_in_flight", 256), reuse_port=reuse_port,
+                metrics=request_metrics, source_limit=source_limit, community_limit=community_limit)
     await sv.start()
+    # Os histogramas e os contadores do servidor sao gravados periodicamente para o agent-stats do netscan_cli
+    metrics_file = metrics_file or settings.get_setting("metrics_file", "agent_metrics.json")
+    interval = settings.get_setting("metrics_interval", 10)
     while True:
-        await asyncio.sleep(3600)
-
-
-loop = asyncio.get_event_loop()
-loop.run_until_complete(main())
+        await asyncio.sleep(interval)
+        request_metrics.dump(metrics_file, counters=sv.protocol.counters)
+
+
+def serve_worker(index: int, jobs, stats_array, profiler_array):
+    # Processo filho do supervisor: as varreduras ficam com o agendador do processo pai
+    scan_stats.install(stats_array)
+    scheduler.install(scheduler.JobForwarder(jobs))
+    profiler.install_signal()
+    profiler.install_control(profiler_array)
+    metrics_file = settings.get_setting("metrics_file", "agent_metrics.json")
+    metrics.install_shared(metrics_file, own=f"{metrics_file}.{index}")
+    asyncio.run(serve(reuse_port=True, metrics_file=f"{metrics_file}.{index}"))
+
+
+def main():
+    # O fim de uma varredura (flags no conf.json, escritas no banco) invalida o cache de respostas pela
+    # geracao (_cache_generation), sem tocar no cache a partir da thread de resultados do pool
+    scan_scheduler = ScanScheduler(workers=settings.get_setting("scan_workers", 2),
+                                   schedule=settings.get_setting("schedule", []))
+    scan_scheduler.start()
+    scheduler.install(scan_scheduler)
+    profiler.install_signal()
+    # Traps de mudanca de status: uma unica thread, no processo principal (mesmo no modo multiprocesso)
+    if (device_notifier := notifier.from_settings(settings.get_setting("notifications", {}))) is not None:
+        device_notifier.start()
+
+    agent_workers = settings.get_setting("agent_workers", 1)
+    try:
+        if agent_workers > 1:
+            Supervisor(serve_worker, agent_workers, scan_scheduler).run()
+        else:
+            asyncio.run(serve())
+    finally:
+        scan_scheduler.stop()
+
+
+if __name__ == '__main__':
+    # O pool de varredura e os workers do agente usam "spawn", que reimporta este modulo nos filhos
+    main()
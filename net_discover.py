@@ -1,9 +1,57 @@
+import logging
+import time
+from ipaddress import ip_network
+from typing import Callable, List, Dict, Optional
+
 from scapy.config import conf
 from scapy.layers.inet import ICMP, IP
+from scapy.layers.inet6 import IPv6, ICMPv6EchoRequest, ICMPv6EchoReply, ICMPv6ND_NA, ICMPv6NDOptDstLLAddr
 from scapy.layers.l2 import ARP, Ether
-from scapy.sendrecv import srp
+from scapy.sendrecv import srp, sniff, sendp, AsyncSniffer
+
+import rtt
+import scan_planner
+import scan_stats
+from orm import save, EnumMethods, get_rtt_estimates, save_rtt_estimates, get_scan_targets, save_probe_results
+from scan_stats import ScanStats, get_stats
+
+logger = logging.getLogger(__name__)
+
+
+class Wire(object):
+    """
+    Envio e recepcao de pacotes usados pelas varreduras (scapy, exige root e uma rede). Pode ser trocada
+    por `install_wire`, ex.: pelo respondedor simulado de benchmarks.discovery_ingest.
+    """
+
+    def srp(self, packets, timeout: float):
+        """Envia e casa as respostas; retorna (pares (enviado, recebido), enviados sem resposta)"""
+        return srp(packets, timeout=timeout, verbose=0)
+
+    def sniff(self, prn: Callable, filter: str, timeout: float):
+        sniff(prn=prn, filter=filter, store=0, timeout=timeout)
+
+    def sendp(self, packet, iface=None):
+        sendp(packet, iface=iface, verbose=0)
+
+    def async_sniffer(self, prn: Callable, filter: str, iface=None):
+        """Objeto com start() e stop()"""
+        return AsyncSniffer(prn=prn, filter=filter, store=0, iface=iface)
 
-from orm import save, EnumMethods
+
+_wire: Optional[Wire] = None
+
+
+def install_wire(wire: Wire):
+    global _wire
+    _wire = wire
+
+
+def get_wire() -> Wire:
+    global _wire
+    if _wire is None:
+        _wire = Wire()
+    return _wire
 
 
 def get_gateway_ip():
@@ -15,24 +63,145 @@ arp2_callback_aux = set()
 
 def arp2_monitor_callback(pkt):
     if pkt[ARP].op == 2:
+        stats = get_stats()
+        stats.add("arp2", scan_stats.REPLIES)
         if pkt[ARP].hwsrc in arp2_callback_aux:
             return
         arp2_callback_aux.add(pkt[ARP].hwsrc)
-        print(f"ARP Reply: IP {pkt[ARP].psrc} - MAC {pkt[ARP].hwsrc}")
-        save(ip=pkt[ARP].psrc, mac=pkt[ARP].hwsrc, gateway=(pkt[ARP].psrc == get_gateway_ip()),
-             method=EnumMethods.ARP_2)
+        logger.debug("ARP Reply: IP %s - MAC %s", pkt[ARP].psrc, pkt[ARP].hwsrc)
+        if save(ip=pkt[ARP].psrc, mac=pkt[ARP].hwsrc, gateway=(pkt[ARP].psrc == get_gateway_ip()),
+                method=EnumMethods.ARP_2):
+            stats.add("arp2", scan_stats.ROWS_WRITTEN)
+
+
+def arp2_sniff(timeout):
+    """Escuta respostas ARP por `timeout` segundos"""
+    stats = get_stats()
+    arp2_callback_aux.clear()
+    stats.begin("arp2")
+    try:
+        get_wire().sniff(prn=arp2_monitor_callback, filter="arp", timeout=timeout)
+    finally:
+        stats.end("arp2")
+
+
+def get_gateway_ipv6():
+    try:
+        return conf.route6.route("::")[2]
+    except Exception:
+        return None
 
 
-def icmp_scan(ip_dst="192.168.0.100/28", timeout=3):
-    ans, unans = srp(Ether() / IP(dst=ip_dst) / ICMP(), timeout=timeout)
-    for sent, received in ans:
-        mac_ = received[Ether].src
-        gateway_ = get_gateway_ip()
+ndp_callback_aux = set()
 
-        save(ip=received[IP].src, mac=mac_, gateway=(received[IP].src == gateway_),
-             method=EnumMethods.ICMP_ECHO_RESPONSE)
 
+def ndp_monitor_callback(pkt):
+    """Registra respostas ao echo multicast e Neighbor Advertisements, correlacionados ao Device pelo MAC"""
+    if ICMPv6EchoReply in pkt:
+        ip, mac, method = pkt[IPv6].src, pkt[Ether].src, EnumMethods.ICMPV6_ECHO_RESPONSE
+    elif ICMPv6ND_NA in pkt:
+        ip, method = pkt[ICMPv6ND_NA].tgt, EnumMethods.NDP_ADVERTISEMENT
+        mac = pkt[ICMPv6NDOptDstLLAddr].lladdr if ICMPv6NDOptDstLLAddr in pkt else pkt[Ether].src
+    else:
+        return
+    stats = get_stats()
+    stats.add("ndp", scan_stats.REPLIES)
+    if (mac, ip) in ndp_callback_aux:
+        return
+    ndp_callback_aux.add((mac, ip))
+    if save(ip=ip, mac=mac, gateway=(ip == get_gateway_ipv6()), method=method):
+        stats.add("ndp", scan_stats.ROWS_WRITTEN)
+
+
+def ndp_scan(timeout=5, iface=None):
+    """
+    Descoberta IPv6: um unico ICMPv6 echo para ff02::1 (todos os nos do enlace) e escuta passiva de
+    respostas e Neighbor Advertisements durante `timeout` segundos. Varrer um /64 endereco a endereco
+    e inviavel, entao os vizinhos se anunciam.
+    """
+    stats = get_stats()
+    ndp_callback_aux.clear()
+    stats.begin("ndp")
+    wire = get_wire()
+    sniffer = wire.async_sniffer(prn=ndp_monitor_callback, filter="icmp6", iface=iface)
+    sniffer.start()
+    try:
+        wire.sendp(Ether(dst="33:33:00:00:00:01") / IPv6(dst="ff02::1") / ICMPv6EchoRequest(), iface=iface)
+        stats.probes("ndp", 1)
+        time.sleep(timeout)
+    finally:
+        sniffer.stop()
+        stats.end("ndp")
+
+
+def expand_targets(ip_dst: str) -> List[str]:
+    network = ip_network(ip_dst, strict=False)
+    if network.num_addresses == 1:
+        return [str(network.network_address)]
+    return [str(h) for h in network.hosts()]
+
+
+def icmp_scan(ip_dst="192.168.0.100/28", timeout=3, retries=2):
+    """
+    Varredura ICMP com timeout adaptativo.
+    O tempo de espera de cada rodada e derivado do RTT suavizado dos hosts (e da sub-rede), aprendido nas
+    varreduras anteriores; `timeout` e apenas o limite superior. Somente os hosts que nao responderam
+    sao reenviados, ate `retries` vezes, antes de serem registrados como timeout.
+    """
+    return icmp_probe(expand_targets(ip_dst), timeout=timeout, retries=retries)
+
+
+def icmp_incremental_scan(ip_dst="192.168.0.100/28", budget=64, timeout=3, retries=2):
+    """Sonda somente os `budget` alvos mais atrasados da faixa, conforme scan_planner"""
+    ips = expand_targets(ip_dst)
+    targets = scan_planner.plan(ips, get_scan_targets(ips), budget)
+    return icmp_probe(targets, timeout=timeout, retries=retries)
+
+
+def icmp_probe(targets: List[str], timeout=3, retries=2) -> Dict[str, bool]:
+    stats = get_stats()
+    stats.begin("icmp", len(targets))
+    try:
+        return _icmp_probe(targets, timeout, retries, stats)
+    finally:
+        stats.end("icmp")
+
+
+def _icmp_probe(targets: List[str], timeout, retries, stats: ScanStats) -> Dict[str, bool]:
+    if not targets:
+        return {}
+    estimates = {ip: rtt.RttEstimate(*e) for ip, e in get_rtt_estimates(targets).items()}
+    subnets = rtt.subnet_estimates(estimates)
+    gateway_ = get_gateway_ip()
+
+    updated: Dict[str, rtt.RttEstimate] = {}
+    pending = targets
+    unans = []
+    for attempt in range(retries + 1):
+        wait = rtt.round_timeout(pending, estimates, subnets, timeout, attempt)
+        stats.probes("icmp", len(pending))
+        ans, unans = get_wire().srp(Ether() / IP(dst=pending) / ICMP(), timeout=wait)
+        stats.add("icmp", scan_stats.REPLIES, len(ans))
+        for sent, received in ans:
+            ip = received[IP].src
+            mac_ = received[Ether].src
+            updated[ip] = rtt.update(updated.get(ip, estimates.get(ip)), received.time - sent.sent_time)
+
+            if save(ip=ip, mac=mac_, gateway=(ip == gateway_), method=EnumMethods.ICMP_ECHO_RESPONSE):
+                stats.add("icmp", scan_stats.ROWS_WRITTEN)
+
+        pending = [sent[IP].dst for sent in unans]
+        if not pending:
+            break
+
+    save_rtt_estimates(updated)
+
+    stats.add("icmp", scan_stats.TIMEOUTS, len(unans))
     for sent in unans:
-        print(sent[IP].dst)
         if sent[IP].dst != sent[IP].src:  # Evita que diga que o próprio dispositivo está offline
-            save(ip=sent[IP].dst, method=EnumMethods.ICMP_ECHO_RESPONSE_TIMEOUT)
+            if save(ip=sent[IP].dst, method=EnumMethods.ICMP_ECHO_RESPONSE_TIMEOUT):
+                stats.add("icmp", scan_stats.ROWS_WRITTEN)
+
+    results = {ip: ip in updated for ip in targets}
+    save_probe_results(results)
+    return results
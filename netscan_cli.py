@@ -1,29 +1,108 @@
 #!/usr/bin/python3
-import click
-from scapy.sendrecv import sniff
+import time
 
-from net_discover import icmp_scan, arp2_monitor_callback
-import orm
-import settings
+# Marcado antes dos demais imports: --profile-startup mede quanto deles vai no arranque (por isso os E402)
+_started = time.perf_counter()
+
+import glob  # noqa: E402
+import sys  # noqa: E402
+from datetime import datetime, timedelta  # noqa: E402
+from ipaddress import ip_network  # noqa: E402
+
+import click  # noqa: E402
+import tabulate  # noqa: E402
+
+# net_discover (e o scapy inteiro) so e importado pelos comandos de varredura
+import orm  # noqa: E402
+import settings  # noqa: E402
 
 
 @click.group()
-def cli():
-    pass
+@click.option('--profile-startup', is_flag=True, help='Report where the startup time went (imports, database, command)')
+@click.pass_context
+def cli(ctx, profile_startup):
+    if profile_startup:
+        ready = time.perf_counter()
+        ctx.call_on_close(lambda: _startup_report(ready))
+
+
+def _startup_report(ready: float):
+    """Tempos desde o inicio da importacao deste modulo; o arranque do interpretador nao entra (ver python -X importtime)"""
+    finished = time.perf_counter()
+    rows = [["imports", round((ready - _started) * 1000, 1)],
+            ["database init", round(orm.schema_init_seconds * 1000, 1)],
+            ["command", round((finished - ready - orm.schema_init_seconds) * 1000, 1)],
+            ["total", round((finished - _started) * 1000, 1)]]
+    click.echo(tabulate.tabulate(rows, headers=["PHASE", "MS"]), err=True)
+    click.echo(f"modules loaded: {len(sys.modules)}, scapy loaded: {'scapy' in sys.modules}", err=True)
+
+
+STATUSES = ("ONLINE", "ONLINE(NEW)", "OFFLINE", "RECONNECTED")
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_duration(ctx, param, value):
+    """'90s', '15m', '2h', '7d'"""
+    if value is None:
+        return None
+    try:
+        return timedelta(seconds=float(value[:-1]) * DURATION_UNITS[value[-1]])
+    except (KeyError, ValueError, IndexError):
+        raise click.BadParameter("expected a number followed by s, m, h or d (e.g. 30m)")
+
+
+def parse_subnet(ctx, param, value):
+    if value is None:
+        return None
+    try:
+        network = ip_network(value, strict=False)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+    if network.version != 4:
+        raise click.BadParameter("only IPv4 subnets are supported")
+    return network
 
 
 @cli.command()
-def view():
+@click.option('--status', multiple=True, type=click.Choice(STATUSES, case_sensitive=False),
+              help='Only devices with this status (repeatable)')
+@click.option('--vendor', default=None, help='Only devices whose MAC vendor name contains this text')
+@click.option('--subnet', default=None, callback=parse_subnet, help='Only devices whose current IP is in this CIDR')
+@click.option('--gateway/--no-gateway', default=None, help='Only gateways / only non-gateways')
+@click.option('--seen-within', default=None, callback=parse_duration,
+              help='Only devices observed within this window (e.g. 30m, 2h, 7d)')
+@click.option('--sort', type=click.Choice(orm.DEVICE_SORT_KEYS), default=None,
+              help='Sort key (default: last-seen, most recent first)')
+@click.option('--desc', is_flag=True, help='Descending order for --sort')
+@click.option('--limit', type=click.IntRange(min=0), default=None, help='Maximum number of devices shown')
+@click.option('--offset', type=click.IntRange(min=0), default=0, help='Number of devices skipped')
+def view(status, vendor, subnet, gateway, seen_within, sort, desc, limit, offset):
     """Visualização dos dispositivos conhecidos na rede"""
-    click.echo(orm.get_devices())
+    from vendor_solver import vendor_prefixes
+
+    click.echo(orm.get_devices(
+        status=[s.upper() for s in status],
+        vendor_prefixes=vendor_prefixes(vendor) if vendor is not None else None,
+        subnet=subnet, gateway=gateway,
+        seen_since=datetime.now() - seen_within if seen_within is not None else None,
+        sort=sort or "last-seen", descending=desc if sort else True,
+        limit=limit, offset=offset))
 
 
 @cli.command()
-@click.option('--timeout', default=1, help='Time to consider a ICMP response as timeout')
+@click.option('--timeout', default=1, help='Upper bound for the adaptive ICMP response timeout')
 @click.option('--ip', default='192.168.0.100/28', help='IP range to send packets')
-def icmp(ip, timeout):
+@click.option('--retries', default=2, help='Retransmissions sent only to hosts that did not answer')
+@click.option('--incremental', is_flag=True, help='Probe only the stalest/least stable addresses of the range')
+@click.option('--budget', default=64, help='Maximum number of targets probed by an incremental scan')
+def icmp(ip, timeout, retries, incremental, budget):
     """Procedimento de descoberta de rede via mensagens icmp"""
-    icmp_scan(ip_dst=ip, timeout=timeout)
+    from net_discover import icmp_scan, icmp_incremental_scan
+
+    if incremental:
+        icmp_incremental_scan(ip_dst=ip, budget=budget, timeout=timeout, retries=retries)
+    else:
+        icmp_scan(ip_dst=ip, timeout=timeout, retries=retries)
     orm.get_line_device.cache_clear()
 
 
@@ -31,11 +110,34 @@ def icmp(ip, timeout):
 @click.option('--timeout', default=1, help='Time to consider a ICMP response as timeout')
 def arp_response(timeout):
     """Descoberta da rede por meio de escuta de respostas arp (considera somente campos source)"""
+    from net_discover import arp2_sniff
+
     settings.set_setting("arp2_run", True)
-    sniff(prn=arp2_monitor_callback, filter="arp", store=0, timeout=timeout)
+    arp2_sniff(timeout=timeout)
     settings.set_setting("arp2_run", False)
     orm.get_line_device.cache_clear()
 
+
+@cli.command()
+@click.option('--timeout', default=5, help='Time listening for ICMPv6 echo replies and neighbor advertisements')
+@click.option('--iface', default=None, help='Interface used to send the multicast echo')
+def ndp(timeout, iface):
+    """Descoberta IPv6 via echo multicast (ff02::1) e escuta de neighbor advertisements"""
+    from net_discover import ndp_scan
+
+    ndp_scan(timeout=timeout, iface=iface)
+    orm.get_line_device.cache_clear()
+
+
+@cli.command()
+@click.option('--interval', default=2.0, type=click.FloatRange(min=0.1), help='Seconds between refreshes')
+def watch(interval):
+    """Acompanha os dispositivos, lendo so as observacoes novas e redesenhando so as linhas alteradas"""
+    import watcher
+
+    watcher.run(interval=interval)
+
+
 @cli.command()
 @click.argument("mac_address")
 def history(mac_address):
@@ -51,5 +153,28 @@ def clear():
     orm.get_line_device.cache_clear()
 
 
+@cli.command()
+@click.option('--file', 'metrics_file', default=None,
+              help='Metrics file written by the agent (default: the metrics_file setting)')
+def agent_stats(metrics_file):
+    """Latencia do agente SNMP por etapa, PDU e subarvore e contadores do servidor (somando todos os processos)"""
+    from snmp_agent.metrics import Metrics
+
+    metrics_file = metrics_file or settings.get_setting("metrics_file", "agent_metrics.json")
+    paths = [path for path in glob.glob(f"{metrics_file}*") if not path.endswith(".tmp")]
+    if not paths:
+        raise click.ClickException(f"No metrics file found at {metrics_file}")
+    metrics = Metrics.load(paths)
+    rows = [[subtree, pdu, stage, h.count, round(h.total_ns / h.count / 1000, 1) if h.count else 0,
+             h.percentile(0.5), h.percentile(0.99), round(h.max_ns / 1000, 1)]
+            for (stage, pdu, subtree), h in metrics.rows()]
+    click.echo(tabulate.tabulate(rows, headers=["SUBTREE", "PDU", "STAGE", "COUNT", "MEAN_US", "P50_US", "P99_US",
+                                                "MAX_US"]))
+    if metrics.counters:
+        # received, responded, dropped (max_in_flight), malformed, errors, rate_limited_source/community
+        click.echo()
+        click.echo(tabulate.tabulate(sorted(metrics.counters.items()), headers=["COUNTER", "VALUE"]))
+
+
 if __name__ == '__main__':
     cli()
@@ -0,0 +1,99 @@
+"""
+Notificacoes de mudanca de status dos dispositivos (traps scannerMIB 0.1-0.3).
+
+Uma thread do processo principal do agente compara, a cada `interval` segundos, o status de cada
+dispositivo com o da verificacao anterior; a tabela so e relida quando a geracao do banco muda. As
+mudancas de um intervalo formam um lote (um evento por dispositivo, com o status mais recente) e cada
+evento passa pelo token bucket do NotificationSender: o excedente e descartado e contado.
+
+Configuracao em conf.json:
+    "notifications": {"receivers": [{"host": "10.0.0.5", "port": 162, "community": "public", "inform": false}],
+                      "interval": 2, "rate": 5, "burst": 20, "timeout": 1, "retries": 2}
+"""
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import functions
+import orm
+from snmp_agent.notification import NotificationSender, Receiver
+from snmp_agent.ratelimit import TokenBucket
+from snmp_agent.snmp import VariableBinding
+
+logger = logging.getLogger(__name__)
+
+ENTERPRISE = "1.3.6.1.3.1"  # scannerMIB
+# status (orm.device_status) -> numero do TRAP-TYPE; ONLINE e o estado estavel e nao gera notificacao
+TRAPS = {"ONLINE(NEW)": 1, "OFFLINE": 2, "RECONNECTED": 3}
+
+
+def trap_oid(status: str) -> str:
+    # Mapeamento de TRAP-TYPE (SMIv1) para snmpTrapOID: enterprise.0.specific (RFC 3584)
+    return f"{ENTERPRISE}.0.{TRAPS[status]}"
+
+
+def status_changes(previous: Dict[int, str], rows: List[Tuple[int, List]]) -> List[Tuple[int, List]]:
+    """Linhas cujo status mudou (ou que surgiram) e que correspondem a uma notificacao"""
+    return [(index, row) for index, row in rows if row[2] in TRAPS and previous.get(index) != row[2]]
+
+
+class DeviceNotifier(object):
+    def __init__(self, sender: NotificationSender, interval: float = 2.0):
+        self.sender = sender
+        self.interval = interval
+        self._statuses: Dict[int, str] = {}
+        self._generation = None
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        # O estado atual e a referencia: so mudancas posteriores ao inicio do agente sao notificadas
+        self._generation = orm.get_generation()
+        self._statuses = {index: row[2] for index, row in orm.all_device_rows()}
+        self._thread = threading.Thread(target=self._loop, name="device-notifier", daemon=True)
+        self._thread.start()
+        logger.info("Device notifier started for %s", self.sender.receivers)
+
+    def stop(self):
+        self._stopped.set()
+
+    def _loop(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("Device notifier poll failed")
+
+    def poll(self) -> int:
+        """Verifica mudancas e envia o lote; retorna o numero de notificacoes enviadas"""
+        generation = orm.get_generation()
+        if generation == self._generation:
+            return 0
+        self._generation = generation
+        rows = orm.all_device_rows()
+        changes = status_changes(self._statuses, rows)
+        self._statuses = {index: row[2] for index, row in rows}
+
+        sent = 0
+        for index, row in changes:
+            if self.sender.send(trap_oid(row[2]), self.variable_bindings(index, row), enterprise=ENTERPRISE):
+                sent += 1
+        if len(changes) > sent:
+            logger.warning("%d device notifications dropped by the rate limit", len(changes) - sent)
+        return sent
+
+    @staticmethod
+    def variable_bindings(index: int, row: List) -> List[VariableBinding]:
+        # deviceMac, deviceIp e deviceStatus da linha, com os mesmos valores servidos pela deviceTable
+        columns = functions.device_table.columns
+        return [VariableBinding(f"{functions.SUFFIX}3.{column}.{index}", columns[column](row)) for column in (1, 2, 3)]
+
+
+def from_settings(config: Dict[str, Any]) -> Optional[DeviceNotifier]:
+    if not config.get("receivers"):
+        return None
+    receivers = [Receiver(**receiver) for receiver in config["receivers"]]
+    limiter = TokenBucket(rate=config.get("rate", 5), burst=config.get("burst", 20))
+    sender = NotificationSender(receivers, limiter=limiter, timeout=config.get("timeout", 1),
+                                retries=config.get("retries", 2))
+    return DeviceNotifier(sender, interval=config.get("interval", 2))
@@ -1,23 +1,45 @@
 # Generated by ChatGPT, version October 2024, on 2024-10-17
 import functools
+import logging
+import os
+import threading
+import time
 from datetime import datetime
 from enum import Enum
-from typing import List, Sequence, Any, Dict, Union
+from ipaddress import IPv4Address, IPv4Network
+from typing import List, Sequence, Any, Dict, Optional, Union, Tuple
 
 import tabulate
-from sqlalchemy import create_engine, Integer, String, Boolean, DateTime, ForeignKey, delete
-from sqlalchemy import select
+from sqlalchemy import create_engine, event, Integer, String, Boolean, DateTime, Float, ForeignKey, delete
+from sqlalchemy import Column, Index, MetaData, Table, and_, bindparam, case, inspect, not_, select, func, text, update
 from sqlalchemy.orm import declarative_base, mapped_column, Mapped, relationship, Session, joinedload
 
+from snmp_agent.metrics import add_io
 from vendor_solver import vendor_solver
 
+logger = logging.getLogger(__name__)
+
 
 class EnumMethods(Enum):
+    ICMPV6_ECHO_RESPONSE = 5
+    NDP_ADVERTISEMENT = 4
     ICMP_ECHO_RESPONSE = 3
     ARP_2 = 2
     ICMP_ECHO_RESPONSE_TIMEOUT = 1
 
 
+METHOD_DESCRIPTIONS = {
+    EnumMethods.ICMP_ECHO_RESPONSE_TIMEOUT: "Uma requisição icmp echo não é respondida a tempo. "
+                                            "O dispositivo é considerado desconectado da rede",
+    EnumMethods.ARP_2: "ARP RESPONSE(opcode 2) - a partir do campo src mac e src ip afere um dispositivo na rede",
+    EnumMethods.ICMP_ECHO_RESPONSE: "A partir da resposta de um ICMP echo  afere um dispositivo na rede",
+    EnumMethods.NDP_ADVERTISEMENT: "Neighbor Advertisement (NDP) - a partir do endereco alvo e do endereco de "
+                                   "enlace afere um dispositivo IPv6 na rede",
+    EnumMethods.ICMPV6_ECHO_RESPONSE: "Resposta a um ICMPv6 echo enviado para ff02::1 (todos os nos) "
+                                      "afere um dispositivo IPv6 na rede",
+}
+
+
 # Define o modelo base
 Base = declarative_base()
 
@@ -27,9 +49,19 @@ class Device(Base):
     __tablename__ = 'devices'
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    mac_addr: Mapped[str] = mapped_column(String, nullable=False)
+    mac_addr: Mapped[str] = mapped_column(String, nullable=False, index=True)
     gateway: Mapped[bool] = mapped_column(Boolean, nullable=False)
 
+    # Resumo do historico, mantido por save() a cada observacao: listagens e filtros (view, watch, tabela
+    # de dispositivos do agente) leem so esta tabela, sem percorrer device_networks
+    last_ip: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    last_ip_num: Mapped[Optional[int]] = mapped_column(Integer, nullable=True, index=True)
+    first_seen_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    last_seen_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True, index=True)
+    observations: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    last_active: Mapped[Optional[bool]] = mapped_column(Boolean, nullable=True)
+    status: Mapped[Optional[str]] = mapped_column(String, nullable=True, index=True)
+
     # Relação com DeviceNetwork (um Device pode ter várias entradas em DeviceNetwork)
     networks = relationship("DeviceNetwork", back_populates="device", foreign_keys="DeviceNetwork.device_id")
 
@@ -57,6 +89,8 @@ class DiscoveryMethod(Base):
 # Define a tabela DeviceNetwork como um modelo
 class DeviceNetwork(Base):
     __tablename__ = 'device_networks'
+    # Historico de um dispositivo em ordem de tempo (status, history, view)
+    __table_args__ = (Index("ix_device_networks_device_id_discovered_at", "device_id", "discovered_at"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
 
@@ -70,7 +104,9 @@ class DeviceNetwork(Base):
                                     foreign_keys=[discovery_method_id])
 
     ip: Mapped[str] = mapped_column(String, nullable=False)
-    discovered_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    # Endereco IPv4 como inteiro, para filtrar por sub-rede com uma busca por intervalo; NULL para IPv6
+    ip_num: Mapped[Optional[int]] = mapped_column(Integer, nullable=True, index=True)
+    discovered_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
 
     def __init__(self):
         self.discovered_at = datetime.now()  # Atribui a hora atual
@@ -85,9 +121,167 @@ class DeviceNetwork(Base):
                 )
 
 
-# Cria a engine SQLite
-engine = create_engine('sqlite:///network_discovery.db')
-Base.metadata.create_all(engine)
+# Estimativa de RTT por host, usada para ajustar o timeout das varreduras ICMP
+class HostRtt(Base):
+    __tablename__ = 'host_rtt'
+
+    ip: Mapped[str] = mapped_column(String, primary_key=True)
+    srtt: Mapped[float] = mapped_column(Float, nullable=False)
+    rttvar: Mapped[float] = mapped_column(Float, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<HostRtt(ip='{self.ip}', srtt={self.srtt}, rttvar={self.rttvar})>"
+
+
+# Estado de cada endereco varrido, usado pela varredura incremental para priorizar os alvos
+class ScanTarget(Base):
+    __tablename__ = 'scan_targets'
+
+    ip: Mapped[str] = mapped_column(String, primary_key=True)
+    last_probed_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    alive: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    ever_alive: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    flaps: Mapped[float] = mapped_column(Float, nullable=False)  # contagem de trocas de estado com decaimento
+    stable_runs: Mapped[int] = mapped_column(Integer, nullable=False)  # sondagens seguidas no mesmo estado
+
+    def __repr__(self):
+        return f"<ScanTarget(ip='{self.ip}', alive={self.alive}, flaps={self.flaps})>"
+
+
+# Contador incrementado a cada escrita em devices/device_network; leitores (cache e snapshot do agente)
+# comparam o valor para saber se seus dados ainda valem
+class StorageGeneration(Base):
+    __tablename__ = 'storage_generation'
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    generation: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    def __repr__(self):
+        return f"<StorageGeneration(generation={self.generation})>"
+
+
+# Cria a engine SQLite; NETSCAN_DB_URL aponta para outro banco (ex.: os bancos sinteticos dos benchmarks)
+DATABASE_URL = os.environ.get("NETSCAN_DB_URL", 'sqlite:///network_discovery.db')
+engine = create_engine(DATABASE_URL)
+
+
+@event.listens_for(engine, "connect")
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL: os workers do agente leem enquanto as varreduras escrevem, sem bloqueio mutuo
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
+# Tempo das consultas contabilizado na etapa "db" da requisicao SNMP em andamento (snmp_agent.metrics)
+@event.listens_for(engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_start"] = time.perf_counter_ns()
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    add_io("db", time.perf_counter_ns() - conn.info.pop("query_start"))
+
+
+def ensure_discovery_methods():
+    """Cria as linhas fixas que ainda nao existem no banco: discovery_method (ex.: metodos IPv6) e o contador de geracao"""
+    with engine.connect() as connection:
+        with Session(bind=connection) as session:
+            known = set(session.execute(select(DiscoveryMethod.id)).scalars())
+            for method in EnumMethods:
+                if method.value not in known:
+                    session.add(DiscoveryMethod(id=method.value, method=method.name,
+                                                descr=METHOD_DESCRIPTIONS[method],
+                                                active=method is not EnumMethods.ICMP_ECHO_RESPONSE_TIMEOUT))
+            if session.get(StorageGeneration, 1) is None:
+                session.add(StorageGeneration(id=1, generation=0))
+            session.commit()
+
+
+def ip_number(ip: str) -> Optional[int]:
+    try:
+        return int(IPv4Address(ip))
+    except ValueError:
+        return None
+
+
+# Colunas de resumo de devices, na ordem em que foram criadas, para bancos anteriores a elas
+DEVICE_SUMMARY_COLUMNS = ("last_ip", "last_ip_num", "first_seen_at", "last_seen_at", "observations", "last_active",
+                          "status")
+
+
+def migrate_schema():
+    """Colunas e indices adicionados depois da criacao do banco; create_all so cria tabelas que nao existem"""
+    with engine.connect() as connection:
+        device_columns = {column["name"] for column in inspect(connection).get_columns(Device.__tablename__)}
+        missing = [name for name in DEVICE_SUMMARY_COLUMNS if name not in device_columns]
+        for name in missing:
+            logger.info("Adding devices.%s", name)
+            column = Device.__table__.c[name]
+            ddl = f"ALTER TABLE devices ADD COLUMN {name} {column.type.compile(connection.dialect)}"
+            if column.server_default is not None:
+                ddl += f" NOT NULL DEFAULT {column.server_default.arg}"
+            connection.execute(text(ddl))
+        columns = {column["name"] for column in inspect(connection).get_columns(DeviceNetwork.__tablename__)}
+        if "ip_num" not in columns:
+            logger.info("Adding device_networks.ip_num")
+            connection.execute(text("ALTER TABLE device_networks ADD COLUMN ip_num INTEGER"))
+            table = DeviceNetwork.__table__
+            values = [{"row_id": id_, "value": number}
+                      for id_, ip in connection.execute(select(table.c.id, table.c.ip))
+                      if (number := ip_number(ip)) is not None]
+            if values:
+                connection.execute(update(table).where(table.c.id == bindparam("row_id"))
+                                   .values(ip_num=bindparam("value")), values)
+        for table in (Device.__table__, DeviceNetwork.__table__):
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+        if missing:
+            refresh_device_summaries(connection)
+        connection.commit()
+
+
+# Esquema e linhas fixas sao criados no primeiro uso do banco, nao na importacao: comandos que nao
+# acessam o banco (ex.: --help) nao pagam por isso
+_schema_lock = threading.RLock()
+_schema_ready = False
+_schema_initializing = False
+schema_init_seconds = 0.0
+
+
+@event.listens_for(engine, "engine_connect")
+def _ensure_schema(connection):
+    global _schema_ready, _schema_initializing, schema_init_seconds
+    if _schema_ready:
+        return
+    with _schema_lock:
+        # As conexoes abertas pela propria inicializacao (mesma thread) passam direto
+        if _schema_ready or _schema_initializing:
+            return
+        _schema_initializing = True
+        start = time.perf_counter()
+        try:
+            Base.metadata.create_all(engine)
+            migrate_schema()
+            ensure_discovery_methods()
+            _schema_ready = True
+        finally:
+            _schema_initializing = False
+            schema_init_seconds = time.perf_counter() - start
+
+
+def bump_generation(session: Session):
+    """Chamado na mesma transacao da escrita"""
+    session.execute(update(StorageGeneration).where(StorageGeneration.id == 1)
+                    .values(generation=StorageGeneration.generation + 1))
+
+
+def get_generation() -> int:
+    with engine.connect() as connection:
+        return connection.execute(select(StorageGeneration.generation).where(StorageGeneration.id == 1)).scalar()
 
 
 def get_related_mac(ip: str, session) -> Union[Any, None]:
@@ -119,14 +313,36 @@ def get_or_create_device(mac: str, session: Session, gateway) -> Device:
         return device
 
 
-def save(ip: str, method: EnumMethods, mac: Union[str, None] = None, gateway: Any = False):
+def observe(device: Device, devnet: DeviceNetwork, active: bool):
+    """Atualiza o resumo do dispositivo com uma observacao nova (a mais recente do seu historico)"""
+    previous_active = device.last_active
+    device.observations = (device.observations or 0) + 1
+    device.last_ip = devnet.ip
+    device.last_ip_num = devnet.ip_num
+    device.last_seen_at = devnet.discovered_at
+    if device.first_seen_at is None:
+        device.first_seen_at = devnet.discovered_at
+    device.last_active = active
+    # Mesmas regras de device_status
+    if not active:
+        device.status = "OFFLINE"
+    elif device.observations == 1:
+        device.status = "ONLINE(NEW)"
+    elif previous_active:
+        device.status = "ONLINE"
+    else:
+        device.status = "RECONNECTED"
+
+
+def save(ip: str, method: EnumMethods, mac: Union[str, None] = None, gateway: Any = False) -> bool:
+    """Registra uma descoberta. Retorna False se nada foi gravado (timeout de um ip sem dispositivo conhecido)"""
     with engine.connect() as connection:
         with Session(bind=connection) as session:
 
             if method == EnumMethods.ICMP_ECHO_RESPONSE_TIMEOUT:
                 mac = get_related_mac(ip, session)
                 if mac is None:
-                    return
+                    return False
 
             device = get_or_create_device(mac, session=session, gateway=gateway)
             devnet = DeviceNetwork()
@@ -134,8 +350,74 @@ def save(ip: str, method: EnumMethods, mac: Union[str, None] = None, gateway: An
             devnet.discovery_method_id = method.value
             session.add(devnet)
             devnet.ip = ip
+            devnet.ip_num = ip_number(ip)
+            observe(device, devnet, session.get(DiscoveryMethod, method.value).active)
+            bump_generation(session)
 
             session.commit()
+    return True
+
+
+def get_rtt_estimates(ips: Sequence[str]) -> Dict[str, Tuple[float, float]]:
+    """Retorna {ip: (srtt, rttvar)} para os hosts que ja responderam alguma vez"""
+    output: Dict[str, Tuple[float, float]] = {}
+    with engine.connect() as connection:
+        with Session(bind=connection) as session:
+            # Consulta em blocos para nao estourar o limite de parametros do SQLite
+            for i in range(0, len(ips), 500):
+                query = select(HostRtt).where(HostRtt.ip.in_(ips[i:i + 500]))
+                output.update({r.ip: (r.srtt, r.rttvar) for r in session.execute(query).scalars()})
+    return output
+
+
+def save_rtt_estimates(estimates: Dict[str, Tuple[float, float]]):
+    if not estimates:
+        return
+    with engine.connect() as connection:
+        with Session(bind=connection) as session:
+            now = datetime.now()
+            for ip, (srtt, rttvar) in estimates.items():
+                session.merge(HostRtt(ip=ip, srtt=srtt, rttvar=rttvar, updated_at=now))
+            session.commit()
+
+
+def get_scan_targets(ips: Sequence[str]) -> Dict[str, ScanTarget]:
+    output: Dict[str, ScanTarget] = {}
+    with engine.connect() as connection:
+        with Session(bind=connection, expire_on_commit=False) as session:
+            for i in range(0, len(ips), 500):
+                query = select(ScanTarget).where(ScanTarget.ip.in_(ips[i:i + 500]))
+                output.update({r.ip: r for r in session.execute(query).scalars()})
+            session.expunge_all()
+    return output
+
+
+def save_probe_results(results: Dict[str, bool], flap_decay: float = 0.5):
+    """Registra o resultado ({ip: respondeu}) de uma sondagem e atualiza o historico de trocas de estado"""
+    if not results:
+        return
+    ips = list(results)
+    with engine.connect() as connection:
+        with Session(bind=connection) as session:
+            now = datetime.now()
+            known: Dict[str, ScanTarget] = {}
+            for i in range(0, len(ips), 500):
+                query = select(ScanTarget).where(ScanTarget.ip.in_(ips[i:i + 500]))
+                known.update({r.ip: r for r in session.execute(query).scalars()})
+
+            for ip, alive in results.items():
+                target = known.get(ip)
+                if target is None:
+                    session.add(ScanTarget(ip=ip, last_probed_at=now, alive=alive, ever_alive=alive,
+                                           flaps=0.0, stable_runs=1))
+                    continue
+                changed = target.alive != alive
+                target.flaps = target.flaps * flap_decay + (1.0 if changed else 0.0)
+                target.stable_runs = 1 if changed else target.stable_runs + 1
+                target.alive = alive
+                target.ever_alive = target.ever_alive or alive
+                target.last_probed_at = now
+            session.commit()
 
 
 def partition(devnetlist: Sequence[DeviceNetwork]) -> Dict[str, List[DeviceNetwork]]:
@@ -149,15 +431,20 @@ def partition(devnetlist: Sequence[DeviceNetwork]) -> Dict[str, List[DeviceNetwo
     return output
 
 
-def format_output_device_network(devlist: List[DeviceNetwork]) -> List:
+def device_status(devlist: Sequence[DeviceNetwork]) -> str:
+    """Status a partir das observacoes do dispositivo, da mais recente para a mais antiga (bastam as duas primeiras)"""
     if not devlist[0].discovery_method.active:
-        status = "OFFLINE"
+        return "OFFLINE"
     elif len(devlist) == 1:
-        status = "ONLINE(NEW)"
+        return "ONLINE(NEW)"
     elif devlist[1].discovery_method.active:
-        status = "ONLINE"
+        return "ONLINE"
     else:
-        status = "RECONNECTED"
+        return "RECONNECTED"
+
+
+def format_output_device_network(devlist: List[DeviceNetwork]) -> List:
+    status = device_status(devlist)
 
     first_conn = devlist[-1].discovered_at
 
@@ -170,6 +457,7 @@ def drop_devices():
         with Session(bind=connection) as session:
             session.execute(delete(Device))
             session.execute(delete(DeviceNetwork))
+            bump_generation(session)
             session.commit()
 
 
@@ -179,23 +467,143 @@ def drop_history():
             DeviceNetwork.query.delete()
 
 
-def get_devices() -> str:
+DEVICE_SORT_KEYS = ("last-seen", "first-seen", "ip", "mac", "status", "count")
+
+
+_vendor_range_table = Table("vendor_ranges", MetaData(), Column("low", String, primary_key=True),
+                            Column("high", String, nullable=False), prefixes=["TEMPORARY"])
+
+
+def _vendor_ranges(connection, prefixes: Sequence[str]) -> Table:
+    """
+    Preenche a tabela temporaria (da conexao) com um intervalo [low, high) de mac_addr por OUI, nas grafias
+    minuscula e maiuscula. Com ela o filtro de fabricante vira um join por intervalo no indice de mac_addr,
+    sem um parametro por prefixo (um fabricante grande tem milhares de OUIs).
+    """
+    _vendor_range_table.create(connection, checkfirst=True)
+    connection.execute(delete(_vendor_range_table))
+    lows = {variant for prefix in prefixes for variant in (prefix.lower(), prefix.upper())}
+    if lows:
+        # O sucessor do prefixo: o primeiro texto maior que todos os que comecam com ele
+        connection.execute(_vendor_range_table.insert(),
+                           [{"low": low, "high": low[:-1] + chr(ord(low[-1]) + 1)} for low in lows])
+    return _vendor_range_table
+
+
+def get_devices(status: Sequence[str] = (), vendor_prefixes: Optional[Sequence[str]] = None,
+                subnet: Optional[IPv4Network] = None, gateway: Optional[bool] = None,
+                seen_since: Optional[datetime] = None, sort: str = "last-seen", descending: bool = True,
+                limit: Optional[int] = None, offset: int = 0) -> str:
+    """
+    Um dispositivo por linha, lido do resumo mantido em devices; cada filtro e um predicado sobre uma coluna
+    indexada (status, last_ip_num, last_seen_at, mac_addr). Sem argumentos lista todos, do visto mais
+    recentemente para o mais antigo. `vendor_prefixes` sao OUIs ("00:00:0C"); uma lista vazia nao seleciona
+    nada. `subnet` considera o IP atual do dispositivo.
+    """
     with engine.connect() as connection:
-        with Session(bind=connection) as session:
-            query = select(DeviceNetwork) \
-                .options(joinedload(DeviceNetwork.discovery_method), joinedload(DeviceNetwork.device)) \
-                .order_by(DeviceNetwork.discovered_at.desc())
+        query = select(Device.status, Device.mac_addr, Device.last_ip, Device.gateway, Device.first_seen_at) \
+            .where(Device.observations > 0)
+        if status:
+            query = query.where(Device.status.in_(status))
+        if vendor_prefixes is not None:
+            ranges = _vendor_ranges(connection, vendor_prefixes)
+            query = query.select_from(ranges) \
+                .join(Device, and_(Device.mac_addr >= ranges.c.low, Device.mac_addr < ranges.c.high))
+        if gateway is not None:
+            query = query.where(Device.gateway == gateway)
+        if subnet is not None:
+            query = query.where(Device.last_ip_num.between(int(subnet.network_address), int(subnet.broadcast_address)))
+        if seen_since is not None:
+            query = query.where(Device.last_seen_at >= seen_since)
+
+        sort_column = {"last-seen": Device.last_seen_at, "first-seen": Device.first_seen_at, "ip": Device.last_ip_num,
+                       "mac": Device.mac_addr, "status": Device.status, "count": Device.observations}[sort]
+        query = query.order_by(sort_column.desc() if descending else sort_column.asc(), Device.id) \
+            .limit(limit).offset(offset or None)
+
+        header = ["STATUS", "MAC", "MAC_VENDOR", "IP", "GATEWAY", "FIRST_CONN_AT"]
+        table = [[status_value, mac, vendor_solver(mac[0:8]), ip, gateway_, str(first_conn)]
+                 for status_value, mac, ip, gateway_, first_conn in connection.execute(query)]
+
+        return tabulate.tabulate(table, headers=header, tablefmt="double_grid")
+
+
+def _device_summary():
+    """
+    Observacoes de cada dispositivo numeradas da mais recente (rank 1) para a mais antiga, com o metodo da
+    observacao anterior e os agregados do dispositivo. Percorre o historico inteiro: usada so para
+    (re)construir o resumo de devices (refresh_device_summaries).
+    """
+    window = dict(partition_by=DeviceNetwork.device_id,
+                  order_by=(DeviceNetwork.discovered_at.desc(), DeviceNetwork.id.desc()))
+    return select(DeviceNetwork.device_id, DeviceNetwork.ip, DeviceNetwork.ip_num, DeviceNetwork.discovered_at,
+                  DiscoveryMethod.active,
+                  func.row_number().over(**window).label("rank"),
+                  func.lead(DiscoveryMethod.active).over(**window).label("previous_active"),
+                  func.count().over(partition_by=DeviceNetwork.device_id).label("count"),
+                  func.min(DeviceNetwork.discovered_at).over(partition_by=DeviceNetwork.device_id)
+                  .label("first_conn")) \
+        .join(DiscoveryMethod, DiscoveryMethod.id == DeviceNetwork.discovery_method_id).subquery()
+
+
+def _status_expression(summary):
+    # Mesmas regras de device_status, sobre a observacao mais recente e a anterior
+    return case((not_(summary.c.active), "OFFLINE"),
+                (summary.c.count == 1, "ONLINE(NEW)"),
+                (summary.c.previous_active, "ONLINE"),
+                else_="RECONNECTED").label("status")
+
+
+def refresh_device_summaries(connection):
+    """
+    Recalcula o resumo de todos os dispositivos a partir do historico. Usada quando as colunas sao criadas
+    em um banco existente e por quem grava device_networks sem passar por save() (ex.: benchmarks.dataset).
+    """
+    summary = _device_summary()
+    query = select(summary.c.device_id, summary.c.ip, summary.c.ip_num, summary.c.first_conn,
+                   summary.c.discovered_at, summary.c.count, summary.c.active, _status_expression(summary)) \
+        .where(summary.c.rank == 1)
+    values = [{"device": device_id, "last_ip": ip, "last_ip_num": ip_num, "first_seen_at": first_conn,
+               "last_seen_at": last_seen, "observations": count, "last_active": active, "status": status}
+              for device_id, ip, ip_num, first_conn, last_seen, count, active, status in connection.execute(query)]
+    table = Device.__table__
+    connection.execute(update(table).values(last_ip=None, last_ip_num=None, first_seen_at=None, last_seen_at=None,
+                                            observations=0, last_active=None, status=None))
+    if values:
+        connection.execute(update(table).where(table.c.id == bindparam("device"))
+                           .values({name: bindparam(name) for name in DEVICE_SUMMARY_COLUMNS}), values)
+
+
+def device_summaries() -> Tuple[int, List[Tuple]]:
+    """
+    Ponto de partida do watch da CLI: (maior id de device_networks, uma linha por dispositivo). As duas
+    consultas sao feitas na mesma transacao de leitura, entao toda observacao gravada depois do resumo
+    aparece em observations_after(cursor).
+    Linha: (device_id, mac, ip, gateway, first_conn, count, active, last_seen, status).
+    """
+    with engine.connect() as connection:
+        with connection.begin():
+            cursor = connection.execute(select(func.max(DeviceNetwork.id))).scalar() or 0
+            query = select(Device.id, Device.mac_addr, Device.last_ip, Device.gateway, Device.first_seen_at,
+                           Device.observations, Device.last_active, Device.last_seen_at, Device.status) \
+                .where(Device.observations > 0).order_by(Device.id)
+            return cursor, [tuple(row) for row in connection.execute(query)]
 
-            res = session.execute(query)
 
-            device_network_dict: Dict[str, List[DeviceNetwork]] = partition(res.unique().scalars().all())
+def observations_after(after: int) -> List[Tuple]:
+    """Observacoes com id maior que `after`, em ordem: (id, device_id, mac, ip, gateway, active, discovered_at)"""
+    with engine.connect() as connection:
+        query = select(DeviceNetwork.id, DeviceNetwork.device_id, Device.mac_addr, DeviceNetwork.ip, Device.gateway,
+                       DiscoveryMethod.active, DeviceNetwork.discovered_at) \
+            .join(Device, Device.id == DeviceNetwork.device_id) \
+            .join(DiscoveryMethod, DiscoveryMethod.id == DeviceNetwork.discovery_method_id) \
+            .where(DeviceNetwork.id > after).order_by(DeviceNetwork.id)
+        return [tuple(row) for row in connection.execute(query)]
 
-            header = ["STATUS", "MAC", "MAC_VENDOR", "IP", "GATEWAY", "FIRST_CONN_AT"]
-            table = []
-            for device_network_list in device_network_dict.values():
-                table.append(format_output_device_network(device_network_list))
 
-            return tabulate.tabulate(table, headers=header, tablefmt="double_grid")
+def max_observation_id() -> int:
+    with engine.connect() as connection:
+        return connection.execute(select(func.max(DeviceNetwork.id))).scalar() or 0
 
 
 def history_device(mac: str) -> str:
@@ -254,8 +662,7 @@ def get_line_history(id_: int) -> Union[List, None]:
                 .order_by(DeviceNetwork.discovered_at.desc())
 
             res: Sequence[DeviceNetwork] = session.execute(query).unique().scalars().all()
-            print(f"Numero de entradas no historico {len(res)}")
-            print(res, id_)
+            logger.debug("History has %d entries, requested %d", len(res), id_)
             if len(res) > id_:
                 devnet = res[id_]
                 return [
@@ -287,3 +694,32 @@ def get_line_device(id_: int) -> List:
             pre_formated = format_output_device_network(device_list[0])
             return [pre_formated[1], pre_formated[3], pre_formated[0], pre_formated[4], pre_formated[5], len(device_list[0])]
 
+
+
+# ------ LINHAS DAS TABELAS SNMP --------------
+# Indexadas pela chave primaria: a busca da proxima linha e uma consulta por intervalo no indice,
+# sem contar ou carregar a tabela inteira a cada passo de um walk.
+
+def _history_row(devnet: DeviceNetwork) -> List:
+    return [devnet.device.mac_addr, devnet.ip, devnet.discovery_method.method, devnet.discovered_at]
+
+
+def history_rows_after(after: Union[int, None], limit: Union[int, None]) -> List[Tuple[int, List]]:
+    with engine.connect() as connection:
+        with Session(bind=connection) as session:
+            query = select(DeviceNetwork).where(DeviceNetwork.id > (after or 0)) \
+                .options(joinedload(DeviceNetwork.discovery_method), joinedload(DeviceNetwork.device)) \
+                .order_by(DeviceNetwork.id).limit(limit)
+            return [(devnet.id, _history_row(devnet)) for devnet in session.execute(query).unique().scalars()]
+
+
+def all_history_rows() -> List[Tuple[int, List]]:
+    return history_rows_after(None, None)
+
+
+def all_device_rows() -> List[Tuple[int, List]]:
+    with engine.connect() as connection:
+        query = select(Device.id, Device.mac_addr, Device.last_ip, Device.status, Device.gateway, Device.first_seen_at,
+                       Device.observations).where(Device.observations > 0).order_by(Device.id)
+        return [(id_, [mac, ip, status, gateway, str(first_conn), count])
+                for id_, mac, ip, status, gateway, first_conn, count in connection.execute(query)]
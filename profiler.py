@@ -0,0 +1,212 @@
+"""
+Profiler por amostragem ligado sob demanda no agente e nos workers de varredura.
+
+Enquanto desligado nao existe nenhuma thread nem gancho de trace: o custo e zero. Ligado, uma thread
+le a pilha de todas as outras threads (sys._current_frames) a cada `interval` segundos, durante no
+maximo `duration` segundos, e ao final grava as pilhas no formato "collapsed" (uma linha
+"thread;modulo:funcao;...;modulo:funcao N" por pilha), lido por flamegraph.pl, speedscope e similares.
+
+Controle:
+    - SET em profilerControl (scannerMIB 7.1) com o numero de segundos; 0 interrompe;
+    - SIGUSR2 liga por `default_duration` segundos, ou interrompe se ja estiver ligado. Os workers do
+      pool de varredura tambem instalam o sinal (kill -USR2 <pid do worker>).
+
+No modo multiprocesso do agente o SET chega a um worker qualquer; a janela fica em memoria compartilhada
+(SharedControl) e vale para todos os workers, cada um gravando o seu arquivo.
+"""
+import glob
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+MAX_DURATION = 600
+
+
+class SamplingProfiler(object):
+    def __init__(self, interval: float = 0.005, output_dir: str = ".", default_duration: float = 30):
+        self.interval = interval
+        self.output_dir = output_dir
+        self.default_duration = default_duration
+        self.last_output: Optional[str] = None
+        # Reentrante: o handler do SIGUSR2 roda na thread principal e pode interromper um start() em andamento
+        self._lock = threading.RLock()
+        self._starting = False
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._deadline = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def remaining(self) -> float:
+        return max(self._deadline - time.monotonic(), 0.0) if self.running else 0.0
+
+    def start(self, duration: Optional[float] = None, window: Optional[int] = None) -> bool:
+        """
+        Retorna False se ja existe uma janela de amostragem em andamento.
+        `window`: numero da janela compartilhada (SharedControl), usado no nome do arquivo
+        """
+        with self._lock:
+            if self.running or self._starting:
+                return False
+            self._starting = True
+            try:
+                duration = min(duration or self.default_duration, MAX_DURATION)
+                self._stop.clear()
+                self._deadline = time.monotonic() + duration
+                self._thread = threading.Thread(target=self._run, args=(window,), name="sampling-profiler",
+                                                daemon=True)
+                self._thread.start()
+            finally:
+                self._starting = False
+        logger.info("Profiler started for %.0fs", duration)
+        return True
+
+    def stop(self):
+        """Interrompe a janela atual; o arquivo e gravado pela propria thread de amostragem"""
+        self._stop.set()
+
+    def toggle(self, *_):
+        # Assinatura compativel com signal.signal
+        if self.running:
+            self.stop()
+        else:
+            self.start()
+
+    def _run(self, window: Optional[int] = None):
+        stacks: Counter = Counter()
+        own = threading.get_ident()
+        names = {}
+        samples = 0
+        while not self._stop.wait(self.interval) and time.monotonic() < self._deadline:
+            if len(names) != threading.active_count():
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident != own:
+                    stacks[_collapse(names.get(ident, str(ident)), frame)] += 1
+            samples += 1
+        self.last_output = self._write(stacks, window)
+        logger.info("Profiler stopped after %d samples, written to %s", samples, self.last_output)
+
+    def _write(self, stacks: Counter, window: Optional[int] = None) -> str:
+        if window is None:
+            name = f"profile-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}.collapsed"
+        else:
+            name = window_file(window, os.getpid())
+        path = os.path.join(self.output_dir, name)
+        with open(path, "w") as output:
+            for stack, count in stacks.most_common():
+                output.write(f"{stack} {count}\n")
+        return path
+
+
+def _collapse(thread_name: str, frame) -> str:
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        module = os.path.splitext(os.path.basename(code.co_filename))[0]
+        frames.append(f"{module}:{code.co_name}")
+        frame = frame.f_back
+    frames.append(thread_name.replace(" ", "_"))
+    return ";".join(reversed(frames))
+
+
+def window_file(window: int, pid) -> str:
+    return f"profile-w{window}-{pid}.collapsed"
+
+
+class SharedControl(object):
+    """
+    Janela de amostragem comum aos workers do agente. `array` e um multiprocessing.Array('d', 3) criado
+    pelo supervisor: [prazo (time.time()), numero da janela, numero do pedido]. Um SET em qualquer worker
+    grava o pedido; cada worker confere o numero do pedido a cada requisicao (`poll`, uma leitura de
+    memoria compartilhada) e liga ou desliga o seu profiler ate o prazo comum.
+    """
+
+    def __init__(self, array, profiler: SamplingProfiler):
+        self._array = array
+        self._profiler = profiler
+        self._seen = array[2]
+
+    @property
+    def remaining(self) -> float:
+        return max(self._array[0] - time.time(), 0.0)
+
+    @property
+    def last_output(self) -> Optional[str]:
+        """Padrao (glob) dos arquivos da ultima janela terminada, um por worker"""
+        window = int(self._array[1])
+        for candidate in (window, window - 1):
+            pattern = os.path.join(self._profiler.output_dir, window_file(candidate, "*"))
+            if candidate > 0 and glob.glob(pattern):
+                return pattern
+        return None
+
+    def start(self, duration: float) -> bool:
+        with self._array.get_lock():
+            if self.remaining > 0:
+                return False
+            self._array[0] = time.time() + min(duration, MAX_DURATION)
+            self._array[1] += 1
+            self._array[2] += 1
+        self.poll()
+        return True
+
+    def stop(self):
+        with self._array.get_lock():
+            self._array[0] = 0.0
+            self._array[2] += 1
+        self.poll()
+
+    def poll(self):
+        if self._array[2] == self._seen:
+            return
+        with self._array.get_lock():
+            deadline, window, self._seen = self._array[0], int(self._array[1]), self._array[2]
+        remaining = deadline - time.time()
+        if remaining > 0:
+            self._profiler.start(remaining, window=window)
+        else:
+            self._profiler.stop()
+
+
+_profiler: Optional[SamplingProfiler] = None
+_control: Optional[SharedControl] = None
+
+
+def get_profiler() -> SamplingProfiler:
+    global _profiler
+    if _profiler is None:
+        _profiler = SamplingProfiler()
+    return _profiler
+
+
+def install_control(array):
+    """Chamado nos workers do agente (modo multiprocesso), com o Array criado pelo supervisor"""
+    global _control
+    _control = SharedControl(array, get_profiler())
+
+
+def get_control():
+    """A janela compartilhada nos workers; nos demais processos, o profiler local (mesma interface)"""
+    return _control if _control is not None else get_profiler()
+
+
+def poll():
+    # Chamado a cada requisicao do agente: sem janela compartilhada nao faz nada
+    if _control is not None:
+        _control.poll()
+
+
+def install_signal(signum: int = signal.SIGUSR2):
+    """Deve ser chamado na thread principal do processo"""
+    signal.signal(signum, get_profiler().toggle)
@@ -0,0 +1,72 @@
+"""
+Estimativa adaptativa de timeout para as varreduras ICMP.
+
+Segue o algoritmo do RFC 6298 (SRTT/RTTVAR) por host. Hosts sem historico
+herdam a estimativa agregada da sua sub-rede (/24 por padrao), e na falta
+dela usam INITIAL_TIMEOUT.
+"""
+from ipaddress import ip_network
+from statistics import median
+from typing import Dict, NamedTuple, Optional, Iterable
+
+ALPHA = 1 / 8
+BETA = 1 / 4
+K = 4
+
+MIN_TIMEOUT = 0.2  # segundos
+INITIAL_TIMEOUT = 1.0
+SUBNET_PREFIX = 24
+
+
+class RttEstimate(NamedTuple):
+    srtt: float
+    rttvar: float
+
+
+def update(estimate: Optional[RttEstimate], sample: float) -> RttEstimate:
+    """Incorpora uma nova amostra de RTT (em segundos) a estimativa do host"""
+    if estimate is None:
+        return RttEstimate(sample, sample / 2)
+    rttvar = (1 - BETA) * estimate.rttvar + BETA * abs(estimate.srtt - sample)
+    srtt = (1 - ALPHA) * estimate.srtt + ALPHA * sample
+    return RttEstimate(srtt, rttvar)
+
+
+def timeout(estimate: Optional[RttEstimate], max_timeout: float) -> float:
+    if estimate is None:
+        return min(INITIAL_TIMEOUT, max_timeout)
+    rto = estimate.srtt + K * estimate.rttvar
+    return min(max(rto, MIN_TIMEOUT), max_timeout)
+
+
+def subnet_key(ip: str, prefix: int = SUBNET_PREFIX) -> str:
+    return str(ip_network(f"{ip}/{prefix}", strict=False))
+
+
+def subnet_estimates(estimates: Dict[str, RttEstimate]) -> Dict[str, RttEstimate]:
+    """Agrega as estimativas por sub-rede: mediana do SRTT e a maior variacao observada"""
+    groups: Dict[str, list] = {}
+    for ip, estimate in estimates.items():
+        groups.setdefault(subnet_key(ip), []).append(estimate)
+
+    output: Dict[str, RttEstimate] = {}
+    for key, group in groups.items():
+        srtt = median(e.srtt for e in group)
+        rttvar = max(e.rttvar + abs(e.srtt - srtt) for e in group)
+        output[key] = RttEstimate(srtt, rttvar)
+    return output
+
+
+def host_timeout(ip: str, estimates: Dict[str, RttEstimate], subnets: Dict[str, RttEstimate],
+                 max_timeout: float) -> float:
+    estimate = estimates.get(ip)
+    if estimate is None:
+        estimate = subnets.get(subnet_key(ip))
+    return timeout(estimate, max_timeout)
+
+
+def round_timeout(ips: Iterable[str], estimates: Dict[str, RttEstimate], subnets: Dict[str, RttEstimate],
+                  max_timeout: float, attempt: int = 0) -> float:
+    """Tempo de espera de uma rodada: o maior timeout entre os alvos pendentes, dobrado a cada retentativa"""
+    wait = max((host_timeout(ip, estimates, subnets, max_timeout) for ip in ips), default=0)
+    return min(wait * 2 ** attempt, max_timeout)
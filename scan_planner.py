@@ -0,0 +1,49 @@
+"""
+Planejamento da varredura incremental.
+
+Em vez de sondar toda a faixa configurada a cada execucao, cada endereco recebe um
+intervalo de re-sondagem de acordo com o seu historico (tabela scan_targets):
+    - nunca sondado: prioridade maxima
+    - instavel (trocou de estado recentemente): BASE_INTERVAL
+    - estavel: BASE_INTERVAL dobrado a cada sondagem no mesmo estado, ate MAX_STABLE_INTERVAL
+    - nunca respondeu (endereco sem uso): UNUSED_INTERVAL, taxa baixa de fundo
+A fila de prioridade ordena os alvos pelo atraso relativo ao seu intervalo, e cada
+execucao sonda no maximo `budget` alvos.
+"""
+import heapq
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from orm import ScanTarget
+
+BASE_INTERVAL = 60.0  # segundos
+MAX_STABLE_INTERVAL = 3600.0
+UNUSED_INTERVAL = 6 * 3600.0
+FLAP_THRESHOLD = 0.5
+
+
+def probe_interval(target: ScanTarget) -> float:
+    if not target.ever_alive:
+        return UNUSED_INTERVAL
+    if target.flaps >= FLAP_THRESHOLD:
+        return BASE_INTERVAL
+    return min(BASE_INTERVAL * 2 ** min(target.stable_runs, 16), MAX_STABLE_INTERVAL)
+
+
+def staleness(target: Optional[ScanTarget], now: datetime) -> float:
+    """Tempo desde a ultima sondagem dividido pelo intervalo desejado; > 1 significa atrasado"""
+    if target is None:
+        return float('inf')
+    elapsed = (now - target.last_probed_at).total_seconds()
+    return elapsed / probe_interval(target) * (1 + target.flaps)
+
+
+def plan(ips: List[str], targets: Dict[str, ScanTarget], budget: int, now: Optional[datetime] = None) -> List[str]:
+    """Seleciona ate `budget` enderecos, os mais atrasados primeiro. Alvos ainda dentro do intervalo sao ignorados"""
+    now = now or datetime.now()
+    queue = []
+    for ip in ips:
+        score = staleness(targets.get(ip), now)
+        if score >= 1:
+            queue.append((-score, ip))
+    return [ip for _, ip in heapq.nsmallest(budget, queue)]
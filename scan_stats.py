@@ -0,0 +1,107 @@
+"""
+Contadores em memoria compartilhada do progresso e da vazao das varreduras.
+
+O agendador cria o vetor compartilhado antes de iniciar o pool, os workers o recebem no
+inicializador e o atualizam durante a varredura; o agente le os mesmos valores para responder
+a subarvore scanStats (scannerMIB 5) sem acessar o banco. Fora do agente (ex.: CLI) os contadores
+ficam apenas no processo local.
+"""
+import multiprocessing
+import time
+from typing import Dict, Optional
+
+SCAN_TYPES = {"icmp": 1, "arp2": 2, "ndp": 3}
+
+# Acumulados desde o inicio do agente
+PROBES_SENT = 0
+REPLIES = 1
+TIMEOUTS = 2
+ROWS_WRITTEN = 3
+RUNS = 4
+# Execucao atual/ultima execucao
+TARGETS = 5
+RUNNING = 6
+STARTED_AT = 7
+LAST_DURATION = 8
+RUN_PROBES = 9
+RUN_RATE = 10
+
+FIELDS = 11
+
+
+class ScanStats(object):
+    def __init__(self, array=None):
+        self._array = array if array is not None else multiprocessing.Array('d', len(SCAN_TYPES) * FIELDS)
+
+    @property
+    def array(self):
+        return self._array
+
+    def _base(self, kind: str) -> int:
+        return (SCAN_TYPES[kind] - 1) * FIELDS
+
+    def add(self, kind: str, field: int, n: float = 1):
+        with self._array.get_lock():
+            self._array[self._base(kind) + field] += n
+
+    def begin(self, kind: str, targets: int = 0):
+        base = self._base(kind)
+        with self._array.get_lock():
+            self._array[base + TARGETS] = targets
+            self._array[base + RUNNING] = 1
+            self._array[base + STARTED_AT] = time.monotonic()
+            self._array[base + RUN_PROBES] = 0
+            self._array[base + RUNS] += 1
+
+    def end(self, kind: str):
+        base = self._base(kind)
+        with self._array.get_lock():
+            duration = time.monotonic() - self._array[base + STARTED_AT]
+            self._array[base + RUNNING] = 0
+            self._array[base + LAST_DURATION] = duration
+            self._array[base + RUN_RATE] = self._array[base + RUN_PROBES] / duration if duration > 0 else 0
+
+    def probes(self, kind: str, n: int):
+        base = self._base(kind)
+        with self._array.get_lock():
+            self._array[base + PROBES_SENT] += n
+            self._array[base + RUN_PROBES] += n
+
+    def snapshot(self, kind: str) -> Dict[str, float]:
+        base = self._base(kind)
+        with self._array.get_lock():
+            values = self._array[base:base + FIELDS]
+        running = bool(values[RUNNING])
+        elapsed = time.monotonic() - values[STARTED_AT] if running else 0.0
+        if running:
+            rate = values[RUN_PROBES] / elapsed if elapsed > 0 else 0.0
+        else:
+            rate = values[RUN_RATE]
+        return {
+            "targets": values[TARGETS],
+            "probes_sent": values[PROBES_SENT],
+            "replies": values[REPLIES],
+            "timeouts": values[TIMEOUTS],
+            "rows_written": values[ROWS_WRITTEN],
+            "running": running,
+            "elapsed": elapsed,
+            "last_duration": values[LAST_DURATION],
+            "packets_per_second": rate,
+            "runs": values[RUNS],
+        }
+
+
+_stats: Optional[ScanStats] = None
+
+
+def install(array):
+    """Usado pelo agendador (processo pai) e pelo inicializador dos workers"""
+    global _stats
+    _stats = ScanStats(array)
+
+
+def get_stats() -> ScanStats:
+    global _stats
+    if _stats is None:
+        _stats = ScanStats()
+    return _stats
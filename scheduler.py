@@ -0,0 +1,239 @@
+"""
+Agendador persistente das varreduras, mantido pelo processo do agente (main.py).
+
+Os trabalhos (icmp, arp2, ndp) sao executados por um pool de processos iniciado uma unica vez, com
+scapy e SQLAlchemy ja importados, de modo que cada varredura nao paga o custo de criar um processo.
+Pedidos repetidos sao aglutinados: um trabalho igual (ou contido, no caso de faixas icmp) a outro
+pendente ou em execucao e descartado, e trabalhos conflitantes nunca rodam ao mesmo tempo.
+
+Trabalhos periodicos sao lidos da chave "schedule" do conf.json:
+    "schedule": [{"job": "icmp", "interval": 300}, {"job": "arp2", "interval": 3600}]
+"""
+import logging
+import multiprocessing
+import threading
+import time
+from ipaddress import ip_network
+from queue import Empty
+from typing import Callable, Dict, List, Optional, Any, Union
+
+import scan_stats
+import settings
+
+logger = logging.getLogger(__name__)
+
+JOB_FLAGS = {"icmp": "icmp_run", "arp2": "arp2_run"}
+
+
+class Job(object):
+    def __init__(self, kind: str, target: Optional[str] = None, **params):
+        self.kind = kind
+        self.target = target
+        self.params = params
+
+    @property
+    def key(self):
+        return self.kind, self.target
+
+    def covers(self, other: 'Job') -> bool:
+        """O trabalho `other` ja esta contido neste (mesmo tipo e faixa igual ou menor)"""
+        if self.kind != other.kind:
+            return False
+        if self.target is None or other.target is None:
+            return self.target == other.target
+        return ip_network(other.target, strict=False).subnet_of(ip_network(self.target, strict=False))
+
+    def conflicts(self, other: 'Job') -> bool:
+        """Dois trabalhos do mesmo tipo sobre faixas sobrepostas nao podem rodar ao mesmo tempo"""
+        if self.kind != other.kind:
+            return False
+        if self.target is None or other.target is None:
+            return True
+        return ip_network(self.target, strict=False).overlaps(ip_network(other.target, strict=False))
+
+    def __repr__(self):
+        return f"<Job(kind={self.kind}, target={self.target})>"
+
+
+def _warm_worker(stats_array):
+    # Importa as dependencias pesadas uma unica vez por processo do pool
+    import net_discover  # noqa: F401
+    import scapy.sendrecv  # noqa: F401
+    import profiler
+    scan_stats.install(stats_array)
+    profiler.install_signal()
+
+
+def _run_job(kind: str, target: Optional[str], params: Dict[str, Any]):
+    import net_discover
+
+    if kind == "icmp":
+        if params.get("incremental"):
+            net_discover.icmp_incremental_scan(ip_dst=target, budget=params["budget"],
+                                               timeout=params["timeout"], retries=params["retries"])
+        else:
+            net_discover.icmp_scan(ip_dst=target, timeout=params["timeout"], retries=params["retries"])
+    elif kind == "arp2":
+        net_discover.arp2_sniff(timeout=params["timeout"])
+    elif kind == "ndp":
+        net_discover.ndp_scan(timeout=params["timeout"])
+    else:
+        raise ValueError(f"Unknown job kind '{kind}'")
+    return kind, target
+
+
+def icmp_job(target: Optional[str] = None) -> Job:
+    if target is None:
+        target = f'{settings.get_setting("ip_address")}/{settings.get_setting("ip_mask")}'
+    return Job("icmp", target,
+               # Limite superior: a espera de cada rodada vem do RTT aprendido (ver rtt.py)
+               timeout=settings.get_setting("icmp_timeout", 3),
+               retries=settings.get_setting("icmp_retries", 2),
+               incremental=settings.get_setting("icmp_incremental", False),
+               budget=settings.get_setting("icmp_budget", 64))
+
+
+def arp2_job() -> Job:
+    return Job("arp2", timeout=settings.get_setting("timeout"))
+
+
+def ndp_job() -> Job:
+    return Job("ndp", timeout=settings.get_setting("ndp_timeout", 5))
+
+
+JOB_FACTORIES = {"icmp": icmp_job, "arp2": arp2_job, "ndp": ndp_job}
+
+
+class ScanScheduler(object):
+    def __init__(self, workers: int = 2, schedule: Optional[List[Dict[str, Any]]] = None, tick: float = 1.0,
+                 on_done: Optional[Callable[[Job], None]] = None):
+        """`on_done(job)` e chamado ao fim de cada trabalho (com ou sem erro), na thread de resultados do pool"""
+        self._workers = workers
+        self._on_done = on_done
+        self._schedule = schedule or []
+        self._tick = tick
+        self._lock = threading.Lock()
+        self._pending: List[Job] = []
+        self._running: List[Job] = []
+        self._next_run: Dict[int, float] = {}
+        self._pool = None
+        self._ticker: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        # spawn: os workers nao herdam conexoes abertas de SQLite nem o loop asyncio do agente
+        ctx = multiprocessing.get_context("spawn")
+        stats_array = ctx.Array('d', len(scan_stats.SCAN_TYPES) * scan_stats.FIELDS)
+        scan_stats.install(stats_array)
+        self._pool = ctx.Pool(processes=self._workers, initializer=_warm_worker, initargs=(stats_array,))
+        for kind, flag in JOB_FLAGS.items():
+            settings.set_setting(flag, False)
+        now = time.monotonic()
+        for index, entry in enumerate(self._schedule):
+            self._next_run[index] = now + float(entry.get("delay", entry["interval"]))
+        self._ticker = threading.Thread(target=self._tick_loop, name="scan-scheduler", daemon=True)
+        self._ticker.start()
+        logger.info("Scan scheduler started with %d workers and %d periodic jobs", self._workers, len(self._schedule))
+
+    def stop(self):
+        self._stopped.set()
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+    def submit(self, job: Job) -> bool:
+        """Enfileira o trabalho. Retorna False se ele foi aglutinado a um trabalho pendente ou em execucao"""
+        with self._lock:
+            for other in self._running + self._pending:
+                if other.covers(job):
+                    logger.debug("%s coalesced into %s", job, other)
+                    return False
+            self._pending.append(job)
+        self._dispatch()
+        return True
+
+    def is_running(self, kind: str) -> bool:
+        with self._lock:
+            return any(j.kind == kind for j in self._running + self._pending)
+
+    def _dispatch(self):
+        with self._lock:
+            if self._pool is None:
+                return
+            for job in list(self._pending):
+                if any(job.conflicts(other) for other in self._running):
+                    continue
+                self._pending.remove(job)
+                self._running.append(job)
+                self._set_flag(job.kind)
+                self._pool.apply_async(_run_job, (job.kind, job.target, job.params),
+                                       callback=lambda _, j=job: self._done(j),
+                                       error_callback=lambda e, j=job: self._done(j, e))
+
+    def _done(self, job: Job, error: Optional[BaseException] = None):
+        if error is not None:
+            logger.error("%s failed: %r", job, error)
+        with self._lock:
+            self._running.remove(job)
+            self._set_flag(job.kind)
+        if self._on_done is not None:
+            self._on_done(job)
+        self._dispatch()
+
+    def _set_flag(self, kind: str):
+        # Mantem o flag do conf.json para quem ainda consulta icmpRun/arp2Run pelo arquivo
+        active = any(j.kind == kind for j in self._running)
+        if flag := JOB_FLAGS.get(kind):
+            if settings.get_setting(flag, False) != active:
+                settings.set_setting(flag, active)
+
+    def _tick_loop(self):
+        while not self._stopped.wait(self._tick):
+            now = time.monotonic()
+            for index, entry in enumerate(self._schedule):
+                if now < self._next_run[index]:
+                    continue
+                self._next_run[index] = now + float(entry["interval"])
+                try:
+                    self.submit(JOB_FACTORIES[entry["job"]]())
+                except Exception as e:
+                    logger.error("Periodic job %s could not be submitted: %r", entry, e)
+
+
+class JobForwarder(object):
+    """
+    Usado nos workers do agente (modo multiprocesso): os trabalhos sao repassados por uma fila ao
+    agendador do supervisor, que e o unico a manter o pool de varredura.
+    """
+
+    def __init__(self, queue):
+        self._queue = queue
+
+    def submit(self, job: Job) -> bool:
+        self._queue.put((job.kind, job.target, job.params))
+        return True
+
+
+def consume(queue, scheduler: ScanScheduler, stopped: threading.Event):
+    """Laco do supervisor: entrega ao agendador os trabalhos recebidos dos workers"""
+    while not stopped.is_set():
+        try:
+            kind, target, params = queue.get(timeout=1)
+        except Empty:
+            continue
+        scheduler.submit(Job(kind, target, **params))
+
+
+_scheduler: Optional[ScanScheduler] = None
+
+
+def install(scheduler: Union[ScanScheduler, JobForwarder]):
+    global _scheduler
+    _scheduler = scheduler
+
+
+def get_scheduler() -> Union[ScanScheduler, JobForwarder]:
+    if _scheduler is None:
+        raise RuntimeError("Scan scheduler is not running")
+    return _scheduler
@@ -1,20 +1,37 @@
 import json
+import logging
+import os
 from typing import Any
 
+from snmp_agent.metrics import timed_io
+
+logger = logging.getLogger(__name__)
+
 SOURCE_FILE = "conf.json"
 
 
-def get_setting(key: str):
-    with open(SOURCE_FILE, 'r') as conf:
+_MISSING = object()
+
+
+def get_setting(key: str, default: Any = _MISSING):
+    with timed_io("settings"), open(SOURCE_FILE, 'r') as conf:
         data = json.load(conf)
+    if default is not _MISSING:
+        return data.get(key, default)
     return data[key]
 
 
+def modified() -> int:
+    """Instante da ultima escrita no arquivo de configuracao (ns), visivel para todos os processos"""
+    with timed_io("settings"):
+        return os.stat(SOURCE_FILE).st_mtime_ns
+
+
 def set_setting(key: str, value: Any):
-    with open(SOURCE_FILE, 'r+') as conf:
+    with timed_io("settings"), open(SOURCE_FILE, 'r+') as conf:
         data = json.load(conf)
         conf.seek(0)
         conf.truncate(0)
         data[key] = value
-        print(data)
+        logger.debug("Settings updated: %s", data)
         json.dump(data, conf)
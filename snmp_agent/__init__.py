@@ -1,11 +1,20 @@
 __version__ = '0.2.3'
 
 
-from .server import Server
-from .snmp import SNMPRequest, SNMPResponse, VariableBinding
-# from . import utils
+import importlib
 
+# Carregados no primeiro acesso: quem importa apenas um submodulo leve (ex.: snmp_agent.metrics, usado
+# pelo orm e pela CLI) nao paga pelo asyncio do servidor
+_EXPORTS = {
+    "Server": ".server",
+    "SNMPRequest": ".snmp",
+    "SNMPResponse": ".snmp",
+    "VariableBinding": ".snmp",
+}
+# from . import utils
 
-def __init__():
-    print("IMPORTADO")
 
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,189 @@
+"""
+Primitivas BER para mensagens SNMP v1/v2c.
+
+Substitui a biblioteca asn1 generica no caminho de cada requisicao: a resposta e montada em um unico
+bytearray pre-alocado (os comprimentos sao calculados antes da escrita) e a requisicao e lida por
+fatias de um memoryview. A saida e identica, byte a byte, a do encoder asn1 em modo DER usado antes.
+"""
+import threading
+from collections import OrderedDict
+from typing import Tuple
+
+SEQUENCE = 0x30
+
+
+class BERError(ValueError):
+    pass
+
+
+# ------ ENCODE --------------
+def encode_integer(value: int) -> bytes:
+    # Complemento de dois com o menor numero de octetos (igual a asn1.Encoder._encode_integer)
+    if isinstance(value, bool):
+        value = int(value)
+    return value.to_bytes(((value + (value < 0)).bit_length() >> 3) + 1, 'big', signed=True)
+
+
+def encode_oid(oid: str) -> bytes:
+    arcs = [int(arc) for arc in oid.split(".")]
+    if len(arcs) < 2 or arcs[0] > 2 or (arcs[0] <= 1 and arcs[1] > 39):
+        raise BERError(f"Illegal object identifier '{oid}'")
+    return encode_oid_arcs([40 * arcs[0] + arcs[1]] + arcs[2:])
+
+
+def encode_oid_arcs(arcs) -> bytes:
+    """Sub-identificadores em base 128; o primeiro arco ja deve vir combinado (40 * a + b)"""
+    output = bytearray()
+    for arc in arcs:
+        if arc < 0x80:
+            output.append(arc)
+        else:
+            chunk = bytearray((arc & 0x7f,))
+            arc >>= 7
+            while arc:
+                chunk.append(0x80 | (arc & 0x7f))
+                arc >>= 7
+            chunk.reverse()
+            output += chunk
+    return bytes(output)
+
+
+class OidCache(object):
+    """
+    Codificacao BER de prefixos de OID, limitada as `maxsize` entradas usadas mais recentemente.
+
+    Os sub-identificadores sao codificados um a um e concatenados, entao o OID de uma celula de tabela
+    e o prefixo ja codificado (tabela/entrada) seguido apenas dos ultimos `tail` arcos (coluna e linha).
+    A instancia global e usada pelo loop do agente e pela thread de notificacoes: o acesso ao dicionario
+    e feito sob uma trava.
+    """
+
+    def __init__(self, maxsize: int = 1024, tail: int = 2):
+        self.maxsize = maxsize
+        self.tail = tail
+        self._prefixes: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def encode(self, oid: str) -> bytes:
+        parts = oid.rsplit(".", self.tail)
+        if len(parts) <= self.tail:
+            return encode_oid(oid)
+        prefix = parts[0]
+        with self._lock:
+            encoded = self._prefixes.get(prefix)
+            if encoded is not None:
+                self.hits += 1
+                self._prefixes.move_to_end(prefix)
+            else:
+                self.misses += 1
+        if encoded is None:
+            if prefix.count(".") < 1:
+                return encode_oid(oid)
+            encoded = encode_oid(prefix)
+            with self._lock:
+                self._prefixes[prefix] = encoded
+                if len(self._prefixes) > self.maxsize:
+                    self._prefixes.popitem(last=False)
+        return encoded + encode_oid_arcs([int(arc) for arc in parts[1:]])
+
+    def clear(self):
+        with self._lock:
+            self._prefixes.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._prefixes)
+
+
+oid_cache = OidCache()
+
+
+def encode_octet_string(value) -> bytes:
+    if isinstance(value, str):
+        return value.encode('utf-8')
+    return bytes(value)
+
+
+def encode_ipv4(value: str) -> bytes:
+    parts = value.split(".")
+    if len(parts) != 4:
+        raise BERError(f"Illegal IPv4 address '{value}'")
+    return bytes(int(part) for part in parts)
+
+
+def length_size(length: int) -> int:
+    return 1 if length < 0x80 else 1 + ((length.bit_length() + 7) >> 3)
+
+
+def tlv_size(length: int) -> int:
+    """Tamanho total de um TLV de tag curta com `length` octetos de conteudo"""
+    return 1 + length_size(length) + length
+
+
+def put_header(buf: bytearray, pos: int, tag: int, length: int) -> int:
+    buf[pos] = tag
+    pos += 1
+    if length < 0x80:
+        buf[pos] = length
+        return pos + 1
+    size = (length.bit_length() + 7) >> 3
+    buf[pos] = 0x80 | size
+    buf[pos + 1:pos + 1 + size] = length.to_bytes(size, 'big')
+    return pos + 1 + size
+
+
+def put_tlv(buf: bytearray, pos: int, tag: int, content: bytes) -> int:
+    pos = put_header(buf, pos, tag, len(content))
+    end = pos + len(content)
+    buf[pos:end] = content
+    return end
+
+
+# ------ DECODE --------------
+def read_header(data: memoryview, pos: int) -> Tuple[int, int, int]:
+    """Le tag e comprimento em `pos`; retorna (tag, comprimento, posicao do conteudo)"""
+    try:
+        tag = data[pos]
+        if tag & 0x1f == 0x1f:
+            raise BERError("Long form tags are not used by SNMP")
+        length = data[pos + 1]
+        pos += 2
+        if length & 0x80:
+            size = length & 0x7f
+            if size == 0:
+                raise BERError("Indefinite length is not allowed")
+            length = int.from_bytes(data[pos:pos + size], 'big')
+            pos += size
+    except IndexError:
+        raise BERError("Truncated message")
+    if pos + length > len(data):
+        raise BERError("Truncated message")
+    return tag, length, pos
+
+
+def decode_integer(content: memoryview) -> int:
+    if not content:
+        raise BERError("Empty integer")
+    return int.from_bytes(content, 'big', signed=True)
+
+
+def decode_oid(content: memoryview) -> str:
+    if not content:
+        raise BERError("Empty object identifier")
+    arcs = []
+    value = 0
+    for byte in content:
+        value = (value << 7) | (byte & 0x7f)
+        if not byte & 0x80:
+            arcs.append(value)
+            value = 0
+    if not arcs:
+        raise BERError("Malformed object identifier")
+    first = arcs[0]
+    if first < 80:
+        arcs[0:1] = (first // 40, first % 40)
+    else:
+        arcs[0:1] = (2, first - 80)
+    return ".".join(map(str, arcs))
@@ -0,0 +1,73 @@
+"""
+Cache de valores de resposta para GETs repetidos.
+
+Cada subarvore tem seu proprio TTL (maior prefixo configurado); OIDs fora das subarvores
+configuradas nao sao guardados. O cache inteiro e descartado quando:
+    - um SET e processado (um SET pode alterar outros objetos, ex.: mascara e faixa do icmp);
+    - alguem chama invalidate();
+    - a funcao `generation` devolve um valor diferente do ultimo visto. Ela e consultada no maximo
+      uma vez a cada `generation_interval` segundos, entao o custo de I/O nao depende da taxa de GETs.
+Nao ha trava: todas as chamadas devem vir da thread do loop do agente. Mudancas feitas por outras
+threads ou processos (ex.: fim de uma varredura) devem chegar pela `generation`.
+"""
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from snmp_agent import snmp
+from snmp_agent.registry import OidTuple, parse_oid
+
+
+class ResponseCache(object):
+    def __init__(self, ttls: Dict[str, float], generation: Optional[Callable[[], int]] = None,
+                 generation_interval: float = 1.0, maxsize: int = 4096):
+        self._ttls: Dict[OidTuple, float] = {parse_oid(oid): float(ttl) for oid, ttl in ttls.items()}
+        self._generation = generation
+        self._generation_interval = generation_interval
+        self._maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()
+        self._last_generation = None
+        self._next_check = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def ttl(self, oid: str) -> float:
+        key = parse_oid(oid)
+        for length in range(len(key), 0, -1):
+            if (ttl := self._ttls.get(key[:length])) is not None:
+                return ttl
+        return 0.0
+
+    def _check_generation(self, now: float):
+        if self._generation is None or now < self._next_check:
+            return
+        self._next_check = now + self._generation_interval
+        generation = self._generation()
+        if generation != self._last_generation:
+            self._last_generation = generation
+            self._entries.clear()
+
+    def get(self, oid: str) -> Optional[snmp.SNMPLeafValue]:
+        now = time.monotonic()
+        self._check_generation(now)
+        entry = self._entries.get(oid)
+        if entry is None or entry[1] <= now:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[0]
+
+    def put(self, oid: str, value: snmp.SNMPLeafValue):
+        ttl = self.ttl(oid)
+        if ttl <= 0:
+            return
+        self._entries[oid] = (value, time.monotonic() + ttl)
+        self._entries.move_to_end(oid)
+        if len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
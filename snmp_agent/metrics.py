@@ -0,0 +1,227 @@
+"""
+Histogramas de latencia por etapa do atendimento de uma requisicao SNMP.
+
+Etapas registradas pelo SNMPProtocol para cada requisicao:
+    decode, lookup (motor de OIDs e montagem dos valores), settings (conf.json), db (consultas SQL),
+    callback (settings + db), encode, send e total.
+settings e db sao acumulados durante o handler por `timed_io`/`add_io`, chamados pelo modulo settings e
+pelos eventos de cursor da engine do orm; o acumulador vive em uma ContextVar, entao cada tarefa asyncio
+tem o seu e chamadas fora de uma requisicao (ex.: varreduras) nao custam nada alem de um get().
+
+Cada histograma e indexado por (etapa, tipo de PDU, subarvore do primeiro OID) e tem baldes em potencias
+de 2 de microssegundos; os percentis sao o limite superior do balde.
+Os contadores do SNMPProtocol (recebidas, descartadas, malformadas, limitadas...) sao gravados junto.
+"""
+import glob
+import json
+import os
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+BUCKETS = 24  # 1us .. ~8s; o ultimo balde acumula o resto
+
+STAGES = ("decode", "lookup", "settings", "db", "callback", "encode", "send", "total")
+
+_io: ContextVar[Optional[Dict[str, int]]] = ContextVar("snmp_io", default=None)
+
+
+class Histogram(object):
+    __slots__ = ("buckets", "count", "total_ns", "max_ns")
+
+    def __init__(self):
+        self.buckets = [0] * BUCKETS
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def observe(self, ns: int):
+        self.buckets[min((ns // 1000).bit_length(), BUCKETS - 1)] += 1
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def merge(self, other: 'Histogram'):
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+        self.count += other.count
+        self.total_ns += other.total_ns
+        self.max_ns = max(self.max_ns, other.max_ns)
+
+    def percentile(self, q: float) -> int:
+        """Limite superior, em microssegundos, do balde que contem o quantil q"""
+        if not self.count:
+            return 0
+        wanted = q * self.count
+        seen = 0
+        for bucket, n in enumerate(self.buckets):
+            seen += n
+            if seen >= wanted:
+                return 1 << bucket
+        return 1 << (BUCKETS - 1)
+
+    def to_dict(self) -> dict:
+        return {"buckets": self.buckets, "count": self.count, "total_ns": self.total_ns, "max_ns": self.max_ns}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Histogram':
+        histogram = cls()
+        histogram.buckets = list(data["buckets"])
+        histogram.count = data["count"]
+        histogram.total_ns = data["total_ns"]
+        histogram.max_ns = data["max_ns"]
+        return histogram
+
+
+Key = Tuple[str, str, str]
+
+
+class Metrics(object):
+    def __init__(self, subtree_depth: int = 7):
+        self.subtree_depth = subtree_depth
+        self.histograms: Dict[Key, Histogram] = {}
+        self.counters: Dict[str, int] = {}
+
+    def subtree(self, oid: str) -> str:
+        return ".".join(oid.split(".", self.subtree_depth)[:self.subtree_depth])
+
+    def observe(self, stage: str, pdu: str, subtree: str, ns: int):
+        key = (stage, pdu, subtree)
+        if (histogram := self.histograms.get(key)) is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(ns)
+
+    def observe_request(self, pdu: str, subtree: str, stages: Dict[str, int]):
+        for stage, ns in stages.items():
+            self.observe(stage, pdu, subtree, ns)
+
+    def rows(self) -> List[Tuple[Key, Histogram]]:
+        return sorted(self.histograms.items(), key=lambda item: (item[0][2], item[0][1], STAGES.index(item[0][0])))
+
+    def merge(self, other: 'Metrics'):
+        for key, histogram in other.histograms.items():
+            if key in self.histograms:
+                self.histograms[key].merge(histogram)
+            else:
+                self.histograms[key] = Histogram.from_dict(histogram.to_dict())
+        for name, value in other.counters.items():
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def dump(self, path: str, counters: Optional[Dict[str, int]] = None):
+        """`counters`: contadores do SNMPProtocol deste processo (ver Server.protocol)"""
+        data = {"pid": os.getpid(), "written_at": time.time(),
+                "histograms": [dict(stage=k[0], pdu=k[1], subtree=k[2], **h.to_dict()) for k, h in self.rows()],
+                "counters": dict(counters or {})}
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as output:
+            json.dump(data, output)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, paths: List[str]) -> 'Metrics':
+        """Soma os histogramas e contadores gravados por um ou mais processos do agente"""
+        metrics = cls()
+        for path in paths:
+            with open(path) as source:
+                data = json.load(source)
+            single = cls()
+            single.histograms = {(entry["stage"], entry["pdu"], entry["subtree"]): Histogram.from_dict(entry)
+                                 for entry in data["histograms"]}
+            single.counters = data.get("counters", {})
+            metrics.merge(single)
+        return metrics
+
+
+class SharedMetrics(object):
+    """
+    Visao somada de todos os processos do agente (modo multiprocesso): os histogramas deste processo, ao
+    vivo, mais os gravados pelos demais em `<metrics_file>.*`. A soma e refeita no maximo a cada `interval`
+    segundos e os arquivos dos outros processos so sao relidos quando mudam; entre uma soma e outra todas
+    as leituras (ex.: um walk na agentLatencyTable) veem as mesmas linhas.
+    """
+
+    def __init__(self, local: Metrics, pattern: str, own: str, interval: float = 1.0):
+        self._local = local
+        self._pattern = pattern
+        self._own = own
+        self._interval = interval
+        self._next_check = 0.0
+        self._peer_files: List[Tuple[str, int]] = []
+        self._peers = Metrics()
+        self._rows: List[Tuple[Key, Histogram]] = []
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self._interval
+        files = []
+        for path in sorted(glob.glob(self._pattern)):
+            if path == self._own or path.endswith(".tmp"):
+                continue
+            try:
+                files.append((path, os.stat(path).st_mtime_ns))
+            except FileNotFoundError:
+                continue
+        if files != self._peer_files:
+            try:
+                self._peers = Metrics.load([path for path, _ in files])
+            except (OSError, ValueError):
+                pass  # arquivo trocado durante a leitura: tenta de novo na proxima soma
+            else:
+                self._peer_files = files
+        merged = Metrics()
+        merged.merge(self._peers)
+        merged.merge(self._local)
+        self._rows = merged.rows()
+
+    def rows(self) -> List[Tuple[Key, Histogram]]:
+        self._refresh()
+        return self._rows
+
+
+# ------ ETAPAS DE I/O DO HANDLER --------------
+def begin_io() -> Dict[str, int]:
+    acc = {"settings": 0, "db": 0}
+    _io.set(acc)
+    return acc
+
+
+def end_io():
+    _io.set(None)
+
+
+def add_io(stage: str, ns: int):
+    if (acc := _io.get()) is not None:
+        acc[stage] += ns
+
+
+class timed_io(object):
+    """with timed_io("settings"): ... -- soma o tempo do bloco a etapa, se houver uma requisicao em andamento"""
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+
+    def __exit__(self, *exc):
+        add_io(self.stage, time.perf_counter_ns() - self.start)
+
+
+request_metrics = Metrics()
+_agent_metrics: Optional[SharedMetrics] = None
+
+
+def install_shared(metrics_file: str, own: str):
+    """Chamado nos workers do modo multiprocesso; `own` e o arquivo gravado por este processo"""
+    global _agent_metrics
+    _agent_metrics = SharedMetrics(request_metrics, f"{metrics_file}.*", own)
+
+
+def agent_rows() -> List[Tuple[Key, Histogram]]:
+    """Linhas da agentLatencyTable: deste processo ou, no modo multiprocesso, de todos os workers"""
+    if _agent_metrics is None:
+        return request_metrics.rows()
+    return _agent_metrics.rows()
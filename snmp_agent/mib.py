@@ -0,0 +1,232 @@
+"""
+Motor generico de GetNext/GetBulk sobre um OidRegistry.
+
+Escalares sao VariableBind comuns (o valor fica no proprio OID). Tabelas sao declaradas com um
+provedor por coluna e uma RowSource, que entrega as linhas em ordem crescente de indice. O sucessor
+lexicografico de um OID e calculado pelo proprio motor: a tabela que contem o OID (maior prefixo)
+e depois os objetos registrados seguintes, em ordem. Nenhum objeto precisa conhecer o seu vizinho.
+Para o GetBulk, `walk` pede a cada tabela uma fatia de linhas (RowSource.rows_after) de uma vez.
+Tabelas lidas do banco podem usar SnapshotRowSource, uma imagem em memoria recarregada so quando os
+dados mudam.
+"""
+import time
+from bisect import bisect_right
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from snmp_agent import snmp
+from snmp_agent.registry import OidRegistry, OidTuple, parse_oid, format_oid
+
+Row = Any
+ColumnProvider = Callable[[Row], snmp.SNMPLeafValue]
+
+
+class RowSource(object):
+    """Fonte das linhas de uma tabela, indexadas por inteiros crescentes"""
+
+    def get_row(self, index: int) -> Optional[Row]:
+        raise NotImplementedError
+
+    def next_row(self, after: Optional[int]) -> Optional[Tuple[int, Row]]:
+        """Primeira linha com indice maior que `after` (ou a primeira linha, se `after` for None)"""
+        raise NotImplementedError
+
+    def rows_after(self, after: Optional[int], limit: int) -> List[Tuple[int, Row]]:
+        rows = []
+        while len(rows) < limit and (item := self.next_row(after)) is not None:
+            rows.append(item)
+            after = item[0]
+        return rows
+
+
+class SequenceRowSource(RowSource):
+    """Linhas calculadas em memoria a cada acesso; o indice e a posicao na sequencia, comecando em 1"""
+
+    def __init__(self, rows: Callable[[], Sequence[Row]]):
+        self._rows = rows
+
+    def get_row(self, index: int) -> Optional[Row]:
+        rows = self._rows()
+        return rows[index - 1] if 1 <= index <= len(rows) else None
+
+    def next_row(self, after: Optional[int]) -> Optional[Tuple[int, Row]]:
+        rows = self._rows()
+        index = 1 if after is None or after < 1 else after + 1
+        return (index, rows[index - 1]) if index <= len(rows) else None
+
+    def rows_after(self, after: Optional[int], limit: int) -> List[Tuple[int, Row]]:
+        rows = self._rows()
+        start = 0 if after is None or after < 0 else after
+        return [(i + 1, rows[i]) for i in range(start, min(start + limit, len(rows)))]
+
+
+class SnapshotRowSource(RowSource):
+    """
+    Imagem em memoria de uma tabela: indices ordenados, as linhas (tuplas) na mesma ordem e um mapa
+    indice -> posicao. A imagem e recarregada quando `generation()` muda, consultado no maximo a cada
+    `interval` segundos; entre recargas todas as celulas vem da mesma versao da tabela, e cada acesso e
+    uma busca no dicionario (get_row) ou na lista ordenada (next_row/rows_after).
+
+    Tabelas em que linhas so sao acrescentadas, com indices crescentes (ex.: o historico), podem informar
+    `load_from(index)`, que devolve as linhas com indice >= index: a recarga busca entao so as linhas novas,
+    a partir da ultima ja conhecida. Se essa ultima linha sumiu ou mudou (ex.: a tabela foi apagada), a
+    imagem e recarregada por inteiro com `load()`.
+    """
+
+    def __init__(self, load: Callable[[], List[Tuple[int, Row]]], generation: Callable[[], int],
+                 interval: float = 1.0, load_from: Optional[Callable[[int], List[Tuple[int, Row]]]] = None):
+        self._load = load
+        self._load_from = load_from
+        self._generation = generation
+        self._interval = interval
+        self._version = None
+        self._next_check = 0.0
+        self._indices: List[int] = []
+        self._rows: List[Row] = []
+        self._positions: Dict[int, int] = {}
+
+    @property
+    def version(self):
+        return self._version
+
+    def refresh(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return
+        self._next_check = now + self._interval
+        # A geracao e lida antes da carga: uma escrita concorrente provoca nova carga na proxima consulta
+        generation = self._generation()
+        if force or generation != self._version:
+            if force or not self._append():
+                rows = sorted(self._load(), key=lambda item: item[0])
+                self._indices = [index for index, _ in rows]
+                self._rows = [tuple(row) for _, row in rows]
+                self._positions = {index: position for position, index in enumerate(self._indices)}
+            self._version = generation
+
+    def _append(self) -> bool:
+        """Acrescenta as linhas novas; False se for preciso recarregar a tabela inteira"""
+        if self._load_from is None or not self._indices:
+            return False
+        last = self._indices[-1]
+        rows = sorted(self._load_from(last), key=lambda item: item[0])
+        if not rows or rows[0][0] != last or tuple(rows[0][1]) != self._rows[-1]:
+            return False
+        for index, row in rows[1:]:
+            self._positions[index] = len(self._indices)
+            self._indices.append(index)
+            self._rows.append(tuple(row))
+        return True
+
+    def get_row(self, index: int) -> Optional[Row]:
+        self.refresh()
+        position = self._positions.get(index)
+        return self._rows[position] if position is not None else None
+
+    def next_row(self, after: Optional[int]) -> Optional[Tuple[int, Row]]:
+        rows = self.rows_after(after, 1)
+        return rows[0] if rows else None
+
+    def rows_after(self, after: Optional[int], limit: int) -> List[Tuple[int, Row]]:
+        self.refresh()
+        start = 0 if after is None else bisect_right(self._indices, after)
+        end = min(start + limit, len(self._indices))
+        return [(self._indices[position], self._rows[position]) for position in range(start, end)]
+
+    def __len__(self):
+        self.refresh()
+        return len(self._indices)
+
+
+class Table(snmp.VariableBind):
+    """
+    Tabela declarativa registrada pelo OID da entrada (ex.: historyEntry). As instancias sao
+    <entrada>.<coluna>.<indice>, percorridas coluna a coluna como manda a ordem lexicografica.
+    """
+
+    def __init__(self, oid: str, columns: Dict[int, ColumnProvider], rows: RowSource):
+        super().__init__(oid, read=self._read_cell, use_start_with=True)
+        self.key = parse_oid(oid)
+        self.columns = columns
+        self.column_numbers = sorted(columns)
+        self.rows = rows
+
+    def _read_cell(self, vb: snmp.VariableBinding) -> Tuple[int, snmp.SNMPLeafValue]:
+        rel = parse_oid(vb.oid)[len(self.key):]
+        if len(rel) != 2 or rel[0] not in self.columns:
+            return 2, snmp.NoSuchInstance()
+        row = self.rows.get_row(rel[1])
+        if row is None:
+            return 2, snmp.NoSuchInstance()
+        return 0, self.columns[rel[0]](row)
+
+    def start(self, oid: OidTuple) -> Tuple[int, Optional[int]]:
+        """Posicao (indice da coluna em column_numbers, ultimo indice de linha ja visto) a partir da qual buscar"""
+        if oid[:len(self.key)] != self.key:
+            return 0, None  # OID anterior a tabela
+        rel = oid[len(self.key):]
+        if not rel:
+            return 0, None
+        for position, column in enumerate(self.column_numbers):
+            if column == rel[0]:
+                return position, rel[1] if len(rel) > 1 else None
+            if column > rel[0]:
+                return position, None
+        return len(self.column_numbers), None
+
+    def successors(self, oid: OidTuple, limit: int) -> List[Tuple[OidTuple, snmp.SNMPLeafValue]]:
+        """Ate `limit` instancias apos `oid`; as linhas de cada coluna vem de uma unica chamada a rows_after"""
+        output = []
+        position, after = self.start(oid)
+        while position < len(self.column_numbers) and len(output) < limit:
+            column = self.column_numbers[position]
+            wanted = limit - len(output)
+            rows = self.rows.rows_after(after, wanted)
+            output.extend((self.key + (column, index), self.columns[column](row)) for index, row in rows)
+            if len(rows) == wanted:
+                break
+            position, after = position + 1, None
+        return output
+
+
+def scalar_successors(vb: snmp.VariableBind, oid: OidTuple) -> List[Tuple[OidTuple, snmp.SNMPLeafValue]]:
+    key = parse_oid(vb.oid)
+    if key <= oid or vb.access == snmp.VariableBind.Access.WRITE_ONLY:
+        return []
+    err, value = vb.read(snmp.VariableBinding(vb.oid, snmp.Null()))
+    return [(key, value)] if err == 0 else []
+
+
+def successors(vb: snmp.VariableBind, oid: OidTuple, limit: int) -> List[Tuple[OidTuple, snmp.SNMPLeafValue]]:
+    if isinstance(vb, Table):
+        return vb.successors(oid, limit)
+    return scalar_successors(vb, oid)
+
+
+def walk(registry: OidRegistry, oid: str, limit: int) -> List[Tuple[str, snmp.SNMPLeafValue]]:
+    """
+    Ate `limit` sucessores lexicograficos consecutivos de `oid`. Se o fim da MIB for alcancado, a lista
+    termina com um EndOfMibView.
+    """
+    key = parse_oid(oid)
+    found: List[Tuple[OidTuple, snmp.SNMPLeafValue]] = []
+
+    # Tabela que contem o OID pedido
+    if (table := registry.longest_prefix(key)) is not None:
+        found.extend(successors(table, key, limit))
+
+    # Objetos seguintes, em ordem lexicografica
+    current = key
+    while len(found) < limit and (current := registry.next_key(current)) is not None:
+        for vb in (registry.exact(current), registry.prefix(current)):
+            if vb is not None and len(found) < limit:
+                found.extend(successors(vb, key, limit - len(found)))
+
+    output = [(format_oid(k), value) for k, value in found]
+    if len(output) < limit:
+        output.append((output[-1][0] if output else oid, snmp.EndOfMibView()))
+    return output
+
+
+def next_binding(registry: OidRegistry, oid: str) -> Tuple[str, snmp.SNMPLeafValue]:
+    """Sucessor lexicografico de `oid` no registro; EndOfMibView no proprio OID se nao houver"""
+    return walk(registry, oid, 1)[0]
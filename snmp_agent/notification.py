@@ -0,0 +1,103 @@
+"""
+Envio de notificacoes SNMPv2c (SNMPv2-Trap e InformRequest) para os receptores configurados.
+
+Cada notificacao leva sysUpTime.0 e snmpTrapOID.0 antes das variaveis do evento (RFC 3416). Informs
+esperam a confirmacao (GetResponse com o mesmo request-id) por `timeout` segundos e sao reenviados ate
+`retries` vezes. O envio e bloqueante: deve ser feito fora do loop asyncio do agente.
+"""
+import itertools
+import logging
+import socket
+import time
+from typing import Dict, List, Optional
+
+from snmp_agent import ber, snmp
+from snmp_agent.ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+SYS_UPTIME = "1.3.6.1.2.1.1.3.0"
+SNMP_TRAP_OID = "1.3.6.1.6.3.1.1.4.1.0"
+SNMP_TRAP_ENTERPRISE = "1.3.6.1.6.3.1.1.4.3.0"
+
+
+class Receiver(object):
+    def __init__(self, host: str, port: int = 162, community: str = "public", inform: bool = False):
+        self.host = host
+        self.port = port
+        self.community = community
+        self.inform = inform
+
+    @property
+    def address(self):
+        return self.host, self.port
+
+    def __repr__(self):
+        return f"<Receiver({self.host}:{self.port}, inform={self.inform})>"
+
+
+class NotificationSender(object):
+    def __init__(self, receivers: List[Receiver], limiter: Optional[TokenBucket] = None,
+                 timeout: float = 1.0, retries: int = 2):
+        self.receivers = receivers
+        self.limiter = limiter
+        self.timeout = timeout
+        self.retries = retries
+        self.started_at = time.monotonic()
+        self.counters: Dict[str, int] = {"sent": 0, "acknowledged": 0, "unacknowledged": 0, "rate_limited": 0}
+        self._request_ids = itertools.count(1)
+
+    def uptime(self) -> snmp.TimeTicks:
+        return snmp.TimeTicks(int((time.monotonic() - self.started_at) * 100) & 0xFFFFFFFF)
+
+    def send(self, trap_oid: str, variable_bindings: List[snmp.VariableBinding], enterprise: Optional[str] = None):
+        """Envia a notificacao a todos os receptores; retorna False se ela foi descartada pelo limitador"""
+        if self.limiter is not None and not self.limiter.try_acquire():
+            self.counters["rate_limited"] += 1
+            return False
+        header = [snmp.VariableBinding(SYS_UPTIME, self.uptime()),
+                  snmp.VariableBinding(SNMP_TRAP_OID, snmp.ObjectIdentifier(trap_oid))]
+        if enterprise is not None:
+            variable_bindings = variable_bindings + [
+                snmp.VariableBinding(SNMP_TRAP_ENTERPRISE, snmp.ObjectIdentifier(enterprise))]
+        for receiver in self.receivers:
+            notification = snmp.SNMPNotification(community=receiver.community, request_id=next(self._request_ids),
+                                                  variable_bindings=header + variable_bindings,
+                                                  inform=receiver.inform)
+            try:
+                self._deliver(receiver, notification)
+            except OSError as e:
+                logger.warning("Notification to %s failed: %r", receiver, e)
+        return True
+
+    def _deliver(self, receiver: Receiver, notification: snmp.SNMPNotification):
+        data = snmp.encode_response(notification)
+        with socket.socket(socket.AF_INET6 if ":" in receiver.host else socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            if not receiver.inform:
+                sock.sendto(data, receiver.address)
+                self.counters["sent"] += 1
+                return
+            sock.settimeout(self.timeout)
+            for _ in range(self.retries + 1):
+                sock.sendto(data, receiver.address)
+                self.counters["sent"] += 1
+                if self._acknowledged(sock, notification.request_id):
+                    self.counters["acknowledged"] += 1
+                    return
+            self.counters["unacknowledged"] += 1
+            logger.warning("Inform %d to %s was not acknowledged", notification.request_id, receiver)
+
+    def _acknowledged(self, sock: socket.socket, request_id: int) -> bool:
+        deadline = time.monotonic() + self.timeout
+        while (remaining := deadline - time.monotonic()) > 0:
+            sock.settimeout(remaining)
+            try:
+                data = sock.recv(65535)
+            except socket.timeout:
+                return False
+            try:
+                if snmp.decode_response(data).request_id == request_id:
+                    return True
+            except (ber.BERError, NotImplementedError, UnicodeDecodeError):
+                continue
+        return False
@@ -0,0 +1,59 @@
+"""
+Token bucket: `rate` fichas por segundo, acumulando no maximo `burst`. Cada evento consome uma ficha;
+sem fichas o evento e recusado (quem chama decide se descarta ou adia).
+KeyedTokenBuckets mantem um bucket por chave (ex.: IP de origem), limitado as `max_keys` chaves
+usadas mais recentemente.
+"""
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+
+class TokenBucket(object):
+    __slots__ = ("rate", "burst", "tokens", "updated_at", "_clock")
+
+    def __init__(self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self._clock = clock
+        self.updated_at = clock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_acquire(self, n: float = 1) -> bool:
+        self._refill(self._clock())
+        if self.tokens >= n:
+            self.tokens -= n
+            return True
+        return False
+
+    def wait_time(self, n: float = 1) -> float:
+        """Segundos ate haver `n` fichas"""
+        self._refill(self._clock())
+        return max(n - self.tokens, 0) / self.rate if self.rate > 0 else float("inf")
+
+
+class KeyedTokenBuckets(object):
+    def __init__(self, rate: float, burst: float, max_keys: int = 4096, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets: OrderedDict = OrderedDict()
+
+    def try_acquire(self, key: Hashable, n: float = 1) -> bool:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.burst, clock=self._clock)
+            if len(self._buckets) > self.max_keys:
+                # Uma chave esquecida volta com o bucket cheio; max_keys deve cobrir os gerentes legitimos
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket.try_acquire(n)
+
+    def __len__(self):
+        return len(self._buckets)
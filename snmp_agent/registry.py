@@ -0,0 +1,75 @@
+from bisect import bisect_right, insort
+from typing import Dict, List, Tuple, Union, Optional, Iterable
+
+from snmp_agent import snmp
+
+OidTuple = Tuple[int, ...]
+
+
+def parse_oid(oid: Union[str, OidTuple]) -> OidTuple:
+    if isinstance(oid, tuple):
+        return oid
+    oid = oid.strip(".")
+    if not oid:
+        return ()
+    return tuple(int(arc) for arc in oid.split("."))
+
+
+def format_oid(oid: OidTuple) -> str:
+    return ".".join(str(arc) for arc in oid)
+
+
+class OidRegistry(object):
+    """
+    Registro estatico das VariableBind do agente, montado uma vez na inicializacao.
+
+    Os OIDs sao guardados como tuplas de inteiros: busca exata por dicionario, busca do maior
+    prefixo (entradas use_start_with, ex.: tabelas) testando os prefixos do OID pedido, e uma lista
+    ordenada para percorrer as entradas em ordem lexicografica. Entradas exatas e de prefixo ficam
+    separadas, entao um no intermediario e a tabela abaixo dele podem ter o mesmo OID.
+    """
+
+    def __init__(self, vbs: Iterable[snmp.VariableBind] = ()):
+        self._exact: Dict[OidTuple, snmp.VariableBind] = {}
+        self._prefix: Dict[OidTuple, snmp.VariableBind] = {}
+        self._sorted: List[OidTuple] = []
+        for vb in vbs:
+            self.register(vb)
+
+    def register(self, vb: snmp.VariableBind):
+        key = parse_oid(vb.oid)
+        table, other = (self._prefix, self._exact) if vb.use_start_with else (self._exact, self._prefix)
+        if key in table:
+            raise ValueError(f"OID {vb.oid} is already registered")
+        table[key] = vb
+        if key not in other:
+            insort(self._sorted, key)
+
+    def exact(self, oid: Union[str, OidTuple]) -> Optional[snmp.VariableBind]:
+        return self._exact.get(parse_oid(oid))
+
+    def prefix(self, oid: Union[str, OidTuple]) -> Optional[snmp.VariableBind]:
+        return self._prefix.get(parse_oid(oid))
+
+    def longest_prefix(self, oid: Union[str, OidTuple]) -> Optional[snmp.VariableBind]:
+        key = parse_oid(oid)
+        for length in range(len(key), 0, -1):
+            if vb := self._prefix.get(key[:length]):
+                return vb
+        return None
+
+    def find(self, oid: Union[str, OidTuple]) -> Optional[snmp.VariableBind]:
+        """Mesma semantica de utils.find_varbind: igualdade exata ou prefixo de uma entrada use_start_with"""
+        key = parse_oid(oid)
+        return self._exact.get(key) or self.longest_prefix(key)
+
+    def next_key(self, oid: Union[str, OidTuple]) -> Optional[OidTuple]:
+        """Primeiro OID registrado estritamente maior que `oid`, em ordem lexicografica"""
+        index = bisect_right(self._sorted, parse_oid(oid))
+        return self._sorted[index] if index < len(self._sorted) else None
+
+    def keys(self) -> List[OidTuple]:
+        return list(self._sorted)
+
+    def __len__(self):
+        return len(self._exact) + len(self._prefix)
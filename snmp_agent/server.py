@@ -1,64 +1,169 @@
-from typing import Callable, Awaitable
+from typing import Callable, Awaitable, Optional
 import asyncio
-import functools
 import logging
+import time
 
-from snmp_agent import snmp
+from snmp_agent import ber, snmp
+from snmp_agent.metrics import Metrics, begin_io, end_io
+from snmp_agent.ratelimit import KeyedTokenBuckets
 
 logger = logging.getLogger(__name__)
 
 
 class SNMPProtocol(asyncio.BaseProtocol):
-    def __init__(self, handler: Callable[[snmp.SNMPRequest], Awaitable[snmp.SNMPResponse]]):
+    """
+    Decodifica e codifica no proprio loop (sao microssegundos de CPU; o executor so adicionava duas
+    trocas de thread). No maximo `max_in_flight` requisicoes ficam em andamento: o excedente e
+    descartado ainda no recebimento, antes de decodificar, e contado em `dropped`.
+    Se `metrics` for informado, o tempo de cada etapa e registrado nele (ver snmp_agent.metrics).
+
+    Controle de admissao, antes de decodificar: um token bucket por IP de origem (`source_limit`) e outro
+    por community (`community_limit`, lida sem decodificar o PDU). Datagramas sem ficha sao descartados e
+    contados em `rate_limited_source`/`rate_limited_community`.
+    """
+
+    PDU_NAMES = {
+        snmp.SnmpGetContext: "get",
+        snmp.SnmpGetNextContext: "getnext",
+        snmp.SnmpGetBulkContext: "getbulk",
+        snmp.SnmpSetRequestContext: "set",
+    }
+
+    def __init__(self, handler: Callable[[snmp.SNMPRequest], Awaitable[snmp.SNMPResponse]],
+                 max_in_flight: int = 256, metrics: Optional[Metrics] = None,
+                 source_limit: Optional[KeyedTokenBuckets] = None,
+                 community_limit: Optional[KeyedTokenBuckets] = None):
         self._handler = handler
+        self._metrics = metrics
+        self._source_limit = source_limit
+        self._community_limit = community_limit
+        self._max_in_flight = max_in_flight
+        self._in_flight = 0
+        self.counters = {"received": 0, "responded": 0, "dropped": 0, "malformed": 0, "errors": 0,
+                         "rate_limited_source": 0, "rate_limited_community": 0}
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
 
     def connection_made(self, transport):
         self.transport = transport
 
     def datagram_received(self, data, addr):
-        loop = asyncio.get_event_loop()
-        loop.create_task(self._handle(data=data, address=addr))
+        self.counters["received"] += 1
+        if self._in_flight >= self._max_in_flight:
+            self.counters["dropped"] += 1
+            return
+        if self._source_limit is not None and not self._source_limit.try_acquire(addr[0]):
+            self.counters["rate_limited_source"] += 1
+            return
+        if self._community_limit is not None:
+            if (community := snmp.peek_community(data)) is None:
+                self.counters["malformed"] += 1
+                return
+            if not self._community_limit.try_acquire(community):
+                self.counters["rate_limited_community"] += 1
+                return
 
-    async def _handle(self, data, address):
         # Decode request
-        loop = asyncio.get_event_loop()
-        req = await loop.run_in_executor(
-            None, functools.partial(snmp.decode_request, data=data))
-        # logger.debug(f"Received: {req.to_dict()}")
-
+        start = time.perf_counter_ns()
+        try:
+            req = snmp.decode_request(data)
+        except (ber.BERError, NotImplementedError, UnicodeDecodeError) as e:
+            self.counters["malformed"] += 1
+            logger.debug("Malformed request from %s: %s", addr, e)
+            return
+        decode_ns = time.perf_counter_ns() - start
+
+        self._in_flight += 1
+        asyncio.get_event_loop().create_task(self._handle(req=req, address=addr, decode_ns=decode_ns))
+
+    async def _handle(self, req, address, decode_ns: int = 0):
+        try:
+            if self._metrics is None:
+                await self._respond(req, address)
+            else:
+                await self._respond_timed(req, address, decode_ns)
+        except Exception:
+            self.counters["errors"] += 1
+            logger.exception("Error handling request from %s", address)
+        finally:
+            self._in_flight -= 1
+
+    async def _respond(self, req, address):
         # Callback
         res = await self._handler(req)
 
         if res is not None:
             # Encode response
-            res_data = await loop.run_in_executor(
-                None, functools.partial(snmp.encode_response, response=res))
-
-            self.transport.sendto(res_data, address)
-            #logger.debug(f"Responded: {res.to_dict()}")
-
+            self.transport.sendto(snmp.encode_response(res), address)
+            self.counters["responded"] += 1
         else:
-            logger.debug(f"Response none")
+            logger.debug("Response none")
+
+    async def _respond_timed(self, req, address, decode_ns: int):
+        start = time.perf_counter_ns()
+        io = begin_io()
+        try:
+            res = await self._handler(req)
+        finally:
+            end_io()
+        handler_ns = time.perf_counter_ns() - start
+        encode_ns = send_ns = 0
+
+        if res is not None:
+            start = time.perf_counter_ns()
+            data = snmp.encode_response(res)
+            encode_ns = time.perf_counter_ns() - start
+            start = time.perf_counter_ns()
+            self.transport.sendto(data, address)
+            send_ns = time.perf_counter_ns() - start
+            self.counters["responded"] += 1
+
+        callback_ns = io["settings"] + io["db"]
+        oid = req.variable_bindings[0].oid if req.variable_bindings else ""
+        self._metrics.observe_request(self.PDU_NAMES.get(type(req.context), "other"), self._metrics.subtree(oid), {
+            "decode": decode_ns,
+            "lookup": max(handler_ns - callback_ns, 0),
+            "settings": io["settings"],
+            "db": io["db"],
+            "callback": callback_ns,
+            "encode": encode_ns,
+            "send": send_ns,
+            "total": decode_ns + handler_ns + encode_ns + send_ns,
+        })
 
 
 class Server(object):
     def __init__(self, handler: Callable[[snmp.SNMPRequest], Awaitable[snmp.SNMPResponse]], 
-                 host: str = '127.0.0.1', port: int = 161):
+                 host: str = '127.0.0.1', port: int = 161, max_in_flight: int = 256, reuse_port: bool = False,
+                 metrics: Optional[Metrics] = None, source_limit: Optional[KeyedTokenBuckets] = None,
+                 community_limit: Optional[KeyedTokenBuckets] = None):
         self._host = host
         self._port = port
         self._handler = handler
+        self._max_in_flight = max_in_flight
+        # Varios processos podem escutar a mesma porta (SO_REUSEPORT); o kernel distribui os datagramas
+        self._reuse_port = reuse_port
+        self._metrics = metrics
+        self._source_limit = source_limit
+        self._community_limit = community_limit
         self._server = None
+        self.protocol = None
 
     async def start(self):
         def create_snmp_server():
-            return SNMPProtocol(handler=self._handler)
+            return SNMPProtocol(handler=self._handler, max_in_flight=self._max_in_flight, metrics=self._metrics,
+                                source_limit=self._source_limit, community_limit=self._community_limit)
 
         loop = asyncio.get_event_loop()
         listen = loop.create_datagram_endpoint(
             create_snmp_server,
-            local_addr=(self._host, self._port))
+            local_addr=(self._host, self._port),
+            reuse_port=self._reuse_port or None)
         transport, protocol = await listen
         self._server = transport
+        self.protocol = protocol
 
         logger.info(f"SNMP server is running on {self._host}:{self._port}")
 
@@ -2,9 +2,8 @@ from __future__ import annotations
 
 from enum import Enum, auto
 from typing import List, Dict, Tuple, Any, Optional, Callable, Union
-import ipaddress
 
-import asn1
+from snmp_agent import ber
 
 
 # SNMP Version
@@ -21,6 +20,8 @@ class VERSION(object):
 
 # ASN.1 TAG
 class Tag(object):
+    __slots__ = ("name", "code")
+
     def __init__(self, name, code):
         self.name = name
         self.code = code
@@ -59,6 +60,8 @@ class ASN1(object):
     GET_RESPONSE = Tag(name='GET_RESPONSE', code=0xA2)
     SET_REQUEST = Tag(name='SET_REQUEST', code=0xA3)
     GET_BULK_REQUEST = Tag(name='GET_BULK_REQUEST', code=0xA5)
+    INFORM_REQUEST = Tag(name='INFORM_REQUEST', code=0xA6)
+    SNMPV2_TRAP = Tag(name='SNMPV2_TRAP', code=0xA7)
 
     _bind_tuple = {
         (0, 0, 64): IPADDRESS
@@ -67,15 +70,21 @@ class ASN1(object):
     @classmethod
     def get_tag(cls, tupl: Tuple[int, int, int]) -> Tag:
         if t := cls._bind_tuple.get(tupl, None):
-            print(f"RETORNANDO UM TIPO NAO NULLO IP ADDRESS {t.name}")
-
             return t
         return cls.NULL
 
+    @classmethod
+    def from_code(cls, code: int) -> Tag:
+        return _TAGS_BY_CODE.get(code, cls.NULL)
+
+
+_TAGS_BY_CODE: Dict[int, Tag] = {t.code: t for t in vars(ASN1).values() if isinstance(t, Tag)}
+
 
 class SNMPValue(object):
-    def __init__(self):
-        self.tag: Tag = None
+    # Os tipos concretos fixam a tag na classe: uma unica instancia de Tag por tipo, nenhuma por valor
+    __slots__ = ()
+    tag: Tag = None
 
     def get_class(self) -> int:
         return self.tag.get_class()
@@ -88,251 +97,329 @@ class SNMPValue(object):
 
 
 class SNMPLeafValue(SNMPValue):
+    """Valor generico (ex.: decodificado de uma requisicao), com a tag na instancia"""
+    __slots__ = ("value", "_tag", "tag_tuple")
+
     def __init__(self, tag=None, value=None, tag_tuple=None):
-        super().__init__()
         self.value: Any = value
-        self.tag: Tag = tag
+        self._tag: Tag = tag
         self.tag_tuple = tag_tuple
 
+    @property
+    def tag(self) -> Tag:
+        return self._tag
+
     def encode(self) -> bytes:
         raise NotImplementedError
 
 
 class Integer(SNMPLeafValue):
+    __slots__ = ()
+    tag = ASN1.INTEGER
+    _cache: Dict[int, 'Integer'] = {}
+
+    def __new__(cls, value: int):
+        # Inteiros pequenos (status, flags, contadores baixos) sao compartilhados
+        if type(value) is int and -1 <= value <= 255 and cls is Integer:
+            if (instance := cls._cache.get(value)) is None:
+                instance = cls._cache[value] = super().__new__(cls)
+            return instance
+        return super().__new__(cls)
+
     def __init__(self, value: int):
         self.value = value
-        self.tag = ASN1.INTEGER
 
     def encode(self) -> bytes:
-        if isinstance(self.value, bool):
-            self.value = 1 if self.value is True else 0
-        return asn1.Encoder._encode_integer(self.value)
+        return ber.encode_integer(self.value)
 
 
 class Boolean(SNMPLeafValue):
+    __slots__ = ()
+    tag = ASN1.INTEGER
+
     def __init__(self, value: bool):
         self.value = value
-        self.tag = ASN1.INTEGER
 
     def encode(self) -> bytes:
-        return asn1.Encoder._encode_boolean(self.value)
+        return b'\xff' if self.value else b'\x00'
 
 
 class OctetString(SNMPLeafValue):
+    __slots__ = ()
+    tag = ASN1.OCTET_STRING
+
     def __init__(self, value: str):
         self.value = value
-        self.tag = ASN1.OCTET_STRING
-
-    def encode(self) -> bytes:
-        return asn1.Encoder._encode_octet_string(self.value)
-
-
-class Null(SNMPLeafValue):
-    def __init__(self):
-        super().__init__()
-        self.value = None
-        self.tag = ASN1.NULL
 
     def encode(self) -> bytes:
-        return asn1.Encoder._encode_null()
+        return ber.encode_octet_string(self.value)
 
 
 class ObjectIdentifier(SNMPLeafValue):
+    __slots__ = ()
+    tag = ASN1.OBJECT_IDENTIFIER
+
     def __init__(self, value: str):
         self.value = value
-        self.tag = ASN1.OBJECT_IDENTIFIER
 
     def encode(self) -> bytes:
-        return asn1.Encoder()._encode_object_identifier(self.value)
+        return ber.encode_oid(self.value)
 
 
 class IPAddress(SNMPLeafValue):
+    __slots__ = ()
+    tag = ASN1.IPADDRESS
+
     def __init__(self, value: str):
         self.value = value
-        self.tag = ASN1.IPADDRESS
 
     def encode(self) -> bytes:
-        return ipaddress.IPv4Address(self.value).packed
+        return ber.encode_ipv4(self.value)
 
 
 class Counter32(SNMPLeafValue):
+    __slots__ = ()
+    tag = ASN1.COUNTER32
+
     def __init__(self, value: int):
         self.value = value
-        self.tag = ASN1.COUNTER32
 
     def encode(self) -> bytes:
-        return asn1.Encoder._encode_integer(self.value)
+        return ber.encode_integer(self.value)
 
 
 class Gauge32(SNMPLeafValue):
+    __slots__ = ()
+    tag = ASN1.GAUGE32
+
     def __init__(self, value: int):
         self.value = value
-        self.tag = ASN1.GAUGE32
 
     def encode(self) -> bytes:
-        return asn1.Encoder._encode_integer(self.value)
+        return ber.encode_integer(self.value)
 
 
 class TimeTicks(SNMPLeafValue):
+    __slots__ = ()
+    tag = ASN1.TIME_TICKS
+
     def __init__(self, value: int):
         self.value = value
-        self.tag = ASN1.TIME_TICKS
 
     def encode(self) -> bytes:
-        return asn1.Encoder._encode_integer(self.value)
+        return ber.encode_integer(self.value)
 
 
 class Counter64(SNMPLeafValue):
+    __slots__ = ()
+    tag = ASN1.COUNTER64
+
     def __init__(self, value: int):
         self.value = value
-        self.tag = ASN1.COUNTER64
 
     def encode(self) -> bytes:
-        return asn1.Encoder._encode_integer(self.value)
+        return ber.encode_integer(self.value)
+
 
+class _NoValue(SNMPLeafValue):
+    """Valores sem conteudo: cada subclasse tem uma unica instancia, imutavel"""
+    __slots__ = ()
+    value = None
+    _instance = None
+
+    def __new__(cls):
+        if (instance := cls.__dict__.get("_instance")) is None:
+            instance = super().__new__(cls)
+            cls._instance = instance
+        return instance
 
-class NoSuchObject(SNMPLeafValue):
     def __init__(self):
-        self.value = None
-        self.tag = ASN1.NO_SUCH_OBJECT
+        pass
 
     def encode(self) -> bytes:
         return b''
 
 
-class NoSuchInstance(SNMPLeafValue):
-    def __init__(self):
-        self.value = None
-        self.tag = ASN1.NO_SUCH_INSTANCE
+class Null(_NoValue):
+    __slots__ = ()
+    tag = ASN1.NULL
 
-    def encode(self) -> bytes:
-        return b''
 
+class NoSuchObject(_NoValue):
+    __slots__ = ()
+    tag = ASN1.NO_SUCH_OBJECT
 
-class EndOfMibView(SNMPLeafValue):
-    def __init__(self):
-        self.value = None
-        self.tag = ASN1.END_OF_MIB_VIEW
 
-    def encode(self) -> bytes:
-        return b''
+class NoSuchInstance(_NoValue):
+    __slots__ = ()
+    tag = ASN1.NO_SUCH_INSTANCE
+
+
+class EndOfMibView(_NoValue):
+    __slots__ = ()
+    tag = ASN1.END_OF_MIB_VIEW
 
 
 class SNMPConstructedValue(SNMPValue):
-    pass
+    __slots__ = ()
 
 
 class Sequence(SNMPConstructedValue):
-    def __init__(self):
-        self.tag = ASN1.SEQUENCE
+    __slots__ = ()
+    tag = ASN1.SEQUENCE
 
 
 class SnmpContext(SNMPConstructedValue):
-    pass
+    __slots__ = ()
 
 
 class SnmpSetRequestContext(SnmpContext):
-    def __init__(self):
-        self.tag = ASN1.SET_REQUEST
+    __slots__ = ()
+    tag = ASN1.SET_REQUEST
 
 
 class SnmpGetContext(SnmpContext):
-    def __init__(self):
-        self.tag = ASN1.GET_REQUEST
+    __slots__ = ()
+    tag = ASN1.GET_REQUEST
 
 
 class SnmpGetNextContext(SnmpContext):
-    def __init__(self):
-        self.tag = ASN1.GET_NEXT_REQUEST
+    __slots__ = ()
+    tag = ASN1.GET_NEXT_REQUEST
 
 
 class SnmpGetBulkContext(SnmpContext):
-    def __init__(self):
-        self.tag = ASN1.GET_BULK_REQUEST
+    __slots__ = ()
+    tag = ASN1.GET_BULK_REQUEST
 
 
 class SnmpGetResponseContext(SnmpContext):
-    def __init__(self):
-        self.tag = ASN1.GET_RESPONSE
-
-
-class Encoder(object):
-    def __init__(self):
-        self._encoder = asn1.Encoder()
-        self._encoder.start()
+    __slots__ = ()
+    tag = ASN1.GET_RESPONSE
 
-    def enter(self, value: SNMPConstructedValue):
-        self._encoder.enter(cls=value.get_class(), nr=value.get_tag_number())
 
-    def leave(self):
-        self._encoder.leave()
+class SnmpInformContext(SnmpContext):
+    __slots__ = ()
+    tag = ASN1.INFORM_REQUEST
 
-    def write(self, value: SNMPLeafValue):
-        self._encoder._emit_tag(cls=value.get_class(),
-                                typ=value.get_pc(),
-                                nr=value.get_tag_number())
-        value_bytes = value.encode()
-        self._encoder._emit_length(len(value_bytes))
-        self._encoder._emit(value_bytes)
 
-    def output(self) -> bytes:
-        return self._encoder.output()
+class SnmpTrapContext(SnmpContext):
+    __slots__ = ()
+    tag = ASN1.SNMPV2_TRAP
 
 
 def encode_response(response: SNMPResponse) -> bytes:
-    encoder = Encoder()
-
-    encoder.enter(Sequence())
-    encoder.write(Integer(response.version.code))
-    encoder.write(OctetString(response.community))
-
-    encoder.enter(response.context)
-    encoder.write(Integer(response.request_id))
-    encoder.write(Integer(response.error_status))
-    encoder.write(Integer(response.error_index))
-
-    encoder.enter(Sequence())
+    # Primeiro passo: conteudo de cada varbind e todos os comprimentos
+    var_binds = []
+    vbl_length = 0
     for variable_binding in response.variable_bindings:
-        encoder.enter(Sequence())
-        encoder.write(ObjectIdentifier(variable_binding.oid))
-        encoder.write(variable_binding.value)
-        encoder.leave()
-    encoder.leave()
-    encoder.leave()
-    encoder.leave()
-
-    return encoder.output()
-
-
-class Decoder(object):
-    def __init__(self, data: bytes):
-        self._decoder = asn1.Decoder()
-        self._decoder.start(data=data)
-
-    def enter(self):
-        self._decoder.enter()
-
-    def read(self) -> Tuple[Any, Any]:
-        # TODO: Look into response type warning
-        return self._decoder.read()  # (asn1.Tag, value)
-
-    def peek(self) -> asn1.Tag:
-        return self._decoder.peek()
-
-    def eof(self) -> bool:
-        return self._decoder.eof()
-
-    def leave(self):
-        self._decoder.leave()
-
-
-def decode_request(data: bytes) -> SNMPRequest:
-    decoder = Decoder(data=data)
+        oid = ber.oid_cache.encode(variable_binding.oid)
+        value = variable_binding.value
+        content = value.encode()
+        length = ber.tlv_size(len(oid)) + ber.tlv_size(len(content))
+        var_binds.append((oid, value.tag.code, content, length))
+        vbl_length += ber.tlv_size(length)
+
+    version = ber.encode_integer(response.version.code)
+    community = ber.encode_octet_string(response.community)
+    request_id = ber.encode_integer(response.request_id)
+    error_status = ber.encode_integer(response.error_status)
+    error_index = ber.encode_integer(response.error_index)
+
+    pdu_length = ber.tlv_size(len(request_id)) + ber.tlv_size(len(error_status)) + \
+        ber.tlv_size(len(error_index)) + ber.tlv_size(vbl_length)
+    message_length = ber.tlv_size(len(version)) + ber.tlv_size(len(community)) + ber.tlv_size(pdu_length)
+
+    # Segundo passo: escrita em um unico buffer do tamanho exato
+    buf = bytearray(ber.tlv_size(message_length))
+    pos = ber.put_header(buf, 0, ber.SEQUENCE, message_length)
+    pos = ber.put_tlv(buf, pos, ASN1.INTEGER.code, version)
+    pos = ber.put_tlv(buf, pos, ASN1.OCTET_STRING.code, community)
+
+    pos = ber.put_header(buf, pos, response.context.tag.code, pdu_length)
+    pos = ber.put_tlv(buf, pos, ASN1.INTEGER.code, request_id)
+    pos = ber.put_tlv(buf, pos, ASN1.INTEGER.code, error_status)
+    pos = ber.put_tlv(buf, pos, ASN1.INTEGER.code, error_index)
+
+    pos = ber.put_header(buf, pos, ber.SEQUENCE, vbl_length)
+    for oid, tag, content, length in var_binds:
+        pos = ber.put_header(buf, pos, ber.SEQUENCE, length)
+        pos = ber.put_tlv(buf, pos, ASN1.OBJECT_IDENTIFIER.code, oid)
+        pos = ber.put_tlv(buf, pos, tag, content)
+
+    return bytes(buf)
+
+
+def varbind_size(variable_binding: VariableBinding) -> int:
+    """Octetos do varbind na mensagem codificada (SEQUENCE com o OID e o valor)"""
+    return ber.tlv_size(ber.tlv_size(len(ber.oid_cache.encode(variable_binding.oid))) +
+                        ber.tlv_size(len(variable_binding.value.encode())))
+
+
+def message_size(response: SNMPResponse, vbl_length: int) -> int:
+    """Tamanho de `response` codificada com uma lista de varbinds de `vbl_length` octetos de conteudo"""
+    pdu_length = ber.tlv_size(len(ber.encode_integer(response.request_id))) + \
+        ber.tlv_size(len(ber.encode_integer(response.error_status))) + \
+        ber.tlv_size(len(ber.encode_integer(response.error_index))) + ber.tlv_size(vbl_length)
+    return ber.tlv_size(ber.tlv_size(len(ber.encode_integer(response.version.code))) +
+                        ber.tlv_size(len(ber.encode_octet_string(response.community))) + ber.tlv_size(pdu_length))
+
+
+def _read(data: memoryview, pos: int, tag: int) -> Tuple[memoryview, int]:
+    _tag, length, pos = ber.read_header(data, pos)
+    if _tag != tag:
+        raise ber.BERError(f"Expected tag 0x{tag:02x}, got 0x{_tag:02x}")
+    return data[pos:pos + length], pos + length
+
+
+def _decode_value(tag: int, content: memoryview) -> Any:
+    # Mesmos tipos Python que a biblioteca asn1 devolvia
+    if tag == ASN1.INTEGER.code:
+        return ber.decode_integer(content)
+    elif tag == ASN1.OCTET_STRING.code:
+        return bytes(content)
+    elif tag == ASN1.NULL.code:
+        return None
+    elif tag == ASN1.OBJECT_IDENTIFIER.code:
+        return ber.decode_oid(content)
+    elif tag == ASN1.BOOLEAN.code:
+        return any(content)
+    return bytes(content)
+
+
+_CONTEXTS = {
+    ASN1.GET_REQUEST.code: SnmpGetContext,
+    ASN1.GET_NEXT_REQUEST.code: SnmpGetNextContext,
+    ASN1.GET_BULK_REQUEST.code: SnmpGetBulkContext,
+    ASN1.SET_REQUEST.code: SnmpSetRequestContext,
+}
+
+
+def peek_community(data: bytes) -> Optional[bytes]:
+    """Le apenas versao e community, sem decodificar o PDU; None se a mensagem for invalida"""
+    data = memoryview(data)
+    try:
+        message, _ = _read(data, 0, ber.SEQUENCE)
+        _, pos = _read(message, 0, ASN1.INTEGER.code)
+        community, _ = _read(message, pos, ASN1.OCTET_STRING.code)
+    except ber.BERError:
+        return None
+    return bytes(community)
+
+
+def decode_response(data: bytes) -> SNMPRequest:
+    """Resposta de um gerente (ex.: confirmacao de um inform); error-status e error-index sao descartados"""
+    return decode_request(data, contexts={ASN1.GET_RESPONSE.code: SnmpGetResponseContext})
+
+
+def decode_request(data: bytes, contexts: Dict[int, Callable[[], SnmpContext]] = None) -> SNMPRequest:
+    contexts = contexts or _CONTEXTS
+    data = memoryview(data)
 
     # Get version and community
-    decoder.enter()
-    _, _value = decoder.read()
-    version_code: int = _value
+    message, _ = _read(data, 0, ber.SEQUENCE)
+    content, pos = _read(message, 0, ASN1.INTEGER.code)
+    version_code = ber.decode_integer(content)
     if VERSION.V1.code == version_code:
         version = VERSION.V1
     elif VERSION.V2C.code == version_code:
@@ -340,56 +427,44 @@ def decode_request(data: bytes) -> SNMPRequest:
     else:
         raise NotImplementedError(f"SNMP Version code '{version_code}' is not implemented")
 
-    _, _value = decoder.read()
-    community = _value.decode()
+    content, pos = _read(message, pos, ASN1.OCTET_STRING.code)
+    community = bytes(content).decode()
 
     # Get pdu_type, request_id, non_repeaters and max_repetitions
-    _tag = decoder.peek()
-    _pdu_type_code = _tag.cls | _tag.typ | _tag.nr
-    if ASN1.GET_REQUEST.code == _pdu_type_code:
-        context = SnmpGetContext()
-    elif ASN1.GET_NEXT_REQUEST.code == _pdu_type_code:
-        context = SnmpGetNextContext()
-    elif ASN1.GET_BULK_REQUEST.code == _pdu_type_code:
-        context = SnmpGetBulkContext()
-    elif ASN1.SET_REQUEST.code == _pdu_type_code:
-        context = SnmpSetRequestContext()
-    else:
+    _pdu_type_code = message[pos] if pos < len(message) else None
+    if _pdu_type_code not in contexts:
         raise NotImplementedError(f"PDU-TYPE code '{_pdu_type_code}' is not implemented")
+    context = contexts[_pdu_type_code]()
+    pdu, _ = _read(message, pos, _pdu_type_code)
 
-    decoder.enter()
-    _, _value = decoder.read()
-    request_id: int = _value
+    content, pos = _read(pdu, 0, ASN1.INTEGER.code)
+    request_id = ber.decode_integer(content)
 
     non_repeaters: int
     max_repetitions: int
-    if isinstance(context, SnmpGetBulkContext):
-        _, _value = decoder.read()
-        non_repeaters = _value
-        _, _value = decoder.read()
-        max_repetitions = _value
-    else:
-        _, _ = decoder.read()
-        _, _ = decoder.read()
+    content, pos = _read(pdu, pos, ASN1.INTEGER.code)
+    non_repeaters = ber.decode_integer(content)
+    content, pos = _read(pdu, pos, ASN1.INTEGER.code)
+    max_repetitions = ber.decode_integer(content)
+    if not isinstance(context, SnmpGetBulkContext):
+        # Nos demais PDUs estes campos sao error-status e error-index
         non_repeaters = 0
         max_repetitions = 0
 
     # Get variable-bindings
-    decoder.enter()
+    var_bind_list, _ = _read(pdu, pos, ber.SEQUENCE)
     variable_bindings = []
-    while not decoder.eof():
+    pos = 0
+    while pos < len(var_bind_list):
         # Get oid, type and value
-        decoder.enter()
-        _, _value = decoder.read()
-        oid: str = _value
-        tag, value = decoder.read()
-        # variable_bindings.append(VariableBinding(oid=oid, value=Null()))
-        print(tag)
-        variable_bindings.append(VariableBinding(oid=oid, value=SNMPLeafValue(ASN1.get_tag(tag), value, tag_tuple=tag)))
-        decoder.leave()
-    decoder.leave()
-    decoder.leave()
-    decoder.leave()
+        var_bind, pos = _read(var_bind_list, pos, ber.SEQUENCE)
+        content, value_pos = _read(var_bind, 0, ASN1.OBJECT_IDENTIFIER.code)
+        oid = ber.decode_oid(content)
+        tag, length, value_pos = ber.read_header(var_bind, value_pos)
+        value = _decode_value(tag, var_bind[value_pos:value_pos + length])
+        tag_tuple = (tag & 0x1f, tag & 0x20, tag & 0xc0)
+        variable_bindings.append(VariableBinding(oid=oid, value=SNMPLeafValue(ASN1.from_code(tag), value,
+                                                                              tag_tuple=tag_tuple)))
 
     return SNMPRequest(
         version=version,
@@ -402,8 +477,7 @@ def decode_request(data: bytes) -> SNMPRequest:
 
 
 class SNMP(object):
-    def __init__(self):
-        pass
+    __slots__ = ()
 
     def to_dict(self):
         dict_ = self._to_primitive(self)
@@ -415,7 +489,7 @@ class SNMP(object):
             for k, v in value.items():
                 _dict[k] = self._to_primitive(v)
             return _dict
-        elif isinstance(value, list):
+        elif isinstance(value, (list, tuple)):
             items = []
             for item in value:
                 items.append(self._to_primitive(item))
@@ -424,11 +498,23 @@ class SNMP(object):
             return value
         else:
             _dict = {}
-            for k, v in vars(value).items():
+            for k, v in _attributes(value).items():
                 _dict[k] = self._to_primitive(v)
             return _dict
 
 
+def _attributes(value) -> Dict[str, Any]:
+    # vars() nao enxerga atributos em __slots__; a tag dos valores fica na classe
+    attributes = dict(getattr(value, "__dict__", {}))
+    for cls in type(value).__mro__:
+        for name in cls.__dict__.get("__slots__", ()):
+            if not name.startswith("_") and hasattr(value, name):
+                attributes[name] = getattr(value, name)
+    if isinstance(value, SNMPValue):
+        attributes["tag"] = value.tag
+    return attributes
+
+
 class SNMPRequest(SNMP):
     def __init__(self, version: VersionValue, community: str, context: SnmpContext,
                  request_id: int, variable_bindings: List[VariableBinding],
@@ -467,9 +553,20 @@ class SNMPResponse(SNMP):
         self.variable_bindings = variable_bindings
 
 
+class SNMPNotification(SNMPResponse):
+    """SNMPv2-Trap ou InformRequest; o codigo e o mesmo de uma resposta, so o tipo do PDU muda"""
+
+    def __init__(self, community: str, request_id: int, variable_bindings: List[VariableBinding],
+                 inform: bool = False):
+        super().__init__(version=VERSION.V2C, community=community, request_id=request_id,
+                         variable_bindings=variable_bindings)
+        self.context = SnmpInformContext() if inform else SnmpTrapContext()
+
+
 class VariableBinding(SNMP):
+    __slots__ = ("oid", "value")
+
     def __init__(self, oid: str, value: SNMPLeafValue):
-        super().__init__()
         self.oid = oid.lstrip(".")
         self.value = value
 
@@ -484,12 +581,11 @@ class VariableBind:
         WRITE_ONLY = auto()
 
     def __init__(self, oid: str, read: Callable[[VariableBinding], Tuple[int, SNMPLeafValue]] | SNMPLeafValue = None,
-                 write: Callable[[VariableBinding], Any] = None, use_start_with=False, get_next: Union[Callable, str, None] = None):
+                 write: Callable[[VariableBinding], Any] = None, use_start_with=False):
         self.oid = oid
         self._read = read
         self._write = write
         self.use_start_with = use_start_with
-        self.get_next = get_next
 
         if read and write:
             self.access = self.Access.READ_WRITE
@@ -506,3 +602,4 @@ class VariableBind:
             return 0, self._read
         else:
             return self._read(vb)
+
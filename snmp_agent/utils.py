@@ -1,79 +1,105 @@
-from typing import List, Dict, Tuple, Union
+import logging
+from typing import List, Dict, Tuple, Union, Optional
 
-from snmp_agent import snmp
+from snmp_agent import snmp, mib
+from snmp_agent.cache import ResponseCache
+from snmp_agent.registry import OidRegistry
 
+logger = logging.getLogger(__name__)
+
+VarBinds = Union[OidRegistry, Dict[str, snmp.VariableBind]]
+
+# Limites do GetBulk: teto de max-repetitions e tamanho maximo da resposta (datagrama UDP sem fragmentar
+# em Ethernet: 1500 - 20 de IP - 8 de UDP)
+MAX_REPETITIONS = 100
+MAX_MESSAGE_SIZE = 1472
 
-def find_varbind(var: snmp.VariableBinding, vbs: Dict[str, snmp.VariableBind]) -> \
-        Union[snmp.VariableBind, None]:
-    for i in vbs.values():
-        if var.oid == i.oid or (var.oid.startswith(i.oid) and i.use_start_with):
-            return i
 
-    return None
+def as_registry(vbs: VarBinds) -> OidRegistry:
+    if isinstance(vbs, OidRegistry):
+        return vbs
+    return OidRegistry(vbs.values())
+
+
+def find_varbind(var: snmp.VariableBinding, vbs: VarBinds) -> \
+        Union[snmp.VariableBind, None]:
+    return as_registry(vbs).find(var.oid)
 
 
 def handle_request(req: snmp.SNMPRequest,
-                   vbs: Union[List[snmp.VariableBinding], Dict[str, snmp.VariableBind]]) -> Tuple[
+                   vbs: Union[List[snmp.VariableBinding], VarBinds],
+                   cache: Optional[ResponseCache] = None,
+                   max_repetitions: int = MAX_REPETITIONS,
+                   max_size: int = MAX_MESSAGE_SIZE) -> Tuple[
     List[snmp.VariableBinding], int, int]:
+    if not isinstance(vbs, list):
+        # Dicionarios sao convertidos uma vez por requisicao; handlers devem montar o OidRegistry na inicializacao
+        vbs = as_registry(vbs)
     if isinstance(req.context, snmp.SnmpGetContext):
-        if isinstance(vbs, dict):
-            return get_req(req_vbs=req.variable_bindings, vbs=vbs)
+        if isinstance(vbs, OidRegistry):
+            return get_req(req_vbs=req.variable_bindings, vbs=vbs, cache=cache)
         else:
             return get(req_vbs=req.variable_bindings, vbs=vbs)
     elif isinstance(req.context, snmp.SnmpGetNextContext):
         return get_next(req_vbs=req.variable_bindings, vbs=vbs)
     elif isinstance(req.context, snmp.SnmpGetBulkContext):
-        return get_bulk(req_vbs=req.variable_bindings,
-                        non_repeaters=req.non_repeaters,
-                        max_repetitions=req.max_repetitions,
-                        vbs=vbs)
+        response, error_status, error_index = get_bulk(req_vbs=req.variable_bindings,
+                                                       non_repeaters=req.non_repeaters,
+                                                       max_repetitions=min(req.max_repetitions, max_repetitions),
+                                                       vbs=vbs)
+        return fit_message(req, response, max_size), error_status, error_index
     elif isinstance(req.context, snmp.SnmpSetRequestContext):
+        if cache is not None:
+            cache.invalidate()
         return set_req(req_vbs=req.variable_bindings, vbs=vbs)
     else:
         raise NotImplementedError
 
 
 def set_req(req_vbs: List[snmp.VariableBinding],
-            vbs: Dict[str, snmp.VariableBind]) -> [List[snmp.VariableBinding], int, int]:
+            vbs: OidRegistry) -> [List[snmp.VariableBinding], int, int]:
     response: List[snmp.VariableBinding] = []
 
     for index, var in enumerate(req_vbs):
         if binder := find_varbind(var, vbs):
             if binder.access == snmp.VariableBind.Access.READ_ONLY:
                 raise NotImplementedError("Implementar erro de tentativa de escrita em algo lido")
-            print(f"INdex: {index}")
+            logger.debug("SET index %d: %s", index, var.oid)
             err, value = binder.write(var)
             var.value = value
             response.append(var)
 
             if err != 0:
-                print(f"SNMP ERROR {err}")
+                logger.debug("SNMP error %d at index %d", err, index)
                 return response, err, index
         else:
-            print(vbs.keys())
-            print(var.oid)
+            logger.debug("OID %s is not registered", var.oid)
             raise NotImplementedError(
                 f"Implementar exception para Valor nao encontrado, observe o get {var.oid}")  # TODO
 
     return response, 0, 0
 
 
-def get_req(req_vbs: List[snmp.VariableBinding], vbs: Dict[str, snmp.VariableBind]) \
+def get_req(req_vbs: List[snmp.VariableBinding], vbs: OidRegistry, cache: Optional[ResponseCache] = None) \
         -> [List[snmp.VariableBinding], int, int]:
     response: List[snmp.VariableBinding] = []
 
     for index, vbind in enumerate(req_vbs):
-        if binder := find_varbind(vbind, vbs):
+        if cache is not None and (value := cache.get(vbind.oid)) is not None:
+            vbind.value = value
+            response.append(vbind)
+        elif binder := find_varbind(vbind, vbs):
             err, value = binder.read(vbind)
             vbind.value = value
             response.append(vbind)
+            if cache is not None and err == 0:
+                cache.put(vbind.oid, value)
 
             if err != 0:
-                print(f"SNMP ERROR {err}")
+                logger.debug("SNMP error %d at index %d", err, index)
                 return response, err, index
         else:
-            print(vbs.keys())
-            print(vbind.oid)
+            logger.debug("OID %s is not registered", vbind.oid)
             raise NotImplementedError(f"Implementar exception para Valor nao encontrado, observe o get {vbind.oid}")
 
     return response, 0, 0
@@ -94,41 +120,50 @@ def get(req_vbs: List[snmp.VariableBinding],
     return results, 0, 0
 
 
-def get_next(req_vbs: List[snmp.VariableBinding], vbs: Dict[str, snmp.VariableBind]) \
+def get_next(req_vbs: List[snmp.VariableBinding], vbs: OidRegistry) \
         -> [List[snmp.VariableBinding], int, int]:
     response: List[snmp.VariableBinding] = []
-    for index, vbind in enumerate(req_vbs):
-        if binder := find_varbind(vbind, vbs):
-            err, value, oid = binder.get_next(vbind)
-            vbind.oid = oid
-            vbind.value = value
-            response.append(vbind)
-
-            if err != 0:
-                print(f"SNMP ERROR {err}")
-                return response, err, index
-        else:
-            print(vbs.keys())
-            print(vbind.oid)
-            return response, 2, index
+    for vbind in req_vbs:
+        vbind.oid, vbind.value = mib.next_binding(vbs, vbind.oid)
+        response.append(vbind)
     return response, 0, 0
 
 
 def get_bulk(req_vbs: List[snmp.VariableBinding],
              non_repeaters: int,
              max_repetitions: int,
-             vbs: List[snmp.VariableBinding]) -> [List[snmp.VariableBinding], int, int]:
-    # non_repeaters
-    _req_vbs = req_vbs[:non_repeaters]
-    results = get_next(req_vbs=_req_vbs, vbs=vbs)
-    # max_repetitions
-    _req_vbs = req_vbs[non_repeaters:]
-    for _ in range(max_repetitions):
-        for index, req_vb in enumerate(_req_vbs):
-            _results = get_next(req_vbs=[req_vb], vbs=vbs)
-            _result = _results[0]
-            results.append(_result)
-            _req_vbs[index] = snmp.VariableBinding(
-                oid=_result.oid,
-                value=snmp.Null())
+             vbs: OidRegistry) -> [List[snmp.VariableBinding], int, int]:
+    non_repeaters = min(max(non_repeaters, 0), len(req_vbs))
+    max_repetitions = max(max_repetitions, 0)
+
+    # non_repeaters: um GetNext simples
+    results, _, _ = get_next(req_vbs=req_vbs[:non_repeaters], vbs=vbs)
+
+    # max_repetitions: os sucessores de cada variavel sao planejados de uma vez (uma fatia por tabela)
+    columns = [mib.walk(vbs, vbind.oid, max_repetitions) for vbind in req_vbs[non_repeaters:]]
+    for repetition in range(max_repetitions):
+        row = []
+        for column in columns:
+            oid, value = column[min(repetition, len(column) - 1)]
+            row.append(snmp.VariableBinding(oid=oid, value=value if repetition < len(column) else snmp.EndOfMibView()))
+        results.extend(row)
+        # Todas as variaveis ja chegaram ao fim da MIB
+        if all(isinstance(vb.value, snmp.EndOfMibView) for vb in row):
+            break
     return results, 0, 0
+
+
+def fit_message(req: snmp.SNMPRequest, response: List[snmp.VariableBinding],
+                max_size: int) -> List[snmp.VariableBinding]:
+    """
+    Varbinds de `response` que cabem em uma mensagem de ate `max_size` octetos. Como pede a RFC 3416
+    (secao 4.2.3) para o GetBulk, os varbinds finais que nao cabem sao omitidos, sem erro tooBig.
+    """
+    empty = req.create_response([])
+    vbl_length = 0
+    for index, vbind in enumerate(response):
+        vbl_length += snmp.varbind_size(vbind)
+        if snmp.message_size(empty, vbl_length) > max_size:
+            logger.debug("GetBulk response truncated to %d of %d varbinds", index, len(response))
+            return response[:index]
+    return response
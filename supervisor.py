@@ -0,0 +1,97 @@
+"""
+Modo multiprocesso do agente: N processos servem a mesma porta UDP com SO_REUSEPORT.
+
+O supervisor mantem o agendador de varreduras; os workers leem o banco (SQLite em modo WAL) e os
+contadores de varredura em memoria compartilhada, e repassam os SETs que disparam varreduras por
+uma fila. Os objetos de administracao respondem igual em qualquer worker: a agentLatencyTable soma os
+arquivos de metricas de todos (snmp_agent.metrics.SharedMetrics) e a janela do profiler fica em memoria
+compartilhada (profiler.SharedControl). Um worker que termina e reiniciado; se ele morrer logo apos
+iniciar, o reinicio espera cada vez mais (ate MAX_RESTART_DELAY) para nao ficar em laco.
+"""
+import logging
+import multiprocessing
+import signal
+import threading
+import time
+from typing import Callable, List
+
+import scan_stats
+import scheduler
+from scheduler import ScanScheduler
+
+logger = logging.getLogger(__name__)
+
+MIN_UPTIME = 5.0
+MAX_RESTART_DELAY = 60.0
+
+
+class Supervisor(object):
+    def __init__(self, target: Callable, workers: int, scan_scheduler: ScanScheduler, check_interval: float = 1.0):
+        """`target(index, jobs, stats_array, profiler_array)` e executado em cada worker"""
+        self._target = target
+        self._workers = workers
+        self._scheduler = scan_scheduler
+        self._check_interval = check_interval
+        self._ctx = multiprocessing.get_context("spawn")
+        self._jobs = self._ctx.Queue()
+        # Janela do profiler comum a todos os workers (ver profiler.SharedControl)
+        self._profiler_array = self._ctx.Array('d', 3)
+        self._processes: List = [None] * workers
+        self._started_at: List[float] = [0.0] * workers
+        self._delays: List[float] = [0.0] * workers
+        self._restart_at: List[float] = [0.0] * workers
+        self._stopped = threading.Event()
+        self.restarts = 0
+
+    def _spawn(self, index: int):
+        process = self._ctx.Process(target=self._target, name=f"snmp-agent-{index}", daemon=True,
+                                    args=(index, self._jobs, scan_stats.get_stats().array, self._profiler_array))
+        process.start()
+        self._processes[index] = process
+        self._started_at[index] = time.monotonic()
+        logger.info("Agent worker %d started (pid %d)", index, process.pid)
+
+    def _check(self):
+        now = time.monotonic()
+        for index, process in enumerate(self._processes):
+            if process is not None and process.is_alive():
+                continue
+            if process is not None:
+                logger.warning("Agent worker %d (pid %d) exited with code %s", index, process.pid, process.exitcode)
+                process.join()
+                self._processes[index] = None
+                uptime = now - self._started_at[index]
+                if uptime < MIN_UPTIME:
+                    self._delays[index] = min(max(self._delays[index] * 2, 1.0), MAX_RESTART_DELAY)
+                else:
+                    self._delays[index] = 0.0
+                self._restart_at[index] = now + self._delays[index]
+                self.restarts += 1
+            if now >= self._restart_at[index]:
+                self._spawn(index)
+
+    def run(self):
+        def terminate(signum, frame):
+            raise SystemExit(0)
+
+        signal.signal(signal.SIGTERM, terminate)
+        consumer = threading.Thread(target=scheduler.consume, args=(self._jobs, self._scheduler, self._stopped),
+                                    name="agent-jobs", daemon=True)
+        consumer.start()
+        try:
+            for index in range(self._workers):
+                self._spawn(index)
+            while True:
+                time.sleep(self._check_interval)
+                self._check()
+        finally:
+            self.stop()
+
+    def stop(self):
+        self._stopped.set()
+        for process in self._processes:
+            if process is not None and process.is_alive():
+                process.terminate()
+        for process in self._processes:
+            if process is not None:
+                process.join()
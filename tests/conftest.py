@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# settings le o conf.json do diretorio atual
+os.chdir(ROOT)
+
+from benchmarks import dataset  # noqa: E402
+
+# Banco temporario: precisa ser escolhido antes de qualquer import do orm (direto ou via main/functions)
+dataset.use_database()
+
+DEVICES = 100
+HISTORY = 400
+
+
+@pytest.fixture(scope="session")
+def history():
+    """Banco sintetico com dispositivos em todos os status (ver benchmarks.dataset)"""
+    dataset.populate(DEVICES, HISTORY, seed=3)
+    return DEVICES, HISTORY
+
+
+@pytest.fixture
+def conf(tmp_path, monkeypatch):
+    """Copia do conf.json para os testes que gravam configuracoes"""
+    path = tmp_path / "conf.json"
+    with open(os.path.join(ROOT, "conf.json")) as source:
+        path.write_text(source.read())
+    import settings
+    monkeypatch.setattr(settings, "SOURCE_FILE", str(path))
+    return path
@@ -0,0 +1,100 @@
+import pytest
+
+from benchmarks.ber_codec import make_request, make_response
+from snmp_agent import ber, snmp
+
+VALUES = [
+    snmp.Integer(0), snmp.Integer(-1), snmp.Integer(127), snmp.Integer(128), snmp.Integer(-129),
+    snmp.Integer(2 ** 31 - 1), snmp.OctetString(""), snmp.OctetString("aa:bb:cc:dd:ee:ff"),
+    snmp.OctetString("x" * 300), snmp.IPAddress("192.168.0.1"), snmp.Counter32(2 ** 32 - 1),
+    snmp.Gauge32(12345), snmp.TimeTicks(100), snmp.Counter64(2 ** 64 - 1), snmp.ObjectIdentifier("1.3.6.1.2.1"),
+    snmp.Null(), snmp.NoSuchObject(), snmp.NoSuchInstance(), snmp.EndOfMibView(),
+]
+
+
+def content(value) -> bytes:
+    """Conteudo BER de um valor decodificado (os mesmos tipos Python que a biblioteca asn1 devolvia)"""
+    if value is None:
+        return b""
+    if isinstance(value, int):
+        return ber.encode_integer(value)
+    if isinstance(value, str):
+        return ber.encode_oid(value)
+    return value
+
+
+def test_integer_round_trip():
+    for value in list(range(-70000, 70000, 7)) + [2 ** 31 - 1, -2 ** 31, 2 ** 63 - 1, -2 ** 63]:
+        assert ber.decode_integer(memoryview(ber.encode_integer(value))) == value
+
+
+@pytest.mark.parametrize("oid", ["0.0", "1.3", "1.3.6.1.3.1.2.1.1.1", "2.999.1", "1.3.6.1.4.1.2021.10.1.3.1",
+                                 "1.3.6.1.3.1.3.1.6.4294967295"])
+def test_oid_round_trip(oid):
+    assert ber.decode_oid(memoryview(ber.encode_oid(oid))) == oid
+
+
+@pytest.mark.parametrize("oid", ["1", "3.1", "1.40", ""])
+def test_illegal_oid(oid):
+    with pytest.raises((ber.BERError, ValueError)):
+        ber.encode_oid(oid)
+
+
+def test_message_round_trip():
+    response = snmp.SNMPResponse(snmp.VERSION.V2C, "public", 987654,
+                                 [snmp.VariableBinding(f"1.3.6.1.3.1.9.{i}", value) for i, value in enumerate(VALUES)])
+    response.context = snmp.SnmpGetNextContext()
+    data = snmp.encode_response(response)
+    assert snmp.message_size(response, sum(snmp.varbind_size(vb) for vb in response.variable_bindings)) == len(data)
+
+    request = snmp.decode_request(data)
+    assert request.version is snmp.VERSION.V2C
+    assert request.community == "public"
+    assert request.request_id == 987654
+    assert isinstance(request.context, snmp.SnmpGetNextContext)
+    assert [vb.oid for vb in request.variable_bindings] == [vb.oid for vb in response.variable_bindings]
+    for decoded, original in zip(request.variable_bindings, VALUES):
+        assert decoded.value.tag.code == original.tag.code
+        assert content(decoded.value.value) == original.encode()
+
+
+def test_get_bulk_fields():
+    response = snmp.SNMPResponse(snmp.VERSION.V2C, "private", 1, [snmp.VariableBinding("1.3.6.1", snmp.Null())],
+                                 error_status=2, error_index=25)
+    response.context = snmp.SnmpGetBulkContext()
+    request = snmp.decode_request(snmp.encode_response(response))
+    assert (request.non_repeaters, request.max_repetitions) == (2, 25)
+    assert snmp.peek_community(snmp.encode_response(response)) == b"private"
+
+
+@pytest.mark.parametrize("data", [b"", b"\x30", b"\x30\x03\x02\x01", b"\x04\x00", b"\x30\x05\x02\x01\x01\x04\x10"])
+def test_malformed_request(data):
+    with pytest.raises(ber.BERError):
+        snmp.decode_request(data)
+
+
+# ------ EQUIVALENCIA COM A IMPLEMENTACAO ANTERIOR (asn1) --------------
+def test_integer_matches_asn1():
+    asn1 = pytest.importorskip("asn1")
+    for value in list(range(-70000, 70000)) + [2 ** 31 - 1, -2 ** 31, 2 ** 32 - 1, 2 ** 64 - 1]:
+        assert snmp.Integer(value).encode() == asn1.Encoder._encode_integer(value)
+
+
+@pytest.mark.parametrize("varbinds", [0, 1, 10, 50, 200])
+def test_response_matches_asn1(varbinds):
+    pytest.importorskip("asn1")
+    from benchmarks.ber_codec import legacy_encode_response
+
+    response = make_response(varbinds)
+    assert snmp.encode_response(response) == legacy_encode_response(response)
+
+
+@pytest.mark.parametrize("varbinds", [1, 10, 50])
+def test_request_matches_asn1(varbinds):
+    pytest.importorskip("asn1")
+    from benchmarks.ber_codec import legacy_decode_request
+
+    data = make_request(varbinds)
+    request = snmp.decode_request(data)
+    assert legacy_decode_request(data) == (request.version.code, request.community, request.request_id,
+                                           [vb.oid for vb in request.variable_bindings])
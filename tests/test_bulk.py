@@ -0,0 +1,66 @@
+import pytest
+
+import main
+from snmp_agent import snmp, utils
+from test_mib import SUFFIX, get_next, get_next_walk
+
+
+def plain(pairs):
+    return [(oid, type(value), value.value) for oid, value in pairs]
+
+
+def expected_bulk(oids, non_repeaters, max_repetitions):
+    """Resposta de um GetBulk montada com GetNexts, como descrito na RFC 3416 (secao 4.2.3)"""
+    output = [get_next(oid) for oid in oids[:non_repeaters]]
+    current = list(oids[non_repeaters:])
+    for _ in range(max_repetitions):
+        row = [get_next(oid) for oid in current]
+        output.extend(row)
+        if all(isinstance(value, snmp.EndOfMibView) for _, value in row):
+            break
+        current = [oid for oid, _ in row]
+    return output
+
+
+@pytest.mark.parametrize("oids, non_repeaters, max_repetitions", [
+    ([SUFFIX + "2"], 0, 10),
+    ([SUFFIX + "2.1.390"], 0, 25),  # atravessa a coluna e segue para a proxima
+    ([SUFFIX + "2.4.395", SUFFIX + "3.6.95"], 0, 20),  # as duas tabelas terminam no meio da resposta
+    ([SUFFIX + "1.1.1", SUFFIX + "2.2.10", SUFFIX + "3.1.1"], 1, 15),
+    ([SUFFIX + "1.1", SUFFIX + "1.2"], 2, 10),  # so non-repeaters
+    ([SUFFIX + "3.6.99", SUFFIX + "2.1.1"], 5, 4),  # non-repeaters maior que a lista
+    ([SUFFIX + "2.3.1"], 0, 0),
+])
+def test_get_bulk_matches_get_next(history, oids, non_repeaters, max_repetitions):
+    response, _, _ = utils.get_bulk([snmp.VariableBinding(oid, snmp.Null()) for oid in oids],
+                                    non_repeaters=non_repeaters, max_repetitions=max_repetitions,
+                                    vbs=main.registry)
+    expected = expected_bulk(oids, min(non_repeaters, len(oids)), max_repetitions)
+    assert plain((vb.oid, vb.value) for vb in response) == plain(expected)
+
+
+def test_get_bulk_end_of_mib(history):
+    last, _ = get_next_walk("1.3")[-1]
+    response, _, _ = utils.get_bulk([snmp.VariableBinding(last, snmp.Null())], non_repeaters=0,
+                                    max_repetitions=10, vbs=main.registry)
+    assert [(vb.oid, type(vb.value)) for vb in response] == [(last, snmp.EndOfMibView)]
+
+
+def test_get_bulk_limits(history):
+    request = snmp.SNMPRequest(snmp.VERSION.V2C, "public", snmp.SnmpGetBulkContext(), 1,
+                               [snmp.VariableBinding(SUFFIX + "2", snmp.Null())], non_repeaters=0,
+                               max_repetitions=100000)
+    full, _, _ = utils.get_bulk([snmp.VariableBinding(SUFFIX + "2", snmp.Null())], non_repeaters=0,
+                                max_repetitions=utils.MAX_REPETITIONS, vbs=main.registry)
+
+    for max_size in (utils.MAX_MESSAGE_SIZE, 484):
+        request.variable_bindings = [snmp.VariableBinding(SUFFIX + "2", snmp.Null())]
+        response, _, _ = utils.handle_request(request, main.registry, max_size=max_size)
+        data = snmp.encode_response(request.create_response(response))
+        assert len(data) <= max_size
+        assert 0 < len(response) < utils.MAX_REPETITIONS
+        # Os varbinds que cabem sao o inicio da resposta completa
+        assert plain((vb.oid, vb.value) for vb in response) == plain((vb.oid, vb.value) for vb in full[:len(response)])
+
+    response, _, _ = utils.handle_request(request, main.registry, max_size=1 << 20)
+    assert len(response) == utils.MAX_REPETITIONS
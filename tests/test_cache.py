@@ -0,0 +1,97 @@
+from types import SimpleNamespace
+
+from snmp_agent import cache, snmp, utils
+from snmp_agent.cache import ResponseCache
+from snmp_agent.registry import OidRegistry
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(monkeypatch, generation=None, **kwargs):
+    clock = Clock()
+    monkeypatch.setattr(cache, "time", SimpleNamespace(monotonic=clock))
+    return ResponseCache({"1.3.6.1.3.1.1": 5, "1.3.6.1.3.1.1.2": 1}, generation=generation, **kwargs), clock
+
+
+def test_ttl_longest_prefix():
+    response_cache = ResponseCache({"1.3.6.1.3.1.1": 5, "1.3.6.1.3.1.1.2": 1})
+    assert response_cache.ttl("1.3.6.1.3.1.1.1.1") == 5
+    assert response_cache.ttl("1.3.6.1.3.1.1.2.2") == 1
+    assert response_cache.ttl("1.3.6.1.3.1.2.1.1") == 0
+
+
+def test_expires_and_skips_uncached_subtrees(monkeypatch):
+    response_cache, clock = make_cache(monkeypatch)
+    response_cache.put("1.3.6.1.3.1.1.1.1", snmp.Integer(1))
+    response_cache.put("1.3.6.1.3.1.1.2.2", snmp.Integer(2))
+    response_cache.put("1.3.6.1.3.1.2.1.1", snmp.Integer(3))
+    assert len(response_cache) == 2
+    assert response_cache.get("1.3.6.1.3.1.1.2.2").value == 2
+
+    clock.now += 1
+    assert response_cache.get("1.3.6.1.3.1.1.2.2") is None
+    assert response_cache.get("1.3.6.1.3.1.1.1.1").value == 1
+    clock.now += 4
+    assert response_cache.get("1.3.6.1.3.1.1.1.1") is None
+    assert (response_cache.hits, response_cache.misses) == (2, 2)
+
+
+def test_generation_change_clears(monkeypatch):
+    generation = [1]
+    calls = []
+
+    def current():
+        calls.append(generation[0])
+        return generation[0]
+
+    response_cache, clock = make_cache(monkeypatch, generation=current, generation_interval=1.0)
+    response_cache.put("1.3.6.1.3.1.1.1.1", snmp.Integer(1))
+    assert response_cache.get("1.3.6.1.3.1.1.1.1") is None  # primeira geracao vista: descarta
+    response_cache.put("1.3.6.1.3.1.1.1.1", snmp.Integer(1))
+
+    generation[0] = 2
+    # Consultada no maximo uma vez por generation_interval
+    assert response_cache.get("1.3.6.1.3.1.1.1.1") is not None
+    clock.now += 1
+    assert response_cache.get("1.3.6.1.3.1.1.1.1") is None
+    assert calls == [1, 2]
+
+
+def test_bounded(monkeypatch):
+    response_cache, _ = make_cache(monkeypatch, maxsize=2)
+    for index in range(1, 4):
+        response_cache.put(f"1.3.6.1.3.1.1.1.{index}", snmp.Integer(index))
+    assert len(response_cache) == 2
+    assert response_cache.get("1.3.6.1.3.1.1.1.1") is None
+    response_cache.invalidate()
+    assert len(response_cache) == 0
+
+
+def test_set_invalidates(monkeypatch):
+    values = {"1.3.6.1.3.1.1.1.1": 1}
+
+    def write(vb):
+        values[vb.oid] = vb.value.value
+        return 0, vb.value
+
+    registry = OidRegistry([snmp.VariableBind("1.3.6.1.3.1.1.1.1", read=lambda vb: (0, snmp.Integer(values[vb.oid])),
+                                              write=write)])
+    response_cache, _ = make_cache(monkeypatch)
+
+    def request(context, value):
+        req = snmp.SNMPRequest(snmp.VERSION.V2C, "public", context, 1,
+                               [snmp.VariableBinding("1.3.6.1.3.1.1.1.1", value)])
+        response, _, _ = utils.handle_request(req, registry, cache=response_cache)
+        return response[0].value.value
+
+    assert request(snmp.SnmpGetContext(), snmp.Null()) == 1
+    values["1.3.6.1.3.1.1.1.1"] = 5  # mudanca sem SET: o valor guardado ainda vale pelo TTL
+    assert request(snmp.SnmpGetContext(), snmp.Null()) == 1
+    request(snmp.SnmpSetRequestContext(), snmp.Integer(7))
+    assert request(snmp.SnmpGetContext(), snmp.Null()) == 7
@@ -0,0 +1,19 @@
+from sqlalchemy import select
+
+import orm
+
+
+def test_seeded_methods():
+    with orm.engine.connect() as connection:
+        rows = {id_: (method, active) for id_, method, active in connection.execute(
+            select(orm.DiscoveryMethod.id, orm.DiscoveryMethod.method, orm.DiscoveryMethod.active))}
+    # Todos os metodos, inclusive os de IPv6; so o timeout de ICMP indica um dispositivo desconectado
+    assert rows == {method.value: (method.name, method is not orm.EnumMethods.ICMP_ECHO_RESPONSE_TIMEOUT)
+                    for method in orm.EnumMethods}
+
+
+def test_seed_keeps_existing_rows():
+    orm.ensure_discovery_methods()
+    with orm.engine.connect() as connection:
+        count = len(connection.execute(select(orm.DiscoveryMethod.id)).all())
+    assert count == len(orm.EnumMethods)
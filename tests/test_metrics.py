@@ -0,0 +1,52 @@
+from snmp_agent.metrics import Metrics, SharedMetrics
+
+
+def worker_metrics(ns: int, counters: dict) -> Metrics:
+    metrics = Metrics()
+    metrics.observe_request("get", "1.3.6.1.3.1.2", {"decode": ns, "total": 2 * ns})
+    metrics.counters = counters
+    return metrics
+
+
+def test_load_sums_workers(tmp_path):
+    paths = []
+    for index, (ns, counters) in enumerate([(1000, {"received": 10, "dropped": 1}),
+                                            (5000, {"received": 4, "rate_limited_source": 3})]):
+        path = str(tmp_path / f"agent_metrics.json.{index}")
+        metrics = worker_metrics(ns, {})
+        metrics.dump(path, counters=counters)
+        paths.append(path)
+
+    merged = Metrics.load(paths)
+    assert merged.counters == {"received": 14, "dropped": 1, "rate_limited_source": 3}
+    total = merged.histograms[("total", "get", "1.3.6.1.3.1.2")]
+    assert (total.count, total.total_ns, total.max_ns) == (2, 12000, 10000)
+    assert [key[0] for key, _ in merged.rows()] == ["decode", "total"]
+
+
+def test_merge_does_not_share_histograms():
+    merged = Metrics()
+    worker = worker_metrics(1000, {"received": 1})
+    merged.merge(worker)
+    merged.merge(worker)
+    assert merged.histograms[("decode", "get", "1.3.6.1.3.1.2")].count == 2
+    assert worker.histograms[("decode", "get", "1.3.6.1.3.1.2")].count == 1
+    assert merged.counters == {"received": 2}
+
+
+def test_shared_metrics_sums_other_workers(tmp_path):
+    pattern = str(tmp_path / "agent_metrics.json")
+    worker_metrics(3000, {}).dump(f"{pattern}.1")
+    # O arquivo deste processo fica de fora: os histogramas locais entram ao vivo
+    worker_metrics(9000, {}).dump(f"{pattern}.0")
+    local = worker_metrics(1000, {})
+    shared = SharedMetrics(local, f"{pattern}.*", own=f"{pattern}.0", interval=0)
+
+    rows = dict(shared.rows())
+    assert rows[("decode", "get", "1.3.6.1.3.1.2")].total_ns == 4000
+
+    local.observe("decode", "get", "1.3.6.1.3.1.2", 500)
+    worker_metrics(2000, {}).dump(f"{pattern}.2")
+    rows = dict(shared.rows())
+    assert rows[("decode", "get", "1.3.6.1.3.1.2")].total_ns == 6500
+    assert local.histograms[("decode", "get", "1.3.6.1.3.1.2")].count == 2
@@ -0,0 +1,60 @@
+import pytest
+
+import functions
+import main
+from snmp_agent import snmp, utils
+from snmp_agent.registry import parse_oid
+
+SUFFIX = "1.3.6.1.3.1."
+
+
+def get_next(oid: str):
+    response, _, _ = utils.get_next([snmp.VariableBinding(oid, snmp.Null())], main.registry)
+    return response[0].oid, response[0].value
+
+
+def get_next_walk(oid: str):
+    """Todos os pares (oid, valor) de um walk por GetNext a partir de `oid`, ate o EndOfMibView"""
+    output = []
+    while True:
+        oid, value = get_next(oid)
+        if isinstance(value, snmp.EndOfMibView):
+            return output
+        output.append((oid, value))
+
+
+def test_get_next_strictly_increasing(history):
+    devices, rows = history
+    walked = get_next_walk("1.3")
+    keys = [parse_oid(oid) for oid, _ in walked]
+    assert all(a < b for a, b in zip(keys, keys[1:]))
+
+    # Todas as celulas das duas tabelas do banco, coluna a coluna
+    history_cells = [oid for oid, _ in walked if oid.startswith(SUFFIX + "2.")]
+    device_cells = [oid for oid, _ in walked if oid.startswith(SUFFIX + "3.")]
+    assert len(history_cells) == rows * len(functions.history_table.columns)
+    assert len(device_cells) == devices * len(functions.device_table.columns)
+    assert history_cells[0] == SUFFIX + "2.1.1"
+    assert history_cells[-1] == f"{SUFFIX}2.4.{rows}"
+
+
+@pytest.mark.parametrize("oid", [
+    SUFFIX + "1.2.2",  # ultimo escalar antes da tabela de historico
+    SUFFIX + "2",  # no da tabela, antes da primeira celula
+    SUFFIX + "2.1.400",  # ultima linha da primeira coluna
+    SUFFIX + "2.4.400",  # ultima celula da tabela
+    SUFFIX + "2.9",  # coluna inexistente apos a ultima
+    SUFFIX + "3.6.100",  # ultima celula da tabela de dispositivos
+])
+def test_get_next_across_boundaries(history, oid):
+    successor, _ = get_next(oid)
+    assert parse_oid(successor) > parse_oid(oid)
+    # O sucessor e o primeiro objeto do walk completo maior que o OID pedido
+    expected = next(walked for walked, _ in get_next_walk("1.3") if parse_oid(walked) > parse_oid(oid))
+    assert successor == expected
+
+
+def test_get_next_end_of_mib(history):
+    last, _ = get_next_walk("1.3")[-1]
+    oid, value = get_next(last)
+    assert (oid, type(value)) == (last, snmp.EndOfMibView)
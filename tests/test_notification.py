@@ -0,0 +1,97 @@
+import socket
+import threading
+
+import pytest
+
+import notifier
+from snmp_agent import snmp
+from snmp_agent.notification import NotificationSender, Receiver, SNMP_TRAP_ENTERPRISE, SNMP_TRAP_OID, SYS_UPTIME
+from snmp_agent.ratelimit import TokenBucket
+
+NOTIFICATIONS = {snmp.ASN1.SNMPV2_TRAP.code: snmp.SnmpTrapContext,
+                 snmp.ASN1.INFORM_REQUEST.code: snmp.SnmpInformContext}
+
+DEVICE_ROW = ["02:00:00:00:00:07", "192.168.0.7", "OFFLINE", False, "2026-01-01 00:00:00", 3]
+
+
+@pytest.fixture
+def receiver_socket():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    sock.settimeout(2)
+    yield sock
+    sock.close()
+
+
+def receiver(sock: socket.socket, inform: bool = False) -> Receiver:
+    return Receiver("127.0.0.1", sock.getsockname()[1], community="traps", inform=inform)
+
+
+def device_notification():
+    return notifier.trap_oid("OFFLINE"), notifier.DeviceNotifier.variable_bindings(7, DEVICE_ROW)
+
+
+def test_trap_pdu(receiver_socket):
+    sender = NotificationSender([receiver(receiver_socket)])
+    trap_oid, variable_bindings = device_notification()
+    assert trap_oid == "1.3.6.1.3.1.0.2"
+    assert sender.send(trap_oid, variable_bindings, enterprise=notifier.ENTERPRISE)
+
+    trap = snmp.decode_request(receiver_socket.recv(65535), contexts=NOTIFICATIONS)
+    assert isinstance(trap.context, snmp.SnmpTrapContext)
+    assert (trap.version, trap.community) == (snmp.VERSION.V2C, "traps")
+    # sysUpTime.0 e snmpTrapOID.0 primeiro (RFC 3416), depois as colunas da deviceTable e o enterprise
+    assert [vb.oid for vb in trap.variable_bindings] == [
+        SYS_UPTIME, SNMP_TRAP_OID, "1.3.6.1.3.1.3.1.7", "1.3.6.1.3.1.3.2.7", "1.3.6.1.3.1.3.3.7",
+        SNMP_TRAP_ENTERPRISE]
+    assert trap.variable_bindings[1].value.value == "1.3.6.1.3.1.0.2"
+    assert trap.variable_bindings[-1].value.value == notifier.ENTERPRISE
+    assert trap.variable_bindings[4].value.value == b"OFFLINE"
+    assert sender.counters["sent"] == 1
+
+
+def acknowledge(sock: socket.socket, ignore: int, received: list):
+    """Confirma o inform depois de ignorar as `ignore` primeiras transmissoes"""
+    while True:
+        try:
+            data, address = sock.recvfrom(65535)
+        except socket.timeout:
+            return
+        inform = snmp.decode_request(data, contexts=NOTIFICATIONS)
+        received.append(inform)
+        if len(received) > ignore:
+            response = snmp.SNMPResponse(version=inform.version, community=inform.community,
+                                         request_id=inform.request_id, variable_bindings=[])
+            sock.sendto(snmp.encode_response(response), address)
+            return
+
+
+def test_inform_acknowledged_after_retry(receiver_socket):
+    received = []
+    thread = threading.Thread(target=acknowledge, args=(receiver_socket, 1, received))
+    thread.start()
+    sender = NotificationSender([receiver(receiver_socket, inform=True)], timeout=0.2, retries=2)
+    sender.send(*device_notification())
+    thread.join()
+
+    assert all(isinstance(inform.context, snmp.SnmpInformContext) for inform in received)
+    assert len({inform.request_id for inform in received}) == 1
+    assert sender.counters == {"sent": 2, "acknowledged": 1, "unacknowledged": 0, "rate_limited": 0}
+
+
+def test_inform_unacknowledged(receiver_socket):
+    sender = NotificationSender([receiver(receiver_socket, inform=True)], timeout=0.1, retries=2)
+    sender.send(*device_notification())
+
+    receiver_socket.settimeout(0.5)
+    request_ids = [snmp.decode_request(receiver_socket.recv(65535), contexts=NOTIFICATIONS).request_id
+                   for _ in range(3)]
+    assert len(set(request_ids)) == 1
+    assert sender.counters == {"sent": 3, "acknowledged": 0, "unacknowledged": 1, "rate_limited": 0}
+
+
+def test_rate_limited(receiver_socket):
+    sender = NotificationSender([receiver(receiver_socket)], limiter=TokenBucket(rate=0, burst=1))
+    assert sender.send(*device_notification())
+    assert not sender.send(*device_notification())
+    assert (sender.counters["sent"], sender.counters["rate_limited"]) == (1, 1)
@@ -0,0 +1,63 @@
+import threading
+from collections import OrderedDict
+
+import pytest
+
+from snmp_agent import ber
+
+OIDS = ["1.3", "1.3.6", "2.999.1", "1.3.6.1.4.1.2021.10.1.3.1", "1.3.6.1.3.1.2.1.1.1", "1.3.6.1.3.1.3.1.6.4294967295"]
+
+
+@pytest.mark.parametrize("oid", OIDS)
+def test_same_encoding_as_encode_oid(oid):
+    cache = ber.OidCache()
+    assert cache.encode(oid) == ber.encode_oid(oid)
+    # Segunda vez a partir do prefixo guardado
+    assert cache.encode(oid) == ber.encode_oid(oid)
+
+
+def test_table_cells_share_a_prefix():
+    cache = ber.OidCache()
+    for row in range(1, 101):
+        for column in range(1, 5):
+            assert cache.encode(f"1.3.6.1.3.1.2.1.{column}.{row}") == ber.encode_oid(f"1.3.6.1.3.1.2.1.{column}.{row}")
+    assert (len(cache), cache.misses, cache.hits) == (1, 1, 399)
+
+
+def test_bounded():
+    cache = ber.OidCache(maxsize=2)
+    for table in range(10):
+        cache.encode(f"1.3.6.1.3.1.{table}.1.1.1")
+    assert len(cache) == 2
+    cache.clear()
+    assert (len(cache), cache.hits, cache.misses) == (0, 0, 0)
+
+
+
+class RacingPrefixes(OrderedDict):
+    """Na primeira busca, outra thread codifica um OID novo (despejando o prefixo achado) antes do retorno"""
+
+    def __init__(self, cache):
+        super().__init__()
+        self.cache = cache
+        self.other = None
+
+    def get(self, key, default=None):
+        value = super().get(key, default)
+        if self.other is None and value is not None:
+            self.other = threading.Thread(target=self.cache.encode, args=("1.3.6.1.3.1.9.1.1.1",))
+            self.other.start()
+            # Sem a trava a outra thread termina aqui; com ela, fica esperando o fim desta busca
+            self.other.join(timeout=0.2)
+        return value
+
+
+def test_eviction_from_another_thread():
+    # O loop do agente e a thread de notificacoes usam a mesma instancia
+    cache = ber.OidCache(maxsize=1)
+    cache._prefixes = RacingPrefixes(cache)
+    cache.encode("1.3.6.1.3.1.2.1.1.1")
+    assert cache.encode("1.3.6.1.3.1.2.1.1.2") == ber.encode_oid("1.3.6.1.3.1.2.1.1.2")
+    cache._prefixes.other.join()
+    assert list(cache._prefixes) == ["1.3.6.1.3.1.9.1"]
+    assert (cache.hits, cache.misses) == (1, 2)
@@ -0,0 +1,121 @@
+import re
+from ipaddress import IPv4Address, IPv4Network
+
+import pytest
+from sqlalchemy import delete, select
+
+import orm
+
+MAC = re.compile(r"\b[0-9a-f]{2}(?::[0-9a-f]{2}){5}\b", re.IGNORECASE)
+STATUSES = ("ONLINE(NEW)", "ONLINE", "OFFLINE", "RECONNECTED")
+
+
+def expected_statuses():
+    """Status de cada MAC calculado em Python a partir das observacoes, com as regras de orm.device_status"""
+    observations = {}
+    with orm.engine.connect() as connection:
+        query = select(orm.Device.mac_addr, orm.DeviceNetwork.discovery_method_id) \
+            .join(orm.Device, orm.Device.id == orm.DeviceNetwork.device_id) \
+            .order_by(orm.DeviceNetwork.discovered_at.desc(), orm.DeviceNetwork.id.desc())
+        for mac, method in connection.execute(query):
+            observations.setdefault(mac, []).append(method != orm.EnumMethods.ICMP_ECHO_RESPONSE_TIMEOUT.value)
+
+    output = {}
+    for mac, active in observations.items():
+        if not active[0]:
+            output[mac] = "OFFLINE"
+        elif len(active) == 1:
+            output[mac] = "ONLINE(NEW)"
+        elif active[1]:
+            output[mac] = "ONLINE"
+        else:
+            output[mac] = "RECONNECTED"
+    return output
+
+
+def listed(**filters):
+    return MAC.findall(orm.get_devices(**filters))
+
+
+@pytest.mark.parametrize("status", STATUSES)
+def test_status_filter(history, status):
+    expected = sorted(mac for mac, value in expected_statuses().items() if value == status)
+    # O banco sintetico tem dispositivos em todos os status
+    assert expected
+    assert sorted(listed(status=(status,))) == expected
+
+
+def test_status_filter_combined(history):
+    statuses = expected_statuses()
+    assert sorted(listed(status=("OFFLINE", "RECONNECTED"))) == \
+        sorted(mac for mac, value in statuses.items() if value in ("OFFLINE", "RECONNECTED"))
+    assert sorted(listed()) == sorted(statuses)
+
+
+def test_device_summaries(history):
+    cursor, rows = orm.device_summaries()
+    assert cursor == history[1]
+    assert {row[1]: row[8] for row in rows} == expected_statuses()
+
+
+def test_agent_device_rows(history):
+    # Mesma regra na tabela de dispositivos servida pelo agente
+    assert {row[0]: row[2] for _, row in orm.all_device_rows()} == expected_statuses()
+
+
+def summaries():
+    columns = [getattr(orm.Device, name) for name in orm.DEVICE_SUMMARY_COLUMNS]
+    with orm.engine.connect() as connection:
+        return {row[0]: tuple(row[1:]) for row in connection.execute(select(orm.Device.mac_addr, *columns))}
+
+
+def test_save_keeps_summary(history):
+    mac = "02:00:00:98:00:01"
+    orm.save(ip="10.98.0.1", mac=mac, method=orm.EnumMethods.ARP_2)
+    orm.save(ip="10.98.0.1", method=orm.EnumMethods.ICMP_ECHO_RESPONSE_TIMEOUT)
+    orm.save(ip="10.98.0.2", mac=mac, method=orm.EnumMethods.ARP_2)
+    try:
+        assert listed(status=("RECONNECTED",), subnet=IPv4Network("10.98.0.0/24")) == [mac]
+        saved = summaries()
+        assert saved[mac][:2] == ("10.98.0.2", orm.ip_number("10.98.0.2"))
+        # O resumo mantido por save() e o mesmo que um recalculo a partir do historico
+        with orm.engine.connect() as connection:
+            orm.refresh_device_summaries(connection)
+            assert summaries() == saved
+            connection.rollback()
+    finally:
+        with orm.engine.connect() as connection:
+            device = select(orm.Device.id).where(orm.Device.mac_addr == mac).scalar_subquery()
+            connection.execute(delete(orm.DeviceNetwork).where(orm.DeviceNetwork.device_id == device))
+            connection.execute(delete(orm.Device).where(orm.Device.mac_addr == mac))
+            connection.commit()
+
+
+def test_subnet_and_seen_since(history):
+    with orm.engine.connect() as connection:
+        rows = connection.execute(select(orm.Device.mac_addr, orm.Device.last_ip, orm.Device.last_seen_at)).all()
+    subnet = IPv4Network("10.0.0.0/26")
+    assert sorted(listed(subnet=subnet)) == sorted(mac for mac, ip, _ in rows if IPv4Address(ip) in subnet)
+
+    since = sorted(seen for _, _, seen in rows)[len(rows) // 2]
+    assert sorted(listed(seen_since=since)) == sorted(mac for mac, _, seen in rows if seen >= since)
+    # Ordenado pelo visto mais recentemente
+    assert listed(limit=3) == [mac for mac, _, _ in sorted(rows, key=lambda row: row[2], reverse=True)[:3]]
+
+
+def test_vendor_filter(history):
+    macs = ["00:00:0c:97:00:01", "00:00:0C:97:00:02", "00:00:0d:97:00:03"]
+    for index, mac in enumerate(macs):
+        orm.save(ip=f"10.97.0.{index + 1}", mac=mac, method=orm.EnumMethods.ARP_2)
+    try:
+        # O OUI casa nas duas grafias e so como prefixo
+        assert sorted(listed(vendor_prefixes=["00:00:0C"])) == sorted(macs[:2])
+        assert sorted(listed(vendor_prefixes=["00:00:0c", "00:00:0D", "00:00:0E"])) == sorted(macs)
+        assert listed(vendor_prefixes=[]) == []
+        assert len(listed(vendor_prefixes=["02:00:00"])) == history[0]
+    finally:
+        with orm.engine.connect() as connection:
+            devices = select(orm.Device.id).where(orm.Device.mac_addr.in_(macs))
+            connection.execute(delete(orm.DeviceNetwork).where(orm.DeviceNetwork.device_id.in_(devices)))
+            connection.execute(delete(orm.Device).where(orm.Device.mac_addr.in_(macs)))
+            connection.commit()
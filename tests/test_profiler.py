@@ -0,0 +1,58 @@
+import multiprocessing
+import os
+
+import profiler
+from profiler import SamplingProfiler, SharedControl
+
+
+def workers(tmp_path, n=2):
+    # Duas instancias sobre o mesmo Array fazem o papel de dois workers do agente
+    array = multiprocessing.get_context("spawn").Array('d', 3)
+    return [SharedControl(array, SamplingProfiler(interval=0.001, output_dir=str(tmp_path))) for _ in range(n)]
+
+
+def wait(control: SharedControl):
+    if (thread := control._profiler._thread) is not None:
+        thread.join(timeout=5)
+
+
+def test_window_is_shared(tmp_path):
+    first, second = workers(tmp_path)
+    assert (first.remaining, first.last_output) == (0, None)
+
+    assert first.start(60)
+    assert not second.start(60)  # a janela ja esta aberta, pedida por outro worker
+    assert 59 < second.remaining <= 60
+    assert first._profiler.running and not second._profiler.running
+    second.poll()
+    assert second._profiler.running
+
+    second.stop()
+    first.poll()
+    wait(first)
+    wait(second)
+    assert first.remaining == 0
+    pattern = first.last_output
+    assert pattern == os.path.join(str(tmp_path), "profile-w1-*.collapsed")
+    assert len(list(tmp_path.glob("profile-w1-*.collapsed"))) == 1  # mesmo pid nos dois "workers"
+
+
+def test_window_ends_at_deadline(tmp_path):
+    first, second = workers(tmp_path)
+    assert first.start(0.05)
+    second.poll()
+    wait(first)
+    wait(second)
+    assert not first._profiler.running and not second._profiler.running
+    assert first.start(60)
+    # A janela 2 ainda nao gravou nada: a saida continua sendo a da janela 1
+    assert first.last_output.endswith("profile-w1-*.collapsed")
+    first.stop()
+    wait(first)
+    assert first.last_output.endswith("profile-w2-*.collapsed")
+
+
+def test_single_process_uses_local_profiler(monkeypatch):
+    monkeypatch.setattr(profiler, "_control", None)
+    assert profiler.get_control() is profiler.get_profiler()
+    profiler.poll()
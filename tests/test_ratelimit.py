@@ -0,0 +1,88 @@
+import asyncio
+
+from snmp_agent import snmp
+from snmp_agent.ratelimit import KeyedTokenBuckets, TokenBucket
+from snmp_agent.server import SNMPProtocol
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_refills():
+    clock = Clock()
+    bucket = TokenBucket(rate=2, burst=3, clock=clock)
+    assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+    assert bucket.wait_time() == 0.5
+    clock.now += 0.5
+    assert bucket.try_acquire()
+    clock.now += 60
+    # Nunca acumula mais que `burst`
+    assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+    assert TokenBucket(rate=0, burst=0).wait_time() == float("inf")
+
+
+def test_keyed_buckets_are_independent():
+    clock = Clock()
+    buckets = KeyedTokenBuckets(rate=1, burst=1, clock=clock)
+    assert buckets.try_acquire("10.0.0.1")
+    assert not buckets.try_acquire("10.0.0.1")
+    assert buckets.try_acquire("10.0.0.2")
+    clock.now += 1
+    assert buckets.try_acquire("10.0.0.1")
+    assert len(buckets) == 2
+
+
+def test_keyed_buckets_forget_least_recent():
+    clock = Clock()
+    buckets = KeyedTokenBuckets(rate=0, burst=1, max_keys=2, clock=clock)
+    assert buckets.try_acquire("a") and buckets.try_acquire("b")
+    assert not buckets.try_acquire("a")  # "a" passa a ser a mais recente
+    assert buckets.try_acquire("c")  # despeja "b"
+    assert len(buckets) == 2
+    assert not buckets.try_acquire("a")
+    # Uma chave despejada volta com o bucket cheio
+    assert buckets.try_acquire("b")
+
+
+def request(community: str) -> bytes:
+    message = snmp.SNMPResponse(snmp.VERSION.V2C, community, 1,
+                                [snmp.VariableBinding("1.3.6.1.3.1.1.1.1", snmp.Null())])
+    message.context = snmp.SnmpGetContext()
+    return snmp.encode_response(message)
+
+
+class Transport(object):
+    def __init__(self):
+        self.sent = []
+
+    def sendto(self, data, address):
+        self.sent.append(address)
+
+
+def test_protocol_admission_counters():
+    async def handler(req):
+        return req.create_response([snmp.VariableBinding(vb.oid, snmp.Integer(1)) for vb in req.variable_bindings])
+
+    async def run():
+        clock = Clock()
+        protocol = SNMPProtocol(handler, source_limit=KeyedTokenBuckets(rate=0, burst=2, clock=clock),
+                                community_limit=KeyedTokenBuckets(rate=0, burst=1, clock=clock))
+        protocol.connection_made(Transport())
+        protocol.datagram_received(request("public"), ("10.0.0.1", 5000))
+        protocol.datagram_received(request("public"), ("10.0.0.2", 5000))  # community sem fichas
+        protocol.datagram_received(request("private"), ("10.0.0.1", 5000))
+        protocol.datagram_received(request("other"), ("10.0.0.1", 5000))  # origem sem fichas
+        protocol.datagram_received(b"\x30\x03\x02\x01", ("10.0.0.3", 5000))
+        while protocol.in_flight:
+            await asyncio.sleep(0)
+        return protocol
+
+    protocol = asyncio.run(run())
+    assert protocol.transport.sent == [("10.0.0.1", 5000), ("10.0.0.1", 5000)]
+    assert protocol.counters == {"received": 5, "responded": 2, "dropped": 0, "malformed": 1, "errors": 0,
+                                 "rate_limited_source": 1, "rate_limited_community": 1}
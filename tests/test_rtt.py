@@ -0,0 +1,60 @@
+import pytest
+
+import orm
+import rtt
+
+
+def test_first_sample():
+    assert rtt.update(None, 0.1) == rtt.RttEstimate(0.1, 0.05)
+
+
+def test_update_follows_rfc6298():
+    estimate = rtt.update(rtt.update(None, 0.1), 0.3)
+    assert estimate.rttvar == pytest.approx(0.75 * 0.05 + 0.25 * 0.2)
+    assert estimate.srtt == pytest.approx(0.875 * 0.1 + 0.125 * 0.3)
+
+
+def test_steady_samples_converge():
+    estimate = None
+    for _ in range(200):
+        estimate = rtt.update(estimate, 0.05)
+    assert estimate.srtt == pytest.approx(0.05)
+    assert estimate.rttvar == pytest.approx(0, abs=1e-6)
+    # RTO = SRTT + 4 * RTTVAR, nunca abaixo de MIN_TIMEOUT
+    assert rtt.timeout(estimate, 10) == rtt.MIN_TIMEOUT
+
+
+def test_timeout_bounds():
+    assert rtt.timeout(None, 10) == rtt.INITIAL_TIMEOUT
+    assert rtt.timeout(None, 0.5) == 0.5
+    assert rtt.timeout(rtt.RttEstimate(0.3, 0.1), 10) == pytest.approx(0.7)
+    assert rtt.timeout(rtt.RttEstimate(5, 5), 3) == 3
+
+
+def test_unknown_host_uses_subnet():
+    estimates = {"10.0.0.1": rtt.RttEstimate(0.2, 0.01), "10.0.0.2": rtt.RttEstimate(0.4, 0.01),
+                 "10.0.0.3": rtt.RttEstimate(0.3, 0.01), "10.0.1.1": rtt.RttEstimate(2.0, 0.5)}
+    subnets = rtt.subnet_estimates(estimates)
+    assert set(subnets) == {"10.0.0.0/24", "10.0.1.0/24"}
+    # Mediana do SRTT e a maior variacao em torno dela
+    assert subnets["10.0.0.0/24"] == pytest.approx(rtt.RttEstimate(0.3, 0.11))
+
+    assert rtt.host_timeout("10.0.0.1", estimates, subnets, 10) == pytest.approx(0.24)
+    assert rtt.host_timeout("10.0.0.99", estimates, subnets, 10) == pytest.approx(0.3 + 4 * 0.11)
+    assert rtt.host_timeout("192.168.0.1", estimates, subnets, 10) == rtt.INITIAL_TIMEOUT
+
+
+def test_round_timeout_backoff():
+    estimates = {"10.0.0.1": rtt.RttEstimate(0.3, 0.1)}
+    ips = ["10.0.0.1", "10.0.2.1"]
+    assert rtt.round_timeout(ips, estimates, {}, 10) == rtt.INITIAL_TIMEOUT
+    assert rtt.round_timeout(ips, estimates, {}, 10, attempt=2) == 4 * rtt.INITIAL_TIMEOUT
+    assert rtt.round_timeout(ips, estimates, {}, 3, attempt=5) == 3
+    assert rtt.round_timeout([], estimates, {}, 10) == 0
+
+
+def test_estimates_are_persisted():
+    orm.save_rtt_estimates({"172.16.0.1": (0.1, 0.02), "172.16.0.2": (0.5, 0.1)})
+    orm.save_rtt_estimates({"172.16.0.1": (0.2, 0.03)})
+    assert orm.get_rtt_estimates(["172.16.0.1", "172.16.0.2", "172.16.0.3"]) == \
+        {"172.16.0.1": (0.2, 0.03), "172.16.0.2": (0.5, 0.1)}
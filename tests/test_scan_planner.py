@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+
+import orm
+import scan_planner
+
+NOW = datetime(2026, 1, 1, 12, 0, 0)
+
+
+def target(ip, seconds_ago, alive=True, ever_alive=True, flaps=0.0, stable_runs=1):
+    return orm.ScanTarget(ip=ip, last_probed_at=NOW - timedelta(seconds=seconds_ago), alive=alive,
+                          ever_alive=ever_alive, flaps=flaps, stable_runs=stable_runs)
+
+
+def test_probe_interval():
+    assert scan_planner.probe_interval(target("a", 0, ever_alive=False)) == scan_planner.UNUSED_INTERVAL
+    assert scan_planner.probe_interval(target("a", 0, flaps=1.0, stable_runs=10)) == scan_planner.BASE_INTERVAL
+    assert scan_planner.probe_interval(target("a", 0, stable_runs=0)) == scan_planner.BASE_INTERVAL
+    assert scan_planner.probe_interval(target("a", 0, stable_runs=2)) == 4 * scan_planner.BASE_INTERVAL
+    assert scan_planner.probe_interval(target("a", 0, stable_runs=40)) == scan_planner.MAX_STABLE_INTERVAL
+
+
+def test_plan_order_and_budget():
+    targets = {
+        "10.0.0.2": target("10.0.0.2", 30, stable_runs=0),  # dentro do intervalo
+        "10.0.0.3": target("10.0.0.3", 120, stable_runs=0),  # 2x atrasado
+        "10.0.0.4": target("10.0.0.4", 120, flaps=1.0),  # instavel: 4x
+        "10.0.0.5": target("10.0.0.5", 3600, ever_alive=False),  # sem uso, ainda no intervalo de fundo
+    }
+    ips = [f"10.0.0.{i}" for i in range(1, 6)]
+    # Nunca sondado primeiro, depois o mais atrasado
+    assert scan_planner.plan(ips, targets, budget=10, now=NOW) == ["10.0.0.1", "10.0.0.4", "10.0.0.3"]
+    assert scan_planner.plan(ips, targets, budget=2, now=NOW) == ["10.0.0.1", "10.0.0.4"]
+    assert scan_planner.plan(ips, targets, budget=0, now=NOW) == []
+
+
+def test_probe_results_track_flaps():
+    ip = "172.31.0.1"
+    orm.save_probe_results({ip: True})
+    orm.save_probe_results({ip: True})
+    stable = orm.get_scan_targets([ip])[ip]
+    assert (stable.alive, stable.ever_alive, stable.flaps, stable.stable_runs) == (True, True, 0.0, 2)
+
+    orm.save_probe_results({ip: False})
+    orm.save_probe_results({ip: True})
+    flapping = orm.get_scan_targets([ip])[ip]
+    assert (flapping.alive, flapping.stable_runs) == (True, 1)
+    assert flapping.flaps == 0.5 * 1.0 + 1.0
+    assert scan_planner.probe_interval(flapping) == scan_planner.BASE_INTERVAL
+
+    orm.save_probe_results({"172.31.0.2": False})
+    assert orm.get_scan_targets(["172.31.0.2"])["172.31.0.2"].ever_alive is False
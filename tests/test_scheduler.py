@@ -0,0 +1,79 @@
+import settings
+import scheduler
+from scheduler import Job, ScanScheduler
+
+
+class FakePool(object):
+    """Guarda os trabalhos despachados; `finish` simula o fim de um deles"""
+
+    def __init__(self):
+        self.started = []
+
+    def apply_async(self, function, args, callback, error_callback):
+        self.started.append((args[0], args[1], callback, error_callback))
+
+    def finish(self, index, error=None):
+        kind, target, callback, error_callback = self.started[index]
+        if error is None:
+            callback((kind, target))
+        else:
+            error_callback(error)
+
+
+def running_scheduler(**kwargs):
+    scan = ScanScheduler(**kwargs)
+    scan._pool = FakePool()
+    return scan
+
+
+def test_covers_and_conflicts():
+    network = Job("icmp", "10.0.0.0/24")
+    assert network.covers(Job("icmp", "10.0.0.0/24"))
+    assert network.covers(Job("icmp", "10.0.0.64/26"))
+    assert not network.covers(Job("icmp", "10.0.0.0/16"))
+    assert not network.covers(Job("arp2"))
+    assert Job("arp2").covers(Job("arp2"))
+    assert network.conflicts(Job("icmp", "10.0.0.0/16"))
+    assert not network.conflicts(Job("icmp", "10.0.1.0/24"))
+
+
+def test_submit_coalesces(conf):
+    scan = running_scheduler()
+    assert scan.submit(Job("icmp", "10.0.0.0/24"))
+    # Mesma faixa ou sub-faixa de um trabalho em execucao
+    assert not scan.submit(Job("icmp", "10.0.0.0/24"))
+    assert not scan.submit(Job("icmp", "10.0.0.128/25"))
+    assert scan.submit(Job("icmp", "10.0.1.0/24"))
+    assert scan.submit(Job("arp2"))
+    assert not scan.submit(Job("arp2"))
+    assert [(kind, target) for kind, target, _, _ in scan._pool.started] == \
+        [("icmp", "10.0.0.0/24"), ("icmp", "10.0.1.0/24"), ("arp2", None)]
+    assert settings.get_setting("icmp_run") and settings.get_setting("arp2_run")
+
+
+def test_conflicting_job_waits(conf):
+    done = []
+    scan = running_scheduler(on_done=done.append)
+    scan.submit(Job("icmp", "10.0.0.0/25"))
+    # Sobrepoe a faixa em execucao sem estar contida nela: fica pendente ate o fim da primeira
+    assert scan.submit(Job("icmp", "10.0.0.0/24"))
+    assert len(scan._pool.started) == 1
+    assert not scan.submit(Job("icmp", "10.0.0.0/24"))
+
+    scan._pool.finish(0, error=OSError("no permission"))
+    assert [job.target for job in done] == ["10.0.0.0/25"]
+    assert [target for _, target, _, _ in scan._pool.started] == ["10.0.0.0/25", "10.0.0.0/24"]
+    assert scan.is_running("icmp")
+
+    scan._pool.finish(1)
+    assert not scan.is_running("icmp")
+    assert settings.get_setting("icmp_run") is False
+    # Terminado, o mesmo pedido volta a ser aceito
+    assert scan.submit(Job("icmp", "10.0.0.0/24"))
+
+
+def test_icmp_job_uses_settings(conf):
+    settings.set_setting("icmp_timeout", 7)
+    job = scheduler.icmp_job("10.0.0.0/24")
+    assert (job.target, job.params["timeout"], job.params["retries"]) == ("10.0.0.0/24", 7, 2)
+    assert scheduler.icmp_job().target == "192.168.0.0/29"
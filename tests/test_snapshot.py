@@ -0,0 +1,83 @@
+from sqlalchemy import delete
+
+import orm
+from snmp_agent.mib import SnapshotRowSource
+
+
+class FakeTable(object):
+    """Tabela em memoria com contador de geracao e registro das cargas feitas pela imagem"""
+
+    def __init__(self, rows):
+        self.rows = dict(rows)
+        self.generation = 0
+        self.loads = []
+
+    def insert(self, index, row):
+        self.rows[index] = row
+        self.generation += 1
+
+    def load(self):
+        self.loads.append("full")
+        return list(self.rows.items())
+
+    def load_from(self, index):
+        self.loads.append(index)
+        return [(i, row) for i, row in self.rows.items() if i >= index]
+
+    def source(self):
+        return SnapshotRowSource(self.load, generation=lambda: self.generation, interval=0, load_from=self.load_from)
+
+
+def test_loads_only_new_rows():
+    table = FakeTable({1: ("a",), 2: ("b",)})
+    rows = table.source()
+    assert rows.rows_after(None, 10) == [(1, ("a",)), (2, ("b",))]
+
+    table.insert(5, ("c",))
+    table.insert(7, ("d",))
+    assert rows.get_row(5) == ("c",)
+    assert rows.rows_after(2, 10) == [(5, ("c",)), (7, ("d",))]
+    assert len(rows) == 4
+    assert table.loads == ["full", 2]
+
+
+def test_reloads_when_last_row_changes():
+    table = FakeTable({1: ("a",), 2: ("b",)})
+    rows = table.source()
+    len(rows)
+
+    # Tabela apagada e reescrita: os indices recomecam e a ultima linha conhecida nao e mais a mesma
+    table.rows = {}
+    table.insert(1, ("x",))
+    table.insert(2, ("y",))
+    assert rows.rows_after(None, 10) == [(1, ("x",)), (2, ("y",))]
+    table.rows = {}
+    table.generation += 1
+    assert len(rows) == 0
+    assert table.loads == ["full", 2, "full", 2, "full"]
+
+
+def test_history_snapshot_follows_saves(history):
+    loads = []
+
+    def load_from(index):
+        loads.append(index)
+        return orm.history_rows_after(index - 1, None)
+
+    rows = SnapshotRowSource(orm.all_history_rows, generation=orm.get_generation, interval=0, load_from=load_from)
+    before = len(rows)
+    last = rows.rows_after(None, before)[-1][0]
+
+    orm.save(ip="10.99.0.1", mac="02:00:00:99:00:01", method=orm.EnumMethods.ARP_2)
+    try:
+        assert len(rows) == before + 1
+        index, row = rows.rows_after(last, 10)[0]
+        assert row[:2] == ("02:00:00:99:00:01", "10.99.0.1")
+        assert rows.get_row(index) == row
+        assert loads == [last]
+    finally:
+        # O banco sintetico e compartilhado pelos demais testes
+        with orm.engine.connect() as connection:
+            connection.execute(delete(orm.DeviceNetwork).where(orm.DeviceNetwork.id > last))
+            connection.execute(delete(orm.Device).where(orm.Device.mac_addr == "02:00:00:99:00:01"))
+            connection.commit()
@@ -0,0 +1,160 @@
+import io
+import os
+from datetime import datetime
+
+import pytest
+from sqlalchemy import delete, select
+
+import orm
+import watcher
+from watcher import DeviceBoard, DeviceState, LineView, TerminalView
+
+MAC = "02:00:00:96:00:01"
+IP = "10.96.0.1"
+
+
+@pytest.fixture
+def cleanup():
+    yield
+    # O banco sintetico e compartilhado pelos demais testes
+    with orm.engine.connect() as connection:
+        device = select(orm.Device.id).where(orm.Device.mac_addr == MAC).scalar_subquery()
+        connection.execute(delete(orm.DeviceNetwork).where(orm.DeviceNetwork.device_id == device))
+        connection.execute(delete(orm.Device).where(orm.Device.mac_addr == MAC))
+        connection.commit()
+
+
+def test_poll_reads_only_new_observations(history, cleanup, monkeypatch):
+    board = DeviceBoard()
+    board.load()
+    assert board.cursor == orm.max_observation_id()
+    assert len(board.order) == history[0]
+    assert board.poll() == []  # geracao igual: nada e consultado
+
+    orm.save(ip=IP, mac=MAC, method=orm.EnumMethods.ARP_2)
+    orm.save(ip=IP, method=orm.EnumMethods.ICMP_ECHO_RESPONSE_TIMEOUT)
+    reads = []
+    observations_after = orm.observations_after
+    monkeypatch.setattr(orm, "observations_after", lambda after: reads.append(after) or observations_after(after))
+    cursor = board.cursor
+
+    changed = board.poll()
+    device_id = board.order[-1]
+    assert changed == [device_id]
+    assert reads == [cursor]
+    assert board.cursor == orm.max_observation_id() == cursor + 2
+    assert (board.devices[device_id].status, board.devices[device_id].count) == ("OFFLINE", 2)
+
+    orm.save(ip=IP, mac=MAC, method=orm.EnumMethods.ARP_2)
+    assert board.poll() == [device_id]
+    assert reads == [cursor, cursor + 2]
+    # O estado em memoria e o mesmo de uma carga nova
+    state = board.devices[device_id]
+    _, rows = orm.device_summaries()
+    assert [row for row in rows if row[0] == device_id] == \
+        [(device_id, MAC, IP, False, state.first_conn, 3, True, state.last_seen, "RECONNECTED")]
+    assert [state.status for state in board.devices.values()] == [row[8] for row in rows]
+
+
+def test_poll_reloads_after_clear(monkeypatch):
+    generation = [1]
+    monkeypatch.setattr(orm, "get_generation", lambda: generation[0])
+    monkeypatch.setattr(orm, "device_summaries", lambda: (10, []))
+    board = DeviceBoard()
+    board.load()
+
+    generation[0] = 2
+    monkeypatch.setattr(orm, "max_observation_id", lambda: 3)
+    monkeypatch.setattr(orm, "device_summaries", lambda: (3, [(1, MAC, IP, False, None, 1, True, None, "ONLINE(NEW)")]))
+    assert board.poll() is None
+    assert (board.cursor, board.order, board.positions) == (3, [1], {1: 0})
+
+
+def make_board(count: int) -> DeviceBoard:
+    board = DeviceBoard()
+    now = datetime(2026, 1, 1)
+    for device_id in range(1, count + 1):
+        board.devices[device_id] = DeviceState(device_id, f"02:00:00:00:00:{device_id:02x}", f"10.0.0.{device_id}",
+                                               False, now, 1, True, now, "ONLINE(NEW)")
+        board.positions[device_id] = len(board.order)
+        board.order.append(device_id)
+    return board
+
+
+@pytest.fixture
+def terminal(monkeypatch):
+    size = [os.terminal_size((120, 8))]
+    monkeypatch.setattr(watcher.shutil, "get_terminal_size", lambda: size[0])
+    return size
+
+
+def written(out: io.StringIO) -> str:
+    text = out.getvalue()
+    out.seek(0)
+    out.truncate()
+    return text
+
+
+def row_position(line: int) -> str:
+    return f"\x1b[{line};1H"
+
+
+def test_update_rewrites_only_changed_rows(terminal):
+    board = make_board(6)
+    out = io.StringIO()
+    view = TerminalView(board, out, 2)
+    view.draw()
+    text = written(out)
+    assert "\x1b[2J" in text
+    # 8 linhas: titulo, cabecalho, separador, 4 dispositivos e o rodape
+    assert all(row_position(line) in text for line in range(1, 9))
+    assert "... and 2 more devices" in text
+
+    board.devices[2].apply("10.0.0.2", False, False, datetime(2026, 1, 2))
+    board.devices[6].apply("10.0.0.6", False, False, datetime(2026, 1, 2))
+    view.update([2, 6])
+    text = written(out)
+    assert "\x1b[2J" not in text
+    assert row_position(1) in text and row_position(5) in text
+    # O dispositivo 6 esta fora da tela; as demais linhas nao sao tocadas
+    assert not any(row_position(line) in text for line in (2, 3, 4, 6, 7, 8))
+    assert "\x1b[1;31m" in text  # OFFLINE em negrito
+
+    # Na atualizacao seguinte a linha sai do destaque
+    view.update([])
+    text = written(out)
+    assert row_position(5) in text and "\x1b[1;31m" not in text and "\x1b[31m" in text
+
+
+def test_update_redraws_when_layout_changes(terminal):
+    board = make_board(3)
+    out = io.StringIO()
+    view = TerminalView(board, out, 2)
+    view.draw()
+    written(out)
+
+    board.devices[1].apply("2001:db8::1234:5678", False, True, datetime(2026, 1, 2))  # coluna IP mais larga
+    view.update([1])
+    assert "\x1b[2J" in written(out)
+
+    terminal[0] = os.terminal_size((80, 20))
+    view.update([])
+    assert "\x1b[2J" in written(out)
+
+    view.update(None)  # estado recarregado
+    assert "\x1b[2J" in written(out)
+    view.update([])
+    assert "\x1b[2J" not in written(out)
+
+
+def test_line_view():
+    board = make_board(2)
+    out = io.StringIO()
+    view = LineView(board, out, 2)
+    view.draw()
+    assert written(out).count("\n") == 2
+    board.devices[2].apply("10.0.0.2", False, False, datetime(2026, 1, 2))
+    view.update([2])
+    assert written(out).startswith("OFFLINE 02:00:00:00:00:02 ")
+    view.update(None)
+    assert written(out).splitlines()[0] == "# history cleared, reloaded"
@@ -1,15 +1,21 @@
 import csv
 from functools import cache
+from typing import Dict, List
 
 
 @cache
-def vendor_solver(mac_prefix: str) -> str:
-    mac_prefix = mac_prefix.upper()
+def _vendors() -> Dict[str, str]:
+    # Lido uma unica vez: {prefixo em maiusculas: fabricante}
     with open('mac-vendors-export.csv', mode='r') as infile:
-        reader = csv.reader(infile)
-        for row in reader:
-            if mac_prefix == row[0]:
-                return row[1]
-        return "Unknow"
+        return {row[0]: row[1] for row in csv.reader(infile)}
+
+
+@cache
+def vendor_solver(mac_prefix: str) -> str:
+    return _vendors().get(mac_prefix.upper(), "Unknow")
 
 
+def vendor_prefixes(name: str) -> List[str]:
+    """OUIs (prefixos de 3 octetos, os mesmos usados por vendor_solver) dos fabricantes cujo nome contem `name`"""
+    name = name.lower()
+    return [prefix for prefix, vendor in _vendors().items() if len(prefix) == 8 and name in vendor.lower()]
@@ -0,0 +1,232 @@
+"""
+Modo watch da CLI: a tabela de dispositivos acompanhada no terminal sem recarregar o historico.
+
+A tabela e carregada uma vez (orm.device_summaries) junto com um cursor, o maior id de device_networks.
+A cada intervalo o contador de geracao do banco e consultado; se mudou, so as observacoes com id maior
+que o cursor sao lidas (busca por intervalo na chave primaria) e aplicadas ao estado em memoria, com as
+mesmas regras de orm.device_status. O custo de cada ciclo depende do que mudou, nao do tamanho do
+historico. Na tela (ANSI) so as linhas alteradas sao reescritas; fora de um terminal cada mudanca vira
+uma linha de texto.
+"""
+import shutil
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+import orm
+from vendor_solver import vendor_solver
+
+# Cores ANSI por status: verde, vermelho e amarelo; ONLINE fica com a cor padrao do terminal
+STATUS_COLORS = {"ONLINE(NEW)": "32", "OFFLINE": "31", "RECONNECTED": "33"}
+
+
+class DeviceState(object):
+    __slots__ = ("device_id", "mac", "ip", "gateway", "first_conn", "count", "active", "last_seen", "status")
+
+    def __init__(self, device_id, mac, ip, gateway, first_conn, count, active, last_seen, status):
+        self.device_id = device_id
+        self.mac = mac
+        self.ip = ip
+        self.gateway = gateway
+        self.first_conn = first_conn
+        self.count = count
+        self.active = active
+        self.last_seen = last_seen
+        self.status = status
+
+    def apply(self, ip: str, gateway: bool, active: bool, discovered_at: datetime):
+        """Nova observacao do dispositivo; as regras sao as de orm.device_status"""
+        previous_active = self.active
+        self.count += 1
+        self.ip = ip
+        self.gateway = gateway
+        self.active = active
+        self.last_seen = discovered_at
+        if not active:
+            self.status = "OFFLINE"
+        elif self.count == 1:
+            self.status = "ONLINE(NEW)"
+        elif previous_active:
+            self.status = "ONLINE"
+        else:
+            self.status = "RECONNECTED"
+
+
+class DeviceBoard(object):
+    """Estado em memoria de todos os dispositivos, na ordem em que foram descobertos"""
+
+    def __init__(self):
+        self.devices: Dict[int, DeviceState] = {}
+        self.order: List[int] = []
+        self.positions: Dict[int, int] = {}
+        self.cursor = 0
+        self.generation: Optional[int] = None
+
+    def load(self):
+        # A geracao e lida antes: uma escrita concorrente faz o proximo poll consultar o banco
+        self.generation = orm.get_generation()
+        self.cursor, rows = orm.device_summaries()
+        self.devices = {row[0]: DeviceState(*row) for row in rows}
+        self.order = [row[0] for row in rows]
+        self.positions = {device_id: position for position, device_id in enumerate(self.order)}
+
+    def poll(self) -> Optional[List[int]]:
+        """Ids dos dispositivos alterados desde o ultimo poll, ou None se o estado foi recarregado"""
+        generation = orm.get_generation()
+        if generation == self.generation:
+            return []
+        self.generation = generation
+        if orm.max_observation_id() < self.cursor:
+            # Historico apagado (clear): os ids recomecam, o cursor nao vale mais
+            self.load()
+            return None
+
+        changed: Dict[int, None] = {}
+        for id_, device_id, mac, ip, gateway, active, discovered_at in orm.observations_after(self.cursor):
+            state = self.devices.get(device_id)
+            if state is None:
+                state = self.devices[device_id] = DeviceState(device_id, mac, ip, gateway, discovered_at, 0, None,
+                                                              discovered_at, None)
+                self.positions[device_id] = len(self.order)
+                self.order.append(device_id)
+            state.apply(ip, gateway, active, discovered_at)
+            changed[device_id] = None
+            self.cursor = id_
+        return list(changed)
+
+
+def cells(state: DeviceState) -> List[str]:
+    return [state.status, state.mac, vendor_solver(state.mac[0:8]), state.ip, str(state.gateway),
+            str(state.last_seen)[:19], str(state.count)]
+
+
+class TerminalView(object):
+    """
+    Tela cheia no buffer alternativo do terminal. A tabela e desenhada inteira uma vez (e de novo se o
+    terminal ou a largura das colunas mudar); depois so as linhas que mudaram sao reescritas, em negrito
+    ate a atualizacao seguinte.
+    """
+
+    HEADERS = ["STATUS", "MAC", "MAC_VENDOR", "IP", "GATEWAY", "LAST_SEEN", "COUNT"]
+    MIN_WIDTHS = [11, 17, 24, 15, 7, 19, 5]  # MAC_VENDOR e cortado; IP e COUNT crescem
+    TOP = 3  # titulo, cabecalho e separador
+
+    def __init__(self, board: DeviceBoard, out, interval: float):
+        self.board = board
+        self.out = out
+        self.interval = interval
+        self.size = None
+        self.widths: List[int] = []
+        self.highlighted: Set[int] = set()
+        self.hidden = 0
+        self.out.write("\x1b[?1049h\x1b[?25l")  # buffer alternativo, cursor oculto
+
+    def _widths(self, device_ids, widths: List[int]) -> List[int]:
+        widths = list(widths)
+        for device_id in device_ids:
+            state = self.board.devices[device_id]
+            widths[3] = max(widths[3], len(state.ip))
+            widths[6] = max(widths[6], len(str(state.count)))
+        return widths
+
+    def _visible(self) -> int:
+        return max(self.size.lines - self.TOP - 1, 0)
+
+    def _row(self, state: DeviceState) -> str:
+        text = self._fit(" ".join(cell[:width].ljust(width) for cell, width in zip(cells(state), self.widths)))
+        codes = [code for code in ("1" if state.device_id in self.highlighted else None,
+                                   STATUS_COLORS.get(state.status)) if code]
+        return f"\x1b[{';'.join(codes)}m{text}\x1b[0m" if codes else text
+
+    def _fit(self, text: str) -> str:
+        return text[:self.size.columns]
+
+    def _put(self, line: int, text: str):
+        self.out.write(f"\x1b[{line};1H\x1b[2K{text}")
+
+    def _title(self, changes: int):
+        self._put(1, self._fit(f"netscan watch - {len(self.board.order)} devices - every {self.interval:g}s - "
+                     f"updated {datetime.now():%H:%M:%S} - {changes} changed - Ctrl+C to quit"))
+
+    def _footer(self):
+        hidden = max(len(self.board.order) - self._visible(), 0)
+        if hidden != self.hidden:
+            self._put(self.TOP + self._visible() + 1, f"... and {hidden} more devices" if hidden else "")
+        self.hidden = hidden
+
+    def draw(self, changes: int = 0):
+        self.size = shutil.get_terminal_size()
+        self.widths = self._widths(self.board.order, self.MIN_WIDTHS)
+        self.out.write("\x1b[H\x1b[2J")
+        self._title(changes)
+        self._put(2, self._fit(" ".join(header.ljust(width) for header, width in zip(self.HEADERS, self.widths))))
+        self._put(3, self._fit(" ".join("-" * width for width in self.widths)))
+        for position, device_id in enumerate(self.board.order[:self._visible()]):
+            self._put(self.TOP + position + 1, self._row(self.board.devices[device_id]))
+        self.hidden = 0
+        self._footer()
+        self.out.flush()
+
+    def update(self, changed: Optional[List[int]]):
+        previous, self.highlighted = self.highlighted, set(changed or ())
+        if changed is None or shutil.get_terminal_size() != self.size or \
+                self._widths(changed, self.widths) != self.widths:
+            self.draw(len(self.highlighted))
+            return
+        # Linhas que mudaram agora e as que estavam em destaque na atualizacao anterior
+        for device_id in previous | self.highlighted:
+            position = self.board.positions[device_id]
+            if position < self._visible():
+                self._put(self.TOP + position + 1, self._row(self.board.devices[device_id]))
+        self._title(len(changed))
+        self._footer()
+        self.out.flush()
+
+    def close(self):
+        self.out.write("\x1b[0m\x1b[?25h\x1b[?1049l")
+        self.out.flush()
+
+
+class LineView(object):
+    """Saida redirecionada (arquivo, pipe): o estado inicial e depois uma linha por mudanca, sem ANSI"""
+
+    def __init__(self, board: DeviceBoard, out, interval: float):
+        self.board = board
+        self.out = out
+
+    def _print(self, device_id: int):
+        self.out.write(" ".join(cells(self.board.devices[device_id])) + "\n")
+
+    def draw(self):
+        for device_id in self.board.order:
+            self._print(device_id)
+        self.out.flush()
+
+    def update(self, changed: Optional[List[int]]):
+        if changed is None:
+            self.out.write("# history cleared, reloaded\n")
+            self.draw()
+            return
+        for device_id in changed:
+            self._print(device_id)
+        self.out.flush()
+
+    def close(self):
+        self.out.flush()
+
+
+def run(interval: float = 2.0, out=None):
+    out = out or sys.stdout
+    board = DeviceBoard()
+    board.load()
+    view = (TerminalView if out.isatty() else LineView)(board, out, interval)
+    try:
+        view.draw()
+        while True:
+            time.sleep(interval)
+            view.update(board.poll())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        view.close()